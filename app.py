@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, g, send_file, abort
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime, timedelta
@@ -7,10 +7,14 @@ import os
 import json
 import hmac
 import hashlib
+import logging
+import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from functools import wraps
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///scalevxmailketing.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///scalevxmailketing.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Flask-Login setup
@@ -47,12 +51,112 @@ from database import db
 db.init_app(app)
 
 # Import models after db initialization
-from models import Settings, ProductList, Lead, LeadHistory, BounceEmail, get_wib_now as get_wib_now_naive
+from models import Settings, ProductList, Lead, LeadHistory, BounceEmail, ResyncJob, get_wib_now as get_wib_now_naive
 
 # Import services
 from services.scalev_service import ScalevService
 from services.mailketing_service import MailketingService
 from services.lead_service import LeadService
+from services.engagement_service import EngagementService
+from services.scoring_service import LeadScoringService
+from services.telegram_service import TelegramService
+from services.telegram_notifier import telegram_notifier
+from services.catalog_service import CatalogSyncService, catalog_sync_runner
+from services.mailketing_cache_service import MailketingListCacheService
+from services.handler_service import HandlerResolutionService, handler_cache, handler_lookup_pool
+from services.order_event_service import OrderEventService
+from services.event_dispatcher import event_dispatcher
+from services.admission_control import admission_gates
+from services.circuit_breaker import circuit_breakers, CircuitOpenError, is_transient_error
+from services.outbound_job_service import OutboundJobService
+from services.adaptive_limiter import mailketing_limiter, mailketing_send_pool
+from services.membership_service import MailketingMembershipService
+from services.resync_service import ResyncService
+from services.sales_person_service import SalesPersonService
+from services.order_data_service import OrderDataService
+from services.read_models import LeadRow, ProductListRow, lead_status_counts
+from services.query_stats import query_stats, track_job
+from services.metrics import metrics, webhook_stage_seconds, webhook_events_total, webhook_seconds
+from services.structured_logging import setup_logging, sampled_event, is_sampled, verbose
+from services.profiler import request_profiler
+from services.memory_diagnostics import memory_diagnostics
+
+# Hot paths log through a queue; LOG_LEVEL / LOG_FORMAT / LOG_DEBUG_SAMPLE_RATE
+setup_logging()
+logger = logging.getLogger('app')
+
+# Count queries per request, scheduled job and webhook event
+with app.app_context():
+    query_stats.install(db.engine)
+
+# Queue depths for /metrics; in-memory queues are summed over worker processes
+metrics.gauge('event_dispatcher_queued', 'Webhook events waiting for a dispatcher worker',
+              lambda: {lane: stats['queued'] for lane, stats in event_dispatcher.get_stats()['lanes'].items()}, ['lane'])
+metrics.gauge('event_dispatcher_running', 'Webhook events being processed',
+              lambda: {lane: stats['running'] for lane, stats in event_dispatcher.get_stats()['lanes'].items()}, ['lane'])
+metrics.gauge('admission_waiting', 'Webhook requests waiting for an admission slot',
+              lambda: {group: gate.get_stats()['waiting'] for group, gate in admission_gates.items()}, ['group'])
+metrics.gauge('mailketing_limiter_in_flight', 'Mailketing sends in flight', lambda: mailketing_limiter.get_stats()['in_flight'])
+metrics.gauge('mailketing_limiter_waiting', 'Mailketing sends waiting for a slot', lambda: mailketing_limiter.get_stats()['waiting'])
+metrics.gauge('mailketing_limiter_limit', 'Current Mailketing concurrency limit', lambda: mailketing_limiter.limit)
+metrics.gauge('telegram_notifier_queued', 'Telegram notifications waiting to be sent',
+              lambda: telegram_notifier.get_stats()['queue_depth'])
+metrics.gauge('outbound_jobs', 'Outbound jobs by status', lambda: OutboundJobService(db).count_by_status(),
+              ['status'], per_process=False)
+metrics.gauge('pending_order_events', 'Parked ScaleV order events waiting for their lead',
+              lambda: OrderEventService(db).count_pending(), per_process=False)
+metrics.start(os.environ.get('METRICS_DIR', os.path.join(app.instance_path, 'metrics')))
+
+@app.before_request
+def start_query_scope():
+    g.query_scope = query_stats.start(f'{request.method} {request.url_rule.rule if request.url_rule else request.path}')
+
+@app.teardown_request
+def finish_query_scope(error=None):
+    started = g.pop('query_scope', None)
+    if started:
+        query_stats.finish(started)
+
+@app.teardown_appcontext
+def record_job_session(error=None):
+    """Identity map size of a scheduled job's session (runs before Flask-SQLAlchemy removes it)"""
+    if db.session.registry.has():
+        memory_diagnostics.record_session(db.session())
+
+# On-demand profiling: armed from the Diagnostics page, or one request with `X-Profile: 1`
+request_profiler.configure(os.path.join(app.instance_path, 'profiles'))
+
+def profile_requested():
+    """X-Profile header from a logged-in admin, or carrying PROFILE_TOKEN (for webhooks)"""
+    value = request.headers.get('X-Profile')
+    if not value:
+        return False
+    token = os.environ.get('PROFILE_TOKEN')
+    if token and hmac.compare_digest(value, token):
+        return True
+    return current_user.is_authenticated
+
+@app.before_request
+def start_request_profile():
+    rule = request.url_rule.rule if request.url_rule else request.path
+    if request_profiler.claim(rule) or ('X-Profile' in request.headers and profile_requested()):
+        g.profile_session = request_profiler.start(f'{request.method} {rule}')
+
+@app.after_request
+def finish_request_profile(response):
+    session = g.pop('profile_session', None)
+    if session:
+        name = request_profiler.stop(session, f'{session.name} {response.status_code}')
+        if name:
+            response.headers['X-Profile-Saved'] = name
+    return response
+
+@app.teardown_request
+def abandon_request_profile(error=None):
+    # Requests that raised never reach after_request
+    session = g.pop('profile_session', None)
+    if session:
+        request_profiler.stop(session, f'{session.name} error')
 
 # Jinja2 Template Filters for WIB timezone
 @app.template_filter('to_wib')
@@ -103,60 +207,410 @@ def is_bounced_email(email):
     bounce = get_bounce_record(email)
     if bounce:
         reason = bounce.reason or 'unknown'
-        print(f"🚫 Skip Mailketing: {email} is marked as bounced (reason: {reason})")
+        logger.info("🚫 Skip Mailketing: %s is marked as bounced (reason: %s)", email, reason)
         return True, bounce
     return False, None
 
+def admission_controlled(group):
+    """Limit concurrent requests of an endpoint group, answering 503 + Retry-After when overloaded"""
+    gate = admission_gates[group]
+    
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not gate.try_enter():
+                logger.warning("⚠️  %s webhooks overloaded, request shed (503)", gate.name)
+                response = jsonify({'success': False, 'error': 'Server busy, retry later'})
+                response.status_code = 503
+                response.headers['Retry-After'] = str(gate.retry_after)
+                return response
+            try:
+                return view(*args, **kwargs)
+            finally:
+                gate.leave()
+        return wrapper
+    return decorator
+
+def record_engagement_event(event_type, data):
+    """Buffer a Mailketing engagement event; storage errors never fail the webhook
+    
+    Full batches are written on the dispatcher's engagement lane, so a burst
+    of opens/clicks doesn't compete with payment and order processing.
+    """
+    try:
+        engagement = EngagementService(db)
+        engagement.record(
+            event_type,
+            data.get('email'),
+            date=data.get('date'),
+            list_id=data.get('list_id'),
+            link=data.get('link_clicked'),
+            auto_flush=False
+        )
+        if engagement.buffer.is_flush_due():
+            event_dispatcher.submit('engagement', 'engagement_flush', flush_engagement_events, coalesce=True)
+    except Exception as e:
+        logger.warning("⚠️  Failed to store engagement event: %s", e)
+
+def notify_telegram(kind, message, data, debug_title, debug_footer=None, coalesce_key=None):
+    """Queue a Telegram notification for a Mailketing event (never waits on Telegram)"""
+    settings_obj = Settings.query.first()
+    if not (settings_obj and settings_obj.telegram_enabled and settings_obj.telegram_bot_token and settings_obj.telegram_chat_id):
+        return
+    
+    bot_token = settings_obj.telegram_bot_token
+    chat_id = settings_obj.telegram_chat_id
+    
+    if settings_obj.telegram_debug_mode:
+        # Send full JSON payload for debugging
+        debug_message = f"""
+🐛 <b>DEBUG: {debug_title}</b>
+
+<b>Full Webhook Payload:</b>
+<pre>{json.dumps(data, indent=2, ensure_ascii=False)}</pre>
+"""
+        if debug_footer:
+            debug_message += f"\n{debug_footer}\n"
+        telegram_notifier.notify(bot_token, chat_id, debug_message.strip())
+    elif settings_obj.telegram_digest_mode and kind != 'bounce':
+        # Bounces stay immediate; engagement events are summarized periodically
+        interval = settings_obj.telegram_digest_interval or 5
+        telegram_notifier.add_to_digest(bot_token, chat_id, kind, message, interval, key=coalesce_key)
+    else:
+        telegram_notifier.notify(bot_token, chat_id, message, key=coalesce_key)
+
+def sync_catalog_in_background(store_id=None, full=None):
+    """Refresh the local ScaleV catalog mirror without blocking the caller"""
+    def run():
+        settings_obj = Settings.query.first()
+        if not settings_obj or not settings_obj.scalev_api_key:
+            return
+        catalog = CatalogSyncService(db, ScalevService(settings_obj.scalev_api_key))
+        if store_id:
+            catalog.sync_store(store_id, full=full)
+        else:
+            catalog.sync_stores(full=full)
+    
+    key = f'store:{store_id}' if store_id else 'stores'
+    return catalog_sync_runner.trigger(app, key, run)
+
+def send_lead_to_mailketing(lead, list_id, lead_service=None, defer=True):
+    """Add a lead to a Mailketing list
+    
+    Returns 'sent', 'already_member', 'failed', 'bounced', 'no_api_key' or
+    'deferred'. Emails already in the membership ledger for this list are not
+    sent again. When Mailketing is unavailable (open circuit, timeout, 5xx)
+    the send is queued as an OutboundJob for drain_outbound_jobs; with
+    defer=False those errors are raised instead.
+    """
+    settings_obj = Settings.query.first()
+    if not settings_obj or not settings_obj.mailketing_api_key:
+        return 'no_api_key'
+    
+    is_bounced, _ = is_bounced_email(lead.email)
+    if is_bounced:
+        return 'bounced'
+    
+    lead_service = lead_service or LeadService(db)
+    memberships = MailketingMembershipService(db)
+    if memberships.is_member(lead.email, list_id):
+        lead_service.mark_sent_to_mailketing(lead, list_id)
+        return 'already_member'
+    
+    try:
+        mailketing = MailketingService(settings_obj.mailketing_api_key)
+        result = mailketing.add_subscriber(
+            list_id=list_id,
+            email=lead.email,
+            first_name=lead.name,
+            mobile=lead.phone
+        )
+    except Exception as e:
+        if not defer or not is_transient_error(e):
+            raise
+        OutboundJobService(db).enqueue('mailketing_add_subscriber', {'lead_id': lead.id, 'list_id': str(list_id)})
+        logger.warning("⏸  Mailketing unavailable (%s), send to list %s queued for retry", e, list_id,
+                       extra={'lead_id': lead.id})
+        return 'deferred'
+    
+    # Mailketing answers refusals (bad token, invalid list) with HTTP 200 and
+    # status 'failed'; only an accepted add goes into the membership ledger
+    if not isinstance(result, dict) or result.get('status') != 'success':
+        return 'failed'
+    lead_service.mark_sent_to_mailketing(lead, list_id)
+    memberships.record(lead.email, list_id, lead_id=lead.id)
+    return 'sent'
+
+MAILKETING_SEND_LOG = {
+    'sent': (logging.INFO, "✓ %s added to %s list"),
+    'already_member': (logging.INFO, "⊘ %s already in %s list, skipped"),
+    'bounced': (logging.INFO, "🚫 Not sending %s to %s list because email is bounced"),
+    'no_api_key': (logging.WARNING, "⚠️  Not sending %s to %s list: Mailketing API key not configured"),
+    'failed': (logging.WARNING, "⚠️  Failed to add %s to %s list"),
+    'deferred': (logging.INFO, "⏸  %s send to %s list queued for retry"),
+    'skipped': (logging.INFO, "⊘ %s not sent to %s list: lead was deleted"),
+}
+
+def log_mailketing_send(status, email, list_label):
+    level, message = MAILKETING_SEND_LOG.get(status, (logging.INFO, "%s -> %s list: " + str(status)))
+    logger.log(level, message, email, list_label)
+
+def send_leads_to_mailketing(sends):
+    """Send many (lead, list_id) pairs to Mailketing concurrently
+    
+    Returns {(lead.id, list_id): status} with the statuses of
+    send_lead_to_mailketing, 'skipped' if the lead was deleted in the
+    meantime, or 'error' if the send raised. Pairs already in
+    the membership ledger are settled up front with one query; how many of
+    the remaining requests are in flight at once is decided by
+    mailketing_limiter.
+    """
+    statuses = {}
+    known = MailketingMembershipService(db).existing((lead.email, list_id) for lead, list_id in sends)
+    if known:
+        lead_service = LeadService(db)
+        pending = []
+        for lead, list_id in sends:
+            if (MailketingMembershipService.normalize(lead.email), str(list_id)) in known:
+                lead_service.mark_sent_to_mailketing(lead, list_id)
+                statuses[(lead.id, list_id)] = 'already_member'
+            else:
+                pending.append((lead, list_id))
+        sends = pending
+    
+    def send(lead_id, list_id):
+        with app.app_context():
+            lead = Lead.query.get(lead_id)
+            if lead is None:
+                return 'skipped'
+            try:
+                return send_lead_to_mailketing(lead, list_id)
+            except Exception as e:
+                logger.error("❌ Mailketing send to list %s failed: %s", list_id, e, extra={'lead_id': lead_id})
+                return 'error'
+    
+    futures = {(lead.id, list_id): mailketing_send_pool.submit(send, lead.id, list_id) for lead, list_id in sends}
+    statuses.update((key, future.result()) for key, future in futures.items())
+    return statuses
+
+def run_resync_job(job_id):
+    """Stream a ResyncJob's leads to Mailketing batch by batch until done, paused or cancelled"""
+    resync = ResyncService(db)
+    job = ResyncJob.query.get(job_id)
+    if not job or job.state != 'running':
+        return
+    
+    settings_obj = Settings.query.first()
+    if not settings_obj or not settings_obj.mailketing_api_key:
+        resync.finish(job, 'Mailketing API key not configured')
+        return
+    
+    logger.info("🔁 Resync job %s: %s leads of product list %s -> list %s (from lead %s)",
+                job.id, job.lead_status, job.product_list_id, job.list_id, job.last_lead_id)
+    try:
+        while True:
+            db.session.refresh(job)
+            if job.state != 'running':
+                logger.info("⏸  Resync job %s %s at lead %s (%s/%s)", job.id, job.state, job.last_lead_id,
+                            job.processed, job.total)
+                return
+            
+            batch = resync.next_batch(job)
+            if not batch:
+                resync.finish(job)
+                logger.info("✅ Resync job %s done: %s sent, %s skipped, %s deferred, %s failed",
+                            job.id, job.sent, job.skipped, job.deferred, job.failed)
+                return
+            
+            # Concurrency inside the batch is bounded by the Mailketing send pool and limiter
+            statuses = send_leads_to_mailketing([(lead, job.list_id) for lead in batch])
+            resync.record_batch(job, batch[-1].id, list(statuses.values()))
+    except Exception as e:
+        db.session.rollback()
+        resync.finish(job, e)
+        logger.exception("❌ Resync job %s failed: %s", job.id, e)
+
+def start_resync_job(job):
+    """Run a ResyncJob in the background (no-op if it is already running here)"""
+    job_id = job.id
+    return catalog_sync_runner.trigger(app, f'resync:{job_id}', lambda: run_resync_job(job_id))
+
+def resync_job_to_dict(job):
+    return {
+        'id': job.id,
+        'product_list_id': job.product_list_id,
+        'lead_status': job.lead_status,
+        'list_id': job.list_id,
+        'state': job.state,
+        'total': job.total,
+        'processed': job.processed,
+        'sent': job.sent,
+        'skipped': job.skipped,
+        'deferred': job.deferred,
+        'failed': job.failed,
+        'progress': job.progress_percent(),
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
 # Initialize scheduler
 scheduler = BackgroundScheduler()
 
+@track_job
 def check_expired_leads():
     """Check for leads that have been in follow-up for more than 7 days"""
     with app.app_context():
         lead_service = LeadService(db)
         expired_leads = lead_service.get_expired_follow_up_leads()
         
-        print(f"\n{'='*60}")
-        print(f"Checking expired leads: {len(expired_leads)} found")
-        print(f"{'='*60}\n")
+        logger.info("Checking expired leads: %s found", len(expired_leads))
         
+        sends = []
+        emails = {}  # lead id -> email, for the send report
         for lead in expired_leads:
             try:
                 # Move to not closing
                 lead_service.move_to_not_closing(lead)
-                print(f"✓ Lead {lead.email} moved to not_closing")
+                logger.info("✓ Lead %s moved to not_closing", lead.email, extra={'lead_id': lead.id})
                 
-                # Send to Not Closing list
+                # Queue the send to the Not Closing list
                 product_list = ProductList.query.get(lead.product_list_id)
                 if product_list and product_list.mailketing_list_not_closing:
-                    settings = Settings.query.first()
-                    if settings and settings.mailketing_api_key:
-                        is_bounced, _ = is_bounced_email(lead.email)
-                        if is_bounced:
-                            print(f"  🚫 Skipped Mailketing send for bounced email: {lead.email}")
-                            continue
-                        
-                        mailketing = MailketingService(settings.mailketing_api_key)
-                        result = mailketing.add_subscriber(
-                            list_id=product_list.mailketing_list_not_closing,
-                            email=lead.email,
-                            first_name=lead.name,
-                            mobile=lead.phone
-                        )
-                        
-                        if result:
-                            # Mark as sent with list ID
-                            lead_service.mark_sent_to_mailketing(lead, product_list.mailketing_list_not_closing)
-                            print(f"  ✓ Sent to Not Closing list: {product_list.mailketing_list_not_closing}")
-                        else:
-                            print(f"  ⚠️  Failed to send to Mailketing")
+                    sends.append((lead, product_list.mailketing_list_not_closing))
+                    emails[lead.id] = lead.email
                 else:
-                    print(f"  ⚠️  No Not Closing list configured for this product")
+                    logger.warning("⚠️  No Not Closing list configured for product list %s", lead.product_list_id,
+                                   extra={'lead_id': lead.id})
                 
             except Exception as e:
-                print(f"❌ Error processing expired lead {lead.id}: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("❌ Error processing expired lead %s: %s", lead.id, e)
+        
+        for (lead_id, list_id), status in send_leads_to_mailketing(sends).items():
+            log_mailketing_send(status, emails[lead_id], f'Not Closing ({list_id})')
+
+
+@track_job
+def flush_engagement_events():
+    """Write buffered engagement events that did not fill a batch yet"""
+    with app.app_context():
+        try:
+            EngagementService(db).flush()
+        except Exception as e:
+            logger.exception("❌ Error flushing engagement events: %s", e)
+
+
+@track_job
+def purge_engagement_events():
+    """Drop raw engagement events past the retention window (rollups are kept)"""
+    with app.app_context():
+        try:
+            deleted = EngagementService(db).purge_expired_partitions(retention_days=90)
+            logger.info("✓ Purged %s engagement events older than 90 days", deleted)
+        except Exception as e:
+            logger.exception("❌ Error purging engagement events: %s", e)
+
+
+@track_job
+def drain_outbound_jobs():
+    """Retry Mailketing sends that were deferred while Mailketing was unavailable"""
+    with app.app_context():
+        if circuit_breakers['mailketing'].retry_in() > 0:
+            return
+        jobs = OutboundJobService(db)
+        due = jobs.get_due(kind='mailketing_add_subscriber')
+        if not due:
+            return
+        
+        logger.info("📤 Retrying %s deferred Mailketing sends", len(due))
+        lead_service = LeadService(db)
+        for job in due:
+            payload = json.loads(job.payload)
+            lead = Lead.query.get(payload['lead_id'])
+            if not lead:
+                jobs.mark_done(job)
+                continue
+            try:
+                status = send_lead_to_mailketing(lead, payload['list_id'], lead_service, defer=False)
+                if status == 'failed':
+                    jobs.mark_retry(job, 'Mailketing did not accept the subscriber')
+                else:
+                    jobs.mark_done(job)
+                    logger.info("✓ %s -> list %s: %s", lead.email, payload['list_id'], status, extra={'lead_id': lead.id})
+            except Exception as e:
+                jobs.mark_retry(job, e)
+                logger.warning("⚠️  Retry failed for %s: %s", lead.email, e, extra={'lead_id': lead.id})
+                if isinstance(e, CircuitOpenError):
+                    break
+
+
+@track_job
+def resume_resync_jobs():
+    """Restart running re-sync jobs that have no worker (e.g. after an app restart)"""
+    with app.app_context():
+        try:
+            for job in ResyncService(db).get_running():
+                if start_resync_job(job):
+                    logger.info("🔁 Resumed resync job %s from lead %s", job.id, job.last_lead_id)
+        except Exception as e:
+            logger.exception("❌ Error resuming resync jobs: %s", e)
+
+
+@track_job
+def train_order_data_dictionary():
+    """Train a zlib dictionary for order payloads once enough of them exist (refreshed monthly)"""
+    with app.app_context():
+        try:
+            order_data = OrderDataService(db)
+            current = order_data.current_dictionary()
+            if current and current.created_at > get_wib_now_naive() - timedelta(days=30):
+                return
+            dictionary = order_data.train_dictionary()
+            if dictionary:
+                logger.info("✓ Trained order data dictionary %s (%s bytes, %s samples)",
+                            dictionary.id, len(dictionary.data), dictionary.sample_count)
+        except Exception as e:
+            logger.exception("❌ Error training order data dictionary: %s", e)
+
+
+@track_job
+def purge_pending_order_events():
+    """Drop replayed order events and parked events whose lead never appeared"""
+    with app.app_context():
+        try:
+            deleted = OrderEventService(db).purge_expired()
+            logger.info("✓ Purged %s pending order events", deleted)
+        except Exception as e:
+            logger.exception("❌ Error purging pending order events: %s", e)
+
+
+@track_job
+def verify_lead_scores():
+    """Recompute lead scores from stored events and report drift (no changes applied)"""
+    with app.app_context():
+        try:
+            report = LeadScoringService(db).recompute_all(apply=False)
+            logger.info("✓ Lead score check: %s leads, %s mismatched (max drift %.4f)",
+                        report['checked'], report['mismatched'], report['max_drift'])
+        except Exception as e:
+            logger.exception("❌ Error verifying lead scores: %s", e)
+
+
+@track_job
+def sync_scalev_catalog():
+    """Keep the ScaleV catalog mirror fresh (incremental, full every few hours)"""
+    with app.app_context():
+        settings_obj = Settings.query.first()
+        if not settings_obj or not settings_obj.scalev_api_key:
+            return
+        catalog = CatalogSyncService(db, ScalevService(settings_obj.scalev_api_key))
+        # Same keys as sync_catalog_in_background: a resource already syncing
+        # from the UI is skipped instead of "resumed" by a second pass
+        if not catalog_sync_runner.run('stores', catalog.sync_stores):
+            logger.info("⊘ Store sync already running, skipped")
+        for store_id in catalog.get_synced_store_ids():
+            if not catalog_sync_runner.run(f'store:{store_id}', lambda: catalog.sync_store(store_id)):
+                logger.info("⊘ Sync of store %s already running, skipped", store_id)
 
 
 # Authentication Routes
@@ -198,13 +652,8 @@ def logout():
 @login_required
 def index():
     """Dashboard home"""
-    stats = {
-        'follow_up': Lead.query.filter_by(status='follow_up').count(),
-        'closing': Lead.query.filter_by(status='closing').count(),
-        'not_closing': Lead.query.filter_by(status='not_closing').count(),
-        'total': Lead.query.count()
-    }
-    recent_leads = Lead.query.order_by(Lead.created_at.desc()).limit(10).all()
+    stats = lead_status_counts(db)
+    recent_leads = LeadRow.wrap(LeadRow.query(db).order_by(Lead.created_at.desc()).limit(10))
     return render_template('index.html', stats=stats, recent_leads=recent_leads)
 
 @app.route('/settings', methods=['GET', 'POST'])
@@ -221,11 +670,14 @@ def settings():
         telegram_chat_id = request.form.get('telegram_chat_id')
         telegram_enabled = request.form.get('telegram_enabled') == '1'
         telegram_debug_mode = request.form.get('telegram_debug_mode') == '1'
+        telegram_digest_mode = request.form.get('telegram_digest_mode') == '1'
+        telegram_digest_interval = request.form.get('telegram_digest_interval', 5, type=int)
         
         if not settings_obj:
             settings_obj = Settings()
             db.session.add(settings_obj)
         
+        old_mailketing_api_key = settings_obj.mailketing_api_key
         settings_obj.scalev_api_key = scalev_api_key
         settings_obj.scalev_webhook_secret = scalev_webhook_secret
         settings_obj.mailketing_api_key = mailketing_api_key
@@ -233,47 +685,133 @@ def settings():
         settings_obj.telegram_chat_id = telegram_chat_id
         settings_obj.telegram_enabled = telegram_enabled
         settings_obj.telegram_debug_mode = telegram_debug_mode
+        settings_obj.telegram_digest_mode = telegram_digest_mode
+        settings_obj.telegram_digest_interval = max(1, telegram_digest_interval or 5)
         settings_obj.updated_at = get_wib_now_naive()
         
         db.session.commit()
+        
+        if old_mailketing_api_key and old_mailketing_api_key != mailketing_api_key:
+            # Lists cached for the old account no longer apply
+            MailketingListCacheService(db, old_mailketing_api_key).invalidate()
+        if mailketing_api_key and old_mailketing_api_key != mailketing_api_key:
+            MailketingListCacheService(db, mailketing_api_key).refresh_in_background(app)
+        
         flash('Settings saved successfully!', 'success')
         return redirect(url_for('settings'))
     
-    return render_template('settings.html', settings=settings_obj)
+    return render_template(
+        'settings.html',
+        settings=settings_obj,
+        breakers={name: breaker.get_stats() for name, breaker in circuit_breakers.items()},
+        outbound_jobs=OutboundJobService(db).count_by_status(),
+        mailketing_limiter=mailketing_limiter.get_stats()
+    )
+
+@app.route('/diagnostics')
+@login_required
+def diagnostics():
+    """Admin diagnostics: request profiler and memory"""
+    routes = sorted({rule.rule for rule in app.url_map.iter_rules() if rule.endpoint != 'static'})
+    memory_diff = None
+    diff_from = request.args.get('diff_from', type=int)
+    diff_to = request.args.get('diff_to', type=int)
+    if diff_from and diff_to:
+        try:
+            memory_diff = memory_diagnostics.diff(diff_from, diff_to, limit=25)
+        except KeyError as e:
+            flash(e.args[0], 'danger')
+    return render_template(
+        'diagnostics.html',
+        profiler=request_profiler.get_state(),
+        profiles=request_profiler.list_profiles(),
+        routes=routes,
+        memory=memory_diagnostics.get_stats(),
+        memory_diff=memory_diff
+    )
+
+@app.route('/diagnostics/memory', methods=['POST'])
+@login_required
+def control_memory_tracing():
+    """Start/stop tracemalloc or capture a snapshot from the Diagnostics page"""
+    action = request.form.get('action')
+    if action == 'start':
+        memory_diagnostics.start_tracing(request.form.get('frames', type=int) or 10)
+        flash('Tracing memori aktif', 'success')
+    elif action == 'stop':
+        memory_diagnostics.stop_tracing()
+        flash('Tracing memori dimatikan, snapshot dihapus', 'info')
+    elif action == 'snapshot':
+        try:
+            snapshot = memory_diagnostics.capture(request.form.get('label'))
+            flash(f"Snapshot #{snapshot['id']} diambil", 'success')
+        except RuntimeError as e:
+            flash(str(e), 'danger')
+    return redirect(url_for('diagnostics'))
+
+@app.route('/diagnostics/profiler', methods=['POST'])
+@login_required
+def arm_request_profiler():
+    """Arm the profiler for the next N requests of a route, or disarm it"""
+    if request.form.get('action') == 'disarm':
+        request_profiler.disarm()
+        flash('Profiler dimatikan', 'info')
+    else:
+        route = request.form.get('route', '').strip()
+        count = request.form.get('count', type=int) or 1
+        if not route:
+            flash('Pilih route yang ingin diprofile', 'danger')
+        else:
+            request_profiler.arm(route, min(count, 100))
+            flash(f'Profiler aktif untuk {min(count, 100)} request berikutnya ke {route}', 'success')
+    return redirect(url_for('diagnostics'))
+
+@app.route('/diagnostics/profiles/<name>')
+@login_required
+def download_profile(name):
+    path = request_profiler.path_of(name)
+    if not path:
+        abort(404)
+    return send_file(path, mimetype='text/plain', as_attachment=True, download_name=name)
+
+@app.route('/diagnostics/profiles/<name>/delete', methods=['POST'])
+@login_required
+def delete_profile(name):
+    path = request_profiler.path_of(name)
+    if path:
+        os.remove(path)
+        flash('Profile dihapus', 'success')
+    return redirect(url_for('diagnostics'))
 
 @app.route('/product-lists')
 @login_required
 def product_lists():
     """Product lists management"""
     try:
-        lists = ProductList.query.all()
+        lists = ProductListRow.load_all(db)
     except Exception as e:
         # If database not migrated yet, columns might not exist
-        print(f"ERROR loading product lists: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error loading product lists: %s", e)
         flash('Database belum di-migrate. Silakan restart aplikasi untuk auto-migration.', 'danger')
         lists = []
     
     settings_obj = Settings.query.first()
     
-    # Get Mailketing lists if API key is configured
+    # Mailketing lists come from the cache (refreshed in the background when stale)
     mailketing_lists = []
+    mailketing_cache = None
     if settings_obj and settings_obj.mailketing_api_key:
-        try:
-            print("Fetching Mailketing lists...")
-            mailketing = MailketingService(settings_obj.mailketing_api_key)
-            mailketing_lists = mailketing.get_all_lists()
-            print(f"✓ Fetched {len(mailketing_lists)} Mailketing lists")
-            if mailketing_lists:
-                print(f"  First list: {mailketing_lists[0].get('list_name')} (ID: {mailketing_lists[0].get('list_id')})")
-        except Exception as e:
-            print(f"ERROR fetching Mailketing lists: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            flash(f'Error fetching Mailketing lists: {str(e)}', 'warning')
+        list_cache = MailketingListCacheService(db, settings_obj.mailketing_api_key)
+        cached_lists, entry = list_cache.get_lists(app=app)
+        mailketing_lists = cached_lists or []
+        mailketing_cache = {
+            'refreshed_at': entry.refreshed_at if entry else None,
+            'error': entry.error if entry else None,
+            'refreshing': list_cache.is_refreshing()
+        }
     
-    return render_template('product_lists.html', lists=lists, mailketing_lists=mailketing_lists)
+    return render_template('product_lists.html', lists=lists, mailketing_lists=mailketing_lists,
+                           mailketing_cache=mailketing_cache, resync_jobs=ResyncService(db).get_recent())
 
 
 @app.route('/product-lists/add', methods=['POST'])
@@ -348,6 +886,9 @@ def edit_product_list(list_id):
     
     if request.method == 'POST':
         try:
+            resync = ResyncService(db)
+            old_lists = {field: getattr(product_list, field) for field in resync.LIST_STATUSES}
+            
             # Update mailketing lists
             product_list.mailketing_list_followup = request.form.get('mailketing_list_followup')
             product_list.mailketing_list_closing = request.form.get('mailketing_list_closing')
@@ -366,6 +907,17 @@ def edit_product_list(list_id):
             
             db.session.commit()
             flash(f'Product list "{product_list.product_name}" berhasil diupdate!', 'success')
+            
+            # Push existing leads to lists that were changed
+            changed = resync.changed_fields(old_lists, product_list)
+            if changed and request.form.get('resync_leads'):
+                for field in changed:
+                    start_resync_job(resync.create_job(product_list, field))
+                flash(f'🔁 Resync {len(changed)} list Mailketing berjalan di background', 'info')
+            elif changed:
+                pending = sum(c['to_send'] for c in resync.dry_run(product_list, changed).values())
+                if pending:
+                    flash(f'ℹ️ {pending} lead lama belum ada di list Mailketing yang baru. Centang "Resync lead lama" saat edit untuk mengirimnya.', 'info')
             return redirect(url_for('product_lists'))
             
         except Exception as e:
@@ -404,20 +956,21 @@ def leads():
         sales_person_filter = request.args.get('sales_person', '')
         date_from = request.args.get('date_from', '')
         date_to = request.args.get('date_to', '')
+        sort = request.args.get('sort', 'newest')
         page = request.args.get('page', 1, type=int)
         per_page = 20  # Items per page
         
-        # Build query
-        leads_query = Lead.query
+        # Build query (column projection, product name joined in)
+        leads_query = LeadRow.query(db)
         
         # Status filter
         if status_filter != 'all':
-            leads_query = leads_query.filter_by(status=status_filter)
+            leads_query = leads_query.filter(Lead.status == status_filter)
         
         # Product filter (by product name or product list ID)
         if product_filter:
             # Try to find product list by name
-            product_lists = ProductList.query.filter(
+            product_lists = db.session.query(ProductList.id).filter(
                 ProductList.product_name.ilike(f'%{product_filter}%')
             ).all()
             
@@ -451,12 +1004,16 @@ def leads():
             except ValueError:
                 pass
         
-        # Order by newest first
-        leads_query = leads_query.order_by(Lead.created_at.desc())
+        # Order by engagement score (hot leads first) or newest first
+        if sort == 'score':
+            leads_query = leads_query.order_by(Lead.engagement_score.desc(), Lead.created_at.desc())
+        else:
+            sort = 'newest'
+            leads_query = leads_query.order_by(Lead.created_at.desc())
         
         # Paginate
         pagination = leads_query.paginate(page=page, per_page=per_page, error_out=False)
-        leads_list = pagination.items
+        leads_list = LeadRow.wrap(pagination.items)
         
         # Get unique products from leads (only products that have leads)
         unique_products = []
@@ -470,7 +1027,7 @@ def leads():
             ).distinct().order_by(ProductList.product_name).all()
             unique_products = [p[0] for p in unique_products_query if p[0]]
         except Exception as e:
-            print(f"Error getting unique products: {e}")
+            logger.warning("Error getting unique products: %s", e)
             # Fallback: get all active product lists
             unique_products = [p.product_name for p in ProductList.query.filter_by(is_active=True).all()]
         
@@ -485,16 +1042,14 @@ def leads():
             ).distinct().order_by(Lead.sales_person_name).all()
             unique_sales_people = [s[0] for s in unique_sales_people_query if s[0]]
         except Exception as e:
-            print(f"Error getting unique sales people: {e}")
+            logger.warning("Error getting unique sales people: %s", e)
         
         # Get count of expired leads (7+ days in follow_up)
         expired_leads_count = 0
         try:
-            lead_service = LeadService(db)
-            expired_leads = lead_service.get_expired_follow_up_leads(days=7)
-            expired_leads_count = len(expired_leads)
+            expired_leads_count = LeadService(db).count_expired_follow_up_leads(days=7)
         except Exception as e:
-            print(f"Error getting expired leads count: {e}")
+            logger.warning("Error getting expired leads count: %s", e)
         
         return render_template(
             'leads.html',
@@ -505,17 +1060,35 @@ def leads():
             sales_person_filter=sales_person_filter,
             date_from=date_from,
             date_to=date_to,
+            sort=sort,
             unique_products=unique_products,
             unique_sales_people=unique_sales_people,
             expired_leads_count=expired_leads_count
         )
     except Exception as e:
-        print(f"❌ ERROR in leads route: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error in leads route: %s", e)
         flash(f'Error loading leads page: {str(e)}', 'danger')
         return redirect(url_for('index'))
 
+@app.route('/api/leads/hot', methods=['GET'])
+@login_required
+def get_hot_leads():
+    """Top N follow-up leads by engagement score"""
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    status = request.args.get('status', 'follow_up')
+    hot_leads = LeadScoringService(db).get_hot_leads(limit=limit, status=status)
+    return jsonify({
+        'success': True,
+        'leads': [{
+            'id': lead.id,
+            'name': lead.name,
+            'email': lead.email,
+            'status': lead.status,
+            'sales_person_name': lead.sales_person_name,
+            'score': round(lead.get_engagement_score(), 2)
+        } for lead in hot_leads]
+    })
+
 @app.route('/leads/<int:lead_id>')
 @login_required
 def lead_detail(lead_id):
@@ -523,7 +1096,19 @@ def lead_detail(lead_id):
     lead = Lead.query.get_or_404(lead_id)
     history = LeadHistory.query.filter_by(lead_id=lead_id).order_by(LeadHistory.created_at.desc()).all()
     
-    return render_template('lead_detail.html', lead=lead, history=history)
+    # Engagement comes from the per-lead rollup, raw events only for the short recent list
+    engagement_service = EngagementService(db)
+    engagement = engagement_service.get_lead_rollup(lead_id)
+    recent_events = engagement_service.get_recent_lead_events(lead_id, limit=10)
+    
+    return render_template(
+        'lead_detail.html',
+        lead=lead,
+        history=history,
+        engagement=engagement,
+        recent_events=recent_events,
+        event_names=EngagementService.EVENT_NAMES
+    )
 
 @app.route('/debug/leads-data')
 @login_required
@@ -595,59 +1180,43 @@ def bulk_move_expired_leads():
             flash('Tidak ada lead yang sudah lebih dari 7 hari di Follow Up', 'info')
             return redirect(url_for('leads'))
         
-        print(f"\n{'='*60}")
-        print(f"📦 BULK MOVE: Processing {len(expired_leads)} expired leads")
-        print(f"{'='*60}\n")
+        logger.info("📦 Bulk move: processing %s expired leads", len(expired_leads))
         
         success_count = 0
         failed_count = 0
-        sent_to_mailketing_count = 0
+        sends = []
         
         for lead in expired_leads:
             try:
-                print(f"Processing: {lead.email} ({lead.days_in_follow_up()} days)")
+                days = lead.days_in_follow_up()
                 
                 # Move to not closing
                 lead_service.move_to_not_closing(lead)
                 success_count += 1
-                print(f"  ✓ Moved to not_closing")
+                logger.info("✓ %s moved to not_closing (%s days)", lead.email, days, extra={'lead_id': lead.id})
                 
-                # Send to Not Closing list
+                # Queue the send to the Not Closing list
                 product_list = ProductList.query.get(lead.product_list_id)
                 if product_list and product_list.mailketing_list_not_closing:
-                    settings_obj = Settings.query.first()
-                    if settings_obj and settings_obj.mailketing_api_key:
-                        is_bounced, _ = is_bounced_email(lead.email)
-                        if is_bounced:
-                            print(f"  🚫 Skipped Mailketing send for bounced email: {lead.email}")
-                        else:
-                            mailketing = MailketingService(settings_obj.mailketing_api_key)
-                            result = mailketing.add_subscriber(
-                                list_id=product_list.mailketing_list_not_closing,
-                                email=lead.email,
-                                first_name=lead.name,
-                                mobile=lead.phone
-                            )
-                            
-                            if result:
-                                lead_service.mark_sent_to_mailketing(lead, product_list.mailketing_list_not_closing)
-                                sent_to_mailketing_count += 1
-                                print(f"  ✓ Sent to Mailketing list: {product_list.mailketing_list_not_closing}")
-                            else:
-                                print(f"  ⚠️  Failed to send to Mailketing")
+                    sends.append((lead, product_list.mailketing_list_not_closing))
                 else:
-                    print(f"  ⚠️  No Not Closing list configured")
+                    logger.warning("⚠️  No Not Closing list configured for product list %s", lead.product_list_id,
+                                   extra={'lead_id': lead.id})
                 
             except Exception as e:
                 failed_count += 1
-                print(f"  ❌ Error processing lead {lead.id}: {str(e)}")
+                logger.exception("❌ Error processing lead %s: %s", lead.id, e)
+        
+        # Sends run concurrently, paced by the adaptive Mailketing limiter
+        logger.info("📧 Sending %s leads to Mailketing...", len(sends))
+        statuses = list(send_leads_to_mailketing(sends).values())
+        sent_to_mailketing_count = statuses.count('sent') + statuses.count('already_member')
+        for status in ('already_member', 'bounced', 'deferred', 'failed', 'error', 'skipped'):
+            if statuses.count(status):
+                logger.info("Mailketing %s: %s", status, statuses.count(status))
         
-        print(f"\n{'='*60}")
-        print(f"✅ Bulk Move Complete!")
-        print(f"   Successfully moved: {success_count}")
-        print(f"   Sent to Mailketing: {sent_to_mailketing_count}")
-        print(f"   Failed: {failed_count}")
-        print(f"{'='*60}\n")
+        logger.info("✅ Bulk move complete: %s moved, %s sent to Mailketing, %s failed",
+                    success_count, sent_to_mailketing_count, failed_count)
         
         # Show success message
         if success_count > 0:
@@ -658,11 +1227,7 @@ def bulk_move_expired_leads():
         return redirect(url_for('leads', status='follow_up'))
         
     except Exception as e:
-        print(f"\n{'!'*60}")
-        print(f"❌ ERROR in bulk move: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        print(f"{'!'*60}\n")
+        logger.exception("❌ Error in bulk move: %s", e)
         flash(f'❌ Error: {str(e)}', 'danger')
         return redirect(url_for('leads'))
 
@@ -680,447 +1245,462 @@ def test_move_to_not_closing(lead_id):
     try:
         lead_service = LeadService(db)
         
-        print(f"\n{'='*60}")
-        print(f"🧪 TEST: Moving lead to Not Closing")
-        print(f"Lead: {lead.email} - {lead.name}")
-        print(f"Product: {lead.product_list.product_name}")
-        print(f"{'='*60}\n")
+        logger.info("🧪 Test: moving %s (%s) to Not Closing", lead.email,
+                    lead.product_list.product_name if lead.product_list else None, extra={'lead_id': lead.id})
         
         # Move to not closing
         lead_service.move_to_not_closing(lead)
-        print(f"✓ Lead status changed to: not_closing")
         
         # Send to Not Closing list
         product_list = ProductList.query.get(lead.product_list_id)
         if product_list and product_list.mailketing_list_not_closing:
-            settings_obj = Settings.query.first()
-            if settings_obj and settings_obj.mailketing_api_key:
-                print(f"Sending to Not Closing List ID: {product_list.mailketing_list_not_closing}")
-                
-                is_bounced, _ = is_bounced_email(lead.email)
-                if is_bounced:
-                    print(f"🚫 Not sending to Mailketing because email is bounced")
-                    flash('🚫 Email ini tercatat bounce, tidak dikirim ke Mailketing', 'warning')
-                else:
-                    mailketing = MailketingService(settings_obj.mailketing_api_key)
-                    result = mailketing.add_subscriber(
-                        list_id=product_list.mailketing_list_not_closing,
-                        email=lead.email,
-                        first_name=lead.name,
-                        mobile=lead.phone
-                    )
-                    
-                    print(f"Mailketing API Response: {result}")
-                    
-                    if result:
-                        # Mark as sent with list ID
-                        lead_service.mark_sent_to_mailketing(lead, product_list.mailketing_list_not_closing)
-                        print(f"✓ Lead marked as sent to Mailketing")
-                        flash(f'✅ SUCCESS! Lead dipindahkan ke Not Closing dan berhasil dikirim ke Mailketing List {product_list.mailketing_list_not_closing}', 'success')
-                    else:
-                        print(f"⚠ Failed to send to Mailketing")
-                        flash(f'⚠ Lead dipindahkan ke Not Closing, tapi gagal dikirim ke Mailketing', 'warning')
-            else:
-                print(f"⚠ Mailketing API key not configured")
+            status = send_lead_to_mailketing(lead, product_list.mailketing_list_not_closing, lead_service)
+            log_mailketing_send(status, lead.email, f'Not Closing ({product_list.mailketing_list_not_closing})')
+            
+            if status == 'sent':
+                flash(f'✅ SUCCESS! Lead dipindahkan ke Not Closing dan berhasil dikirim ke Mailketing List {product_list.mailketing_list_not_closing}', 'success')
+            elif status == 'already_member':
+                flash(f'✅ Lead dipindahkan ke Not Closing (email sudah ada di Mailketing List {product_list.mailketing_list_not_closing})', 'success')
+            elif status == 'bounced':
+                flash('🚫 Email ini tercatat bounce, tidak dikirim ke Mailketing', 'warning')
+            elif status == 'deferred':
+                flash(f'⏸ Lead dipindahkan ke Not Closing; Mailketing sedang tidak tersedia, pengiriman akan dicoba ulang otomatis', 'warning')
+            elif status == 'no_api_key':
                 flash(f'⚠ Lead dipindahkan ke Not Closing, tapi Mailketing API key belum diatur', 'warning')
+            else:
+                flash(f'⚠ Lead dipindahkan ke Not Closing, tapi gagal dikirim ke Mailketing', 'warning')
         else:
-            print(f"⚠ No Not Closing List configured for this product")
+            logger.warning("⚠️  No Not Closing list configured for product list %s", lead.product_list_id,
+                           extra={'lead_id': lead.id})
             flash(f'⚠ Lead dipindahkan ke Not Closing, tapi product tidak punya Not Closing List', 'warning')
         
-        print(f"\n{'='*60}\n")
-        
     except Exception as e:
-        print(f"\n{'!'*60}")
-        print(f"❌ ERROR in test: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        print(f"{'!'*60}\n")
+        logger.exception("❌ Error in test move: %s", e)
         flash(f'❌ Error: {str(e)}', 'danger')
     
     return redirect(url_for('leads'))
 
 
+ORDER_CREATION_EVENTS = ('order.created', 'order.epayment_created', 'order.spam_created', 'order.updated')
+
+def scalev_event_lane(event_type):
+    """Dispatcher lane of a ScaleV event (see EventDispatcher.LANES)"""
+    if event_type == 'order.payment_status_changed':
+        return 'payment'
+    if event_type in ('order.created', 'order.epayment_created', 'order.spam_created'):
+        return 'creation'
+    # order.updated repeats earlier events; status changes and deletes are only logged
+    return 'debug'
+
+# Seconds a webhook waits for the ScaleV handler lookup before continuing without a handler
+HANDLER_LOOKUP_DEADLINE = 8
+
+# Seconds a webhook waits for its order event to be processed before answering 202
+WEBHOOK_SYNC_TIMEOUT = 20
+
+def start_handler_lookup(order_id, api_key):
+    """Resolve the order handler on the fetch pool while the webhook does local work"""
+    profile = request_profiler.current()
+    
+    def run():
+        with app.app_context(), webhook_stage_seconds.time(stage='scalev_fetch'), request_profiler.attach(profile):
+            return HandlerResolutionService(db, ScalevService(api_key)).resolve(order_id)
+    return handler_lookup_pool.submit(run)
+
+def wait_for_handler(handler_future, deadline):
+    """Result of start_handler_lookup(), or None once the deadline has passed"""
+    if handler_future is None:
+        return None
+    try:
+        return handler_future.result(timeout=max(0, deadline - time.monotonic()))
+    except FuturesTimeoutError:
+        logger.warning("⚠️  Handler lookup exceeded %ss, continuing without handler", HANDLER_LOOKUP_DEADLINE)
+    except Exception as e:
+        logger.error("❌ Error resolving order handler: %s", e)
+    return None
+
+def find_product_list_candidates(orderline):
+    """Active product lists for an orderline, returns (candidate_lists, matched_by)
+    
+    IMPORTANT: Can have MULTIPLE lists with same product but different CS
+    """
+    variant_sku = orderline.get('variant_sku') or None  # Convert empty string to None
+    product_name = orderline.get('product_name')
+    variant_unique_id = orderline.get('variant_unique_id')
+    candidate_lists = []
+    matched_by = None
+    
+    # Priority 1: Try matching by SKU (if available)
+    if variant_sku:
+        lists = ProductList.query.filter_by(product_id=variant_sku, is_active=True).all()
+        if lists:
+            candidate_lists.extend(lists)
+            matched_by = f"SKU: {variant_sku}"
+    
+    # Priority 2: Try matching by exact product name
+    if not candidate_lists and product_name:
+        lists = ProductList.query.filter_by(product_name=product_name, is_active=True).all()
+        if lists:
+            candidate_lists.extend(lists)
+            matched_by = f"Exact Product Name: {product_name}"
+    
+    # Priority 3: Try matching by product name (partial/variant match)
+    # This handles cases where webhook sends variant name like "Product - 100 ribu"
+    # but database has base product name like "Product"
+    if not candidate_lists and product_name:
+        # Get all active products and check if database name is contained in webhook name
+        all_products = ProductList.query.filter_by(is_active=True).all()
+        for p in all_products:
+            # Check if database product name is part of webhook product name
+            # AND database name is long enough to avoid false positives (min 5 chars)
+            if len(p.product_name) >= 5 and p.product_name in product_name:
+                candidate_lists.append(p)
+                matched_by = f"Partial Product Name: '{p.product_name}' found in '{product_name}'"
+    
+    # Priority 4: Try matching by variant_unique_id
+    if not candidate_lists and variant_unique_id:
+        lists = ProductList.query.filter_by(product_id=variant_unique_id, is_active=True).all()
+        if lists:
+            candidate_lists.extend(lists)
+            matched_by = f"Variant ID: {variant_unique_id}"
+    
+    return candidate_lists, matched_by
+
+def match_product_list_for_handler(candidate_lists, handler_id, handler_email, handler_name):
+    """First candidate list that is for all sales or whose CS matches the handler
+    
+    The handler is matched by ID, email or name in one indexed query over
+    product_list_sales_person; only lists without link rows are matched
+    against their JSON columns.
+    """
+    serving = SalesPersonService(db).product_lists_serving(
+        [pl.id for pl in candidate_lists], handler_id, handler_email, handler_name
+    )
+    
+    for pl in candidate_lists:
+        if pl.id not in serving:
+            if verbose(logger):
+                logger.debug("📋 Product List #%s (%s): CS not matched, required %s", pl.id, pl.product_name,
+                             ', '.join(name or '-' for name in pl.get_sales_person_names_list()))
+            continue
+        
+        if pl.is_for_all_sales():
+            logger.debug("📋 Product List #%s (%s): for ALL SALES PERSONS", pl.id, pl.product_name)
+        else:
+            logger.debug("📋 Product List #%s (%s): CS MATCHED (handler %s)", pl.id, pl.product_name,
+                         handler_id or handler_email or handler_name)
+        return pl
+    
+    return None
+
+def process_scalev_order_event(event_type, data, handler_future=None, started_at=None):
+    """Apply one ScaleV order event (runs on an event dispatcher worker)"""
+    settings_obj = Settings.query.first()
+    order_id = data.get('order_id')
+    started_at = started_at or time.monotonic()
+    
+    lead_service = LeadService(db)
+    
+    # Handle different event types
+    if event_type in ORDER_CREATION_EVENTS:
+        # New order - add to follow up
+        # Extract product info from orderlines
+        orderlines = data.get('orderlines', [])
+        if not orderlines:
+            logger.warning("No orderlines in payload", extra={'event': event_type, 'order_id': order_id})
+            return jsonify({'success': False, 'error': 'No orderlines'}), 400
+        
+        # Get first product (main product)
+        first_line = orderlines[0]
+        product_name = first_line.get('product_name')
+        
+        logger.debug("Product: %s (SKU: %s, variant ID: %s)", product_name,
+                     first_line.get('variant_sku') or 'Not available', first_line.get('variant_unique_id'))
+        
+        if not settings_obj.scalev_api_key:
+            logger.error("❌ ScaleV API key not configured")
+            return jsonify({'success': False, 'error': 'ScaleV API key not configured'}), 500
+        
+        # Stage 3: local lookups while the handler request is in flight
+        stage_started = time.perf_counter()
+        candidate_lists, matched_by = find_product_list_candidates(first_line)
+        existing_lead = Lead.query.filter_by(order_id=str(order_id)).first()
+        matching_seconds = time.perf_counter() - stage_started
+        
+        # Stage 4: handler (webhook payload doesn't have handler info)
+        with webhook_stage_seconds.time(stage='handler_wait'):
+            handler = wait_for_handler(handler_future, started_at + HANDLER_LOOKUP_DEADLINE)
+        handler_email = handler.get('email') if handler else None
+        handler_name = handler.get('fullname') if handler else None
+        handler_id = handler.get('id') if handler else None
+        if handler:
+            logger.debug("✓ Handler: %s (%s, ID: %s)", handler_name, handler_email, handler_id)
+        else:
+            logger.warning("⚠️  No handler for order %s", order_id)
+        
+        if not candidate_lists:
+            webhook_stage_seconds.observe(matching_seconds, stage='matching')
+            logger.warning("❌ No product list found for product: %s (create a product list first)", product_name,
+                           extra={'order_id': order_id})
+            return jsonify({'success': False, 'error': 'Product not configured'}), 404
+        
+        logger.debug("✓ Found %s product list(s) matching by %s", len(candidate_lists), matched_by)
+        
+        # Now find which product list matches the handler (CS)
+        stage_started = time.perf_counter()
+        product_list = match_product_list_for_handler(candidate_lists, handler_id, handler_email, handler_name)
+        webhook_stage_seconds.observe(matching_seconds + time.perf_counter() - stage_started, stage='matching')
+        
+        if not product_list:
+            logger.warning("❌ No product list matched handler %s (%s, ID: %s) among %s list(s) for %s, skipping lead creation",
+                           handler_name, handler_email, handler_id, len(candidate_lists), product_name,
+                           extra={'order_id': order_id})
+            return jsonify({'success': True, 'message': 'No product list matched handler'}), 200
+        
+        logger.debug("✅ Using Product List #%s - %s", product_list.id, product_list.product_name)
+        
+        # Extract customer info from destination_address
+        destination = data.get('destination_address', {})
+        customer_name = destination.get('name')
+        customer_email = destination.get('email')
+        customer_phone = destination.get('phone')
+        
+        # Validate required fields
+        if not customer_email or not customer_name:
+            logger.warning("Missing required customer data (name: %s, email: %s)", customer_name, customer_email,
+                           extra={'order_id': order_id})
+            return jsonify({'success': False, 'error': 'Missing customer data'}), 400
+        
+        if existing_lead:
+            logger.info("Lead already exists for order %s, skipping creation", order_id)
+            with webhook_stage_seconds.time(stage='db_write'):
+                if HandlerResolutionService(db).store_on_lead(existing_lead, handler):
+                    logger.info("✓ Handler updated on lead: %s", handler_name, extra={'order_id': order_id})
+            apply_pending_order_events(existing_lead, lead_service)
+        else:
+            # Create lead
+            try:
+                with webhook_stage_seconds.time(stage='db_write'):
+                    lead = lead_service.create_lead(
+                        product_list_id=product_list.id,
+                        order_id=order_id,
+                        name=customer_name,
+                        email=customer_email,
+                        phone=customer_phone,
+                        order_data=data,
+                        sales_person_name=handler_name,
+                        sales_person_email=handler_email,
+                        sales_person_id=handler_id
+                    )
+                logger.info("✓ Lead created: %s", lead.email,
+                            extra={'order_id': order_id, 'lead_id': lead.id, 'product_list_id': product_list.id})
+                
+                # Send to Follow Up list immediately
+                if product_list.mailketing_list_followup:
+                    try:
+                        with webhook_stage_seconds.time(stage='mailketing_send'):
+                            status = send_lead_to_mailketing(lead, product_list.mailketing_list_followup, lead_service)
+                        log_mailketing_send(status, lead.email, 'Follow Up')
+                    except Exception as e:
+                        logger.error("❌ Error sending to Mailketing: %s", e, extra={'lead_id': lead.id})
+                else:
+                    logger.warning("⚠️  No Follow Up list configured for product list #%s", product_list.id)
+            except Exception as e:
+                logger.exception("Failed to create lead: %s", e, extra={'order_id': order_id})
+                return jsonify({'success': False, 'error': str(e)}), 500
+            
+            # Events that arrived before order.created (e.g. payment)
+            apply_pending_order_events(lead, lead_service)
+    
+    elif event_type == 'order.payment_status_changed':
+        # Order payment status changed
+        payment_status = data.get('payment_status')
+        logger.info("Payment status: %s for order: %s", payment_status, order_id)
+        
+        if payment_status == 'paid':
+            lead = Lead.query.filter_by(order_id=str(order_id)).first()
+            if lead:
+                handle_order_paid(lead, lead_service)
+            else:
+                # order.created not processed yet: replay when the lead is created
+                OrderEventService(db).park(order_id, event_type, data)
+                logger.info("⏸  No lead yet for order %s, payment event parked", order_id)
+    
+    elif event_type == 'order.status_changed':
+        # Order status changed (canceled, closed, etc)
+        status = data.get('status')
+        logger.info("Order status changed to '%s' for order: %s", status, order_id)
+        # You can handle canceled/closed orders here if needed
+    
+    elif event_type == 'order.deleted':
+        # Order deleted
+        logger.info("Order deleted: %s", order_id)
+        # You can handle deleted orders here if needed
+    
+    else:
+        # Other events or unknown events
+        logger.info("Event: %s (unhandled)", event_type)
+        if verbose(logger):
+            logger.debug("Available data keys: %s", list(data.keys()))
+    
+    return jsonify({'success': True}), 200
+
+def handle_order_paid(lead, lead_service):
+    """Move a follow-up lead to closing and add it to the Closing list"""
+    if lead.status != 'follow_up':
+        logger.info("Lead already in status: %s", lead.status, extra={'lead_id': lead.id})
+        return False
+    
+    with webhook_stage_seconds.time(stage='db_write'):
+        lead_service.move_to_closing(lead)
+    logger.info("✓ Lead moved to closing: %s", lead.email, extra={'lead_id': lead.id, 'order_id': lead.order_id})
+    
+    # Send to Closing list
+    product_list = lead.product_list
+    if product_list.mailketing_list_closing:
+        try:
+            with webhook_stage_seconds.time(stage='mailketing_send'):
+                status = send_lead_to_mailketing(lead, product_list.mailketing_list_closing, lead_service)
+            log_mailketing_send(status, lead.email, 'Closing')
+        except Exception as e:
+            logger.error("❌ Error sending to Mailketing: %s", e, extra={'lead_id': lead.id})
+    else:
+        logger.warning("⚠️  No Closing list configured for product list #%s", product_list.id)
+    return True
+
+def apply_pending_order_events(lead, lead_service):
+    """Replay parked events of the lead's order in arrival order"""
+    order_events = OrderEventService(db)
+    pending = order_events.get_pending(lead.order_id)
+    for event in pending:
+        data = json.loads(event.data) if event.data else {}
+        logger.info("▶  Replaying parked %s for order %s", event.event_type, lead.order_id)
+        if event.event_type == 'order.payment_status_changed' and data.get('payment_status') == 'paid':
+            handle_order_paid(lead, lead_service)
+        order_events.mark_applied(event)
+    return len(pending)
+
 @app.route('/webhook/scalev', methods=['POST'])
+@sampled_event()
+@admission_controlled('scalev')
 def scalev_webhook():
-    """Scalev webhook endpoint"""
+    """Scalev webhook endpoint
+    
+    Stages: parse, verify the signature, start the ScaleV handler lookup, then
+    (concurrently with it) find product list candidates and the existing lead.
+    The lookup only starts once the request passed the signature check.
+    The handler is only awaited for CS matching, up to HANDLER_LOOKUP_DEADLINE.
+    Events are processed on the dispatcher lane of their type (payments
+    first), one at a time per order_id; if that takes longer than
+    WEBHOOK_SYNC_TIMEOUT the webhook answers 202 and processing continues in
+    the background.
+    """
     try:
+        started_at = time.monotonic()
+        
         # Get webhook secret from settings
         settings_obj = Settings.query.first()
         if not settings_obj or not settings_obj.scalev_webhook_secret:
-            print("WARNING: Webhook secret not configured!")
+            logger.warning("Webhook secret not configured!")
             return jsonify({'error': 'Webhook secret not configured'}), 500
         
-        # Verify webhook signature (REQUIRED for security)
+        # Stage 1: parse the payload
+        raw_payload = request.get_data()
+        payload = request.get_json(silent=True) or {}
+        
+        # Get event type and data
+        event_type = payload.get('event')
+        data = payload.get('data', {})
+        order_id = data.get('order_id')
+        g.webhook_event = event_type
+        g.webhook_started_at = started_at
+        
+        # Stage 2: verify webhook signature (REQUIRED for security)
         signature = request.headers.get('X-Scalev-Signature')
-        payload = request.get_data()
         
         if signature:
             # Verify signature according to Scalev docs
-            expected_signature = hmac.new(
-                settings_obj.scalev_webhook_secret.encode(),
-                payload,
-                hashlib.sha256
-            ).hexdigest()
+            with webhook_stage_seconds.time(stage='signature'):
+                expected_signature = hmac.new(
+                    settings_obj.scalev_webhook_secret.encode(),
+                    raw_payload,
+                    hashlib.sha256
+                ).hexdigest()
+                signature_valid = hmac.compare_digest(signature, expected_signature)
             
-            if not hmac.compare_digest(signature, expected_signature):
-                print(f"ERROR: Invalid webhook signature!")
+            if not signature_valid:
+                logger.error("Invalid webhook signature!", extra={'event': event_type, 'order_id': order_id})
                 return jsonify({'error': 'Invalid signature'}), 401
         else:
-            print("WARNING: No signature provided in webhook request")
+            logger.warning("No signature provided in webhook request")
             # In production, you should reject requests without signature
             # For development, we'll allow it
             # return jsonify({'error': 'No signature provided'}), 401
         
-        # Process webhook
-        payload = request.json
+        # Start the remote handler lookup for every request that was not rejected,
+        # so forged signatures never reach ScaleV or the handler cache
+        handler_future = None
+        if event_type in ORDER_CREATION_EVENTS and order_id and settings_obj.scalev_api_key:
+            handler_future = start_handler_lookup(order_id, settings_obj.scalev_api_key)
         
-        # Get event type and data
-        event_type = payload.get('event')
-        data = payload.get('data', {})
-        
-        print(f"\n{'='*60}")
-        print(f"Webhook received: {event_type}")
-        print(f"Unique ID: {payload.get('unique_id')}")
-        print(f"Timestamp: {payload.get('timestamp')}")
-        print(f"{'='*60}\n")
+        logger.info("Webhook received: %s", event_type, extra={
+            'order_id': order_id, 'unique_id': payload.get('unique_id'), 'timestamp': payload.get('timestamp')
+        })
         
         # Check if this is a test event
         if event_type == 'business.test_event':
-            print("✓ Test event received - webhook is working!")
+            logger.info("✓ Test event received - webhook is working!")
             return jsonify({'success': True, 'message': 'Test event received'}), 200
         
-        # Get order_id
-        order_id = data.get('order_id')
-        print(f"Order ID: {order_id}")
-        
-        # Debug: Print all available fields in data (to discover handler/CS fields)
-        print(f"\n📋 Available fields in payload data:")
-        for key in data.keys():
-            print(f"  - {key}")
-        
-        # Check for potential handler/CS fields
-        handler_fields = ['handler', 'assigned_to', 'sales_person', 'created_by', 'user', 'employee', 'staff']
-        found_handlers = []
-        for field in handler_fields:
-            if field in data:
-                found_handlers.append(f"{field}: {data.get(field)}")
-        
-        if found_handlers:
-            print(f"\n👤 Handler/CS fields found:")
-            for h in found_handlers:
-                print(f"  ✓ {h}")
-        else:
-            print(f"\n⚠️  No handler/CS fields found in standard field names")
-            print(f"   Checked: {', '.join(handler_fields)}")
-        print("")
-        
-        lead_service = LeadService(db)
-        
-        # Handle different event types
-        if event_type in ['order.created', 'order.epayment_created', 'order.spam_created', 'order.updated']:
-            # New order - add to follow up
-            print(f"Event: {event_type}")
-            
-            # Extract product info from orderlines
-            orderlines = data.get('orderlines', [])
-            if not orderlines:
-                print("WARNING: No orderlines in payload")
-                return jsonify({'success': False, 'error': 'No orderlines'}), 400
-            
-            # Get first product (main product)
-            first_line = orderlines[0]
-            variant_sku = first_line.get('variant_sku') or None  # Convert empty string to None
-            product_name = first_line.get('product_name')
-            variant_unique_id = first_line.get('variant_unique_id')
-            
-            print(f"Product: {product_name}")
-            print(f"  - SKU: {variant_sku if variant_sku else 'Not available'}")
-            print(f"  - Variant ID: {variant_unique_id}")
-            
-            # Get handler from ScaleV API (webhook payload doesn't have handler info)
-            print(f"\n🔍 Fetching order details from ScaleV API...")
-            handler_email = None
-            handler_name = None
-            handler_id = None
-            
-            try:
-                settings_obj = Settings.query.first()
-                if not settings_obj or not settings_obj.scalev_api_key:
-                    print(f"❌ ScaleV API key not configured")
-                    return jsonify({'success': False, 'error': 'ScaleV API key not configured'}), 500
-                
-                import requests
-                api_url = f"https://api.scalev.id/v2/order/{order_id}"
-                headers = {
-                    'Authorization': f'Bearer {settings_obj.scalev_api_key}',
-                    'Content-Type': 'application/json'
-                }
-                
-                response = requests.get(api_url, headers=headers, timeout=10)
-                
-                if response.status_code == 200:
-                    order_detail = response.json()
-                    handler_data = order_detail.get('data', {}).get('handler', {})
-                    
-                    if handler_data:
-                        handler_email = handler_data.get('email')
-                        handler_name = handler_data.get('fullname')
-                        handler_id = str(handler_data.get('id', ''))
-                        print(f"✓ Got handler from API: {handler_name} ({handler_email}, ID: {handler_id})")
-                    else:
-                        print(f"⚠️  No handler data in API response")
-                else:
-                    print(f"⚠️  API request failed: {response.status_code}")
-                    print(f"   Response: {response.text[:200]}")
-            except Exception as e:
-                print(f"❌ Error calling ScaleV API: {str(e)}")
-                # Continue without handler info
-                pass
-            
-            # Try to match product list by SKU, product name, or variant_unique_id
-            # IMPORTANT: Can have MULTIPLE lists with same product but different CS
-            candidate_lists = []
-            matched_by = None
-            
-            # Priority 1: Try matching by SKU (if available)
-            if variant_sku:
-                lists = ProductList.query.filter_by(product_id=variant_sku, is_active=True).all()
-                if lists:
-                    candidate_lists.extend(lists)
-                    matched_by = f"SKU: {variant_sku}"
-            
-            # Priority 2: Try matching by exact product name
-            if not candidate_lists and product_name:
-                lists = ProductList.query.filter_by(product_name=product_name, is_active=True).all()
-                if lists:
-                    candidate_lists.extend(lists)
-                    matched_by = f"Exact Product Name: {product_name}"
-            
-            # Priority 3: Try matching by product name (partial/variant match)
-            # This handles cases where webhook sends variant name like "Product - 100 ribu"
-            # but database has base product name like "Product"
-            if not candidate_lists and product_name:
-                # Get all active products and check if database name is contained in webhook name
-                all_products = ProductList.query.filter_by(is_active=True).all()
-                for p in all_products:
-                    # Check if database product name is part of webhook product name
-                    # AND database name is long enough to avoid false positives (min 5 chars)
-                    if len(p.product_name) >= 5 and p.product_name in product_name:
-                        candidate_lists.append(p)
-                        matched_by = f"Partial Product Name: '{p.product_name}' found in '{product_name}'"
-            
-            # Priority 4: Try matching by variant_unique_id
-            if not candidate_lists and variant_unique_id:
-                lists = ProductList.query.filter_by(product_id=variant_unique_id, is_active=True).all()
-                if lists:
-                    candidate_lists.extend(lists)
-                    matched_by = f"Variant ID: {variant_unique_id}"
-            
-            if not candidate_lists:
-                print(f"❌ No product list found for product: {product_name}")
-                print(f"   Please create a product list in the system first.")
-                return jsonify({'success': False, 'error': 'Product not configured'}), 404
-            
-            print(f"\n✓ Found {len(candidate_lists)} product list(s) matching by {matched_by}")
-            
-            # Now find which product list matches the handler (CS)
-            product_list = None
-            
-            for pl in candidate_lists:
-                print(f"\n📋 Checking Product List #{pl.id}:")
-                print(f"   Product: {pl.product_name}")
-                
-                # Check if this list is for all sales or specific CS
-                if pl.is_for_all_sales():
-                    print(f"   ✓ List is for ALL SALES PERSONS")
-                    product_list = pl
-                    break
-                else:
-                    sales_names = pl.get_sales_person_names_list()
-                    sales_ids = pl.get_sales_person_ids_list()
-                    sales_emails = pl.get_sales_person_emails_list()
-                    print(f"   CS Required: {', '.join(sales_names)}")
-                    
-                    # Check if handler matches this list's CS
-                    is_matched = False
-                    
-                    # Try matching by ID first (most reliable)
-                    if handler_id and str(handler_id) in [str(sid) for sid in sales_ids]:
-                        is_matched = True
-                        print(f"   ✓ Handler matched by ID: {handler_id}")
-                    
-                    # Fallback: Try matching by email
-                    if not is_matched and handler_email:
-                        for sales_email in sales_emails:
-                            if sales_email and handler_email.lower() == sales_email.lower():
-                                is_matched = True
-                                print(f"   ✓ Handler matched by email: {handler_email}")
-                                break
-                    
-                    # Fallback: Try matching by name (less reliable)
-                    if not is_matched and handler_name:
-                        for sales_name in sales_names:
-                            if sales_name and handler_name.lower() == sales_name.lower():
-                                is_matched = True
-                                print(f"   ✓ Handler matched by name: {handler_name}")
-                                break
-                    
-                    if is_matched:
-                        print(f"   ✓ CS MATCHED! Using this product list.")
-                        product_list = pl
-                        break
-                    else:
-                        print(f"   ✗ CS not matched, trying next list...")
-            
-            if not product_list:
-                print(f"\n❌ No product list matched for handler!")
-                print(f"   Product: {product_name}")
-                print(f"   Handler: {handler_name} ({handler_email}, ID: {handler_id})")
-                print(f"   Found {len(candidate_lists)} product list(s) but none matched the handler.")
-                print(f"   → Skipping lead creation")
-                return jsonify({'success': True, 'message': 'No product list matched handler'}), 200
-            
-            print(f"\n✅ FINAL: Using Product List #{product_list.id} - {product_list.product_name}")
-            
-            # Extract customer info from destination_address
-            destination = data.get('destination_address', {})
-            customer_name = destination.get('name')
-            customer_email = destination.get('email')
-            customer_phone = destination.get('phone')
-            
-            print(f"Customer: {customer_name} ({customer_email}, {customer_phone})")
-            
-            # Validate required fields
-            if not customer_email or not customer_name:
-                print(f"ERROR: Missing required customer data (name: {customer_name}, email: {customer_email})")
-                return jsonify({'success': False, 'error': 'Missing customer data'}), 400
-            
-            # Check if lead already exists
-            existing_lead = Lead.query.filter_by(order_id=str(order_id)).first()
-            if existing_lead:
-                print(f"INFO: Lead already exists for order {order_id}, skipping creation")
+        # Debug: available fields in data (to discover handler/CS fields), sampled events only
+        if verbose(logger):
+            handler_fields = ['handler', 'assigned_to', 'sales_person', 'created_by', 'user', 'employee', 'staff']
+            found_handlers = [f"{field}: {data.get(field)}" for field in handler_fields if field in data]
+            logger.debug("📋 Available fields in payload data: %s", ', '.join(data.keys()))
+            if found_handlers:
+                logger.debug("👤 Handler/CS fields found: %s", '; '.join(found_handlers))
             else:
-                # Create lead
-                try:
-                    lead = lead_service.create_lead(
-                        product_list_id=product_list.id,
-                        order_id=order_id,
-                        name=customer_name,
-                        email=customer_email,
-                        phone=customer_phone,
-                        order_data=data,
-                        sales_person_name=handler_name,
-                        sales_person_email=handler_email
-                    )
-                    print(f"✓ Lead created: {lead.email} - {lead.name}")
-                    
-                    # Send to Follow Up list immediately
-                    if product_list.mailketing_list_followup:
-                        print(f"\n📧 Sending to Follow Up list: {product_list.mailketing_list_followup}")
-                        try:
-                            settings_obj = Settings.query.first()
-                            if settings_obj and settings_obj.mailketing_api_key:
-                                is_bounced, _ = is_bounced_email(lead.email)
-                                if is_bounced:
-                                    print(f"   🚫 Not sending to Follow Up list because email is bounced")
-                                else:
-                                    mailketing = MailketingService(settings_obj.mailketing_api_key)
-                                    result = mailketing.add_subscriber(
-                                        list_id=product_list.mailketing_list_followup,
-                                        email=lead.email,
-                                        first_name=lead.name,
-                                        mobile=lead.phone
-                                    )
-                                    if result:
-                                        lead_service.mark_sent_to_mailketing(lead, product_list.mailketing_list_followup)
-                                        print(f"   ✓ Subscriber added to Follow Up list")
-                                    else:
-                                        print(f"   ⚠️  Failed to add subscriber to Follow Up list")
-                            else:
-                                print(f"   ⚠️  Mailketing API key not configured")
-                        except Exception as e:
-                            print(f"   ❌ Error sending to Mailketing: {str(e)}")
-                    else:
-                        print(f"⚠️  No Follow Up list configured for this product")
-                except Exception as e:
-                    print(f"ERROR: Failed to create lead: {str(e)}")
-                    return jsonify({'success': False, 'error': str(e)}), 500
-        
-        elif event_type == 'order.payment_status_changed':
-            # Order payment status changed
-            print(f"Event: {event_type}")
-            payment_status = data.get('payment_status')
-            print(f"Payment status: {payment_status} for order: {order_id}")
-            
-            if payment_status == 'paid':
-                lead = Lead.query.filter_by(order_id=str(order_id)).first()
-                if lead:
-                    if lead.status == 'follow_up':
-                        lead_service.move_to_closing(lead)
-                        print(f"✓ Lead moved to closing: {lead.email}")
-                        
-                        # Send to Closing list
-                        product_list = lead.product_list
-                        if product_list.mailketing_list_closing:
-                            print(f"\n📧 Sending to Closing list: {product_list.mailketing_list_closing}")
-                            try:
-                                settings_obj = Settings.query.first()
-                                if settings_obj and settings_obj.mailketing_api_key:
-                                    is_bounced, _ = is_bounced_email(lead.email)
-                                    if is_bounced:
-                                        print(f"   🚫 Not sending to Closing list because email is bounced")
-                                    else:
-                                        mailketing = MailketingService(settings_obj.mailketing_api_key)
-                                        result = mailketing.add_subscriber(
-                                            list_id=product_list.mailketing_list_closing,
-                                            email=lead.email,
-                                            first_name=lead.name,
-                                            mobile=lead.phone
-                                        )
-                                        if result:
-                                            lead_service.mark_sent_to_mailketing(lead, product_list.mailketing_list_closing)
-                                            print(f"   ✓ Subscriber added to Closing list")
-                                        else:
-                                            print(f"   ⚠️  Failed to add subscriber to Closing list")
-                                else:
-                                    print(f"   ⚠️  Mailketing API key not configured")
-                            except Exception as e:
-                                print(f"   ❌ Error sending to Mailketing: {str(e)}")
-                        else:
-                            print(f"⚠️  No Closing list configured for this product")
-                    else:
-                        print(f"Lead already in status: {lead.status}")
-                else:
-                    print(f"WARNING: No lead found for order_id: {order_id}")
+                logger.debug("⚠️  No handler/CS fields found in standard field names (checked: %s)", ', '.join(handler_fields))
         
-        elif event_type == 'order.status_changed':
-            # Order status changed (canceled, closed, etc)
-            status = data.get('status')
-            print(f"Event: {event_type}")
-            print(f"Order status changed to '{status}' for order: {order_id}")
-            # You can handle canceled/closed orders here if needed
+        if not order_id:
+            return process_scalev_order_event(event_type, data)
         
-        elif event_type == 'order.deleted':
-            # Order deleted
-            print(f"Event: {event_type}")
-            print(f"Order deleted: {order_id}")
-            # You can handle deleted orders here if needed
+        # Events of the same order are processed one at a time, in arrival order
+        sampled = is_sampled()
+        profile = request_profiler.current()
         
-        else:
-            # Other events or unknown events
-            print(f"Event: {event_type} (unhandled)")
-            print(f"Available data keys: {list(data.keys())}")
+        def run():
+            with app.app_context(), query_stats.scope(f'event:{event_type}'), sampled_event(sampled), \
+                    request_profiler.attach(profile):
+                return process_scalev_order_event(event_type, data, handler_future, started_at)
         
-        return jsonify({'success': True}), 200
+        future = event_dispatcher.submit(scalev_event_lane(event_type), str(order_id), run)
+        try:
+            return future.result(timeout=WEBHOOK_SYNC_TIMEOUT)
+        except FuturesTimeoutError:
+            # Still queued behind other events of this order; it will be processed in the background
+            logger.info("⏳ Order %s event queued, responding 202", order_id)
+            return jsonify({'success': True, 'queued': True}), 202
     
     except Exception as e:
-        print(f"\n{'!'*60}")
-        print(f"WEBHOOK ERROR: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        print(f"{'!'*60}\n")
+        logger.exception("WEBHOOK ERROR: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
+KNOWN_SCALEV_EVENTS = ORDER_CREATION_EVENTS + (
+    'order.payment_status_changed', 'order.status_changed', 'order.deleted', 'business.test_event'
+)
+
+@app.after_request
+def record_webhook_metrics(response):
+    """Count ScaleV webhooks by event type and status, and time the whole request"""
+    if request.endpoint == 'scalev_webhook':
+        event_type = g.get('webhook_event')
+        event_label = event_type if event_type in KNOWN_SCALEV_EVENTS else 'other'
+        webhook_events_total.inc(event=event_label, status=response.status_code)
+        if 'webhook_started_at' in g:
+            webhook_seconds.observe(time.monotonic() - g.webhook_started_at, event=event_label)
+    return response
+
 @app.route('/api/test-mailketing', methods=['POST'])
 @login_required
 def test_mailketing():
@@ -1131,12 +1711,26 @@ def test_mailketing():
         return jsonify({'success': False, 'message': 'Mailketing API key not configured'}), 400
     
     try:
-        mailketing = MailketingService(settings_obj.mailketing_api_key)
-        lists = mailketing.get_all_lists()
+        # A connection test always calls Mailketing; the result also refreshes the list cache
+        lists = MailketingListCacheService(db, settings_obj.mailketing_api_key).refresh('lists')
         return jsonify({'success': True, 'lists_count': len(lists), 'lists': lists})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
+@app.route('/api/mailketing/lists/refresh', methods=['POST'])
+@login_required
+def refresh_mailketing_lists():
+    """Invalidate the cached Mailketing lists and refresh them in the background"""
+    settings_obj = Settings.query.first()
+    
+    if not settings_obj or not settings_obj.mailketing_api_key:
+        return jsonify({'success': False, 'message': 'Mailketing API key not configured'}), 400
+    
+    list_cache = MailketingListCacheService(db, settings_obj.mailketing_api_key)
+    list_cache.invalidate()
+    started = list_cache.refresh_in_background(app)
+    return jsonify({'success': True, 'started': started})
+
 @app.route('/api/test-scalev', methods=['POST'])
 @login_required
 def test_scalev():
@@ -1153,65 +1747,228 @@ def test_scalev():
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
+def get_select2_paging():
+    """Read Select2 'page' and 'page_size' query params (page_size capped at 100)"""
+    page = max(1, request.args.get('page', 1, type=int) or 1)
+    page_size = request.args.get('page_size', 25, type=int) or 25
+    return page, min(max(page_size, 1), 100)
+
 @app.route('/api/scalev/stores', methods=['GET'])
 @login_required
 def get_scalev_stores():
-    """Get all ScaleV stores with optional search"""
+    """Get ScaleV stores from the local catalog mirror (Select2: q, page, page_size)"""
     settings_obj = Settings.query.first()
     
     if not settings_obj or not settings_obj.scalev_api_key:
         return jsonify({'success': False, 'message': 'ScaleV API key not configured'}), 400
     
-    try:
-        scalev = ScalevService(settings_obj.scalev_api_key)
-        stores = scalev.get_stores()
-        
-        # Filter based on search query (for Select2 search)
-        search_term = request.args.get('q', '').lower()
-        if search_term:
-            stores = [s for s in stores if search_term in s.get('name', '').lower() or search_term in str(s.get('id', ''))]
-        
-        return jsonify({'success': True, 'stores': stores})
-    except Exception as e:
-        return jsonify({'success': False, 'message': str(e)}), 400
+    catalog = CatalogSyncService(db)
+    if catalog.is_stale('stores'):
+        sync_catalog_in_background()
+    
+    page, page_size = get_select2_paging()
+    stores, more = catalog.search_stores(request.args.get('q', ''), page=page, page_size=page_size)
+    state = catalog.get_state('stores')
+    return jsonify({
+        'success': True,
+        'stores': stores,
+        'pagination': {'more': more},
+        'syncing': catalog_sync_runner.is_running('stores'),
+        'synced_at': state.completed_at.isoformat() if state and state.completed_at else None
+    })
 
 @app.route('/api/scalev/stores/<store_id>/products', methods=['GET'])
 @login_required
 def get_scalev_store_products(store_id):
-    """Get products from a specific store"""
+    """Get products of a store from the local catalog mirror (Select2: q, page, page_size)"""
     settings_obj = Settings.query.first()
     
     if not settings_obj or not settings_obj.scalev_api_key:
         return jsonify({'success': False, 'message': 'ScaleV API key not configured'}), 400
     
-    try:
-        scalev = ScalevService(settings_obj.scalev_api_key)
-        products = scalev.get_store_products(store_id)
-        return jsonify({'success': True, 'products': products})
-    except Exception as e:
-        return jsonify({'success': False, 'message': str(e)}), 400
+    catalog = CatalogSyncService(db)
+    if catalog.is_store_stale(store_id):
+        sync_catalog_in_background(store_id)
+    
+    page, page_size = get_select2_paging()
+    products, more = catalog.search_products(store_id, request.args.get('q', ''), page=page, page_size=page_size)
+    return jsonify({
+        'success': True,
+        'products': products,
+        'pagination': {'more': more},
+        'syncing': catalog_sync_runner.is_running(f'store:{store_id}')
+    })
 
 @app.route('/api/scalev/stores/<store_id>/sales-people', methods=['GET'])
 @login_required
 def get_scalev_store_sales_people(store_id):
-    """Get sales people from a specific store"""
+    """Get sales people of a store from the local catalog mirror (Select2: q, page, page_size)"""
     settings_obj = Settings.query.first()
     
     if not settings_obj or not settings_obj.scalev_api_key:
         return jsonify({'success': False, 'message': 'ScaleV API key not configured'}), 400
     
+    catalog = CatalogSyncService(db)
+    if catalog.is_store_stale(store_id):
+        sync_catalog_in_background(store_id)
+    
+    page, page_size = get_select2_paging()
+    sales_people, more = catalog.search_sales_people(store_id, request.args.get('q', ''), page=page, page_size=page_size)
+    return jsonify({
+        'success': True,
+        'sales_people': sales_people,
+        'pagination': {'more': more},
+        'syncing': catalog_sync_runner.is_running(f'store:{store_id}')
+    })
+
+@app.route('/api/scalev/catalog/sync', methods=['POST'])
+@login_required
+def sync_scalev_catalog_now():
+    """Start a full background sync of stores (or one store's products/sales people)"""
+    store_id = request.args.get('store_id')
+    started = sync_catalog_in_background(store_id, full=True)
+    return jsonify({'success': True, 'started': started})
+
+@app.route('/api/product-lists/<int:list_id>/resync', methods=['GET', 'POST'])
+@login_required
+def resync_product_list(list_id):
+    """Dry-run counts (GET or dry_run=1) or start re-sync jobs for a product list's Mailketing lists"""
+    product_list = ProductList.query.get_or_404(list_id)
+    resync = ResyncService(db)
+    data = request.get_json(silent=True) or request.form
+    requested = data.get('lists') if request.is_json else request.values.getlist('lists')
+    fields = [f for f in (requested or []) if f in resync.LIST_STATUSES] or None
+    
+    if request.method == 'GET' or str(data.get('dry_run', '')).lower() in ('1', 'true'):
+        return jsonify({'success': True, 'dry_run': True, 'lists': resync.dry_run(product_list, fields)})
+    
+    jobs = []
+    for field in fields or resync.LIST_STATUSES:
+        if getattr(product_list, field):
+            job = resync.create_job(product_list, field)
+            start_resync_job(job)
+            jobs.append(resync_job_to_dict(job))
+    return jsonify({'success': True, 'jobs': jobs})
+
+@app.route('/api/resync-jobs', methods=['GET'])
+@login_required
+def list_resync_jobs():
+    limit = min(request.args.get('limit', 10, type=int), 100)
+    return jsonify({'success': True, 'jobs': [resync_job_to_dict(job) for job in ResyncService(db).get_recent(limit)]})
+
+@app.route('/api/resync-jobs/<int:job_id>', methods=['GET'])
+@login_required
+def get_resync_job(job_id):
+    return jsonify({'success': True, 'job': resync_job_to_dict(ResyncJob.query.get_or_404(job_id))})
+
+@app.route('/api/resync-jobs/<int:job_id>/<action>', methods=['POST'])
+@login_required
+def control_resync_job(job_id, action):
+    """Pause or resume a re-sync job"""
+    job = ResyncJob.query.get_or_404(job_id)
+    resync = ResyncService(db)
+    if action == 'pause':
+        changed = resync.pause(job)
+    elif action == 'resume':
+        changed = resync.resume(job)
+        if changed:
+            start_resync_job(job)
+    else:
+        return jsonify({'success': False, 'message': f'Unknown action: {action}'}), 404
+    return jsonify({'success': changed, 'job': resync_job_to_dict(job)})
+
+@app.route('/api/engagement/lists', methods=['GET'])
+@login_required
+def get_engagement_list_rollups():
+    """Engagement totals per Mailketing list (from daily rollups)"""
+    days = request.args.get('days', 30, type=int)
+    rollups = EngagementService(db).get_list_rollups(days=days)
+    return jsonify({'success': True, 'days': days, 'lists': rollups})
+
+@app.route('/api/diagnostics', methods=['GET'])
+@login_required
+def get_diagnostics():
+    """In-process cache and queue statistics"""
+    return jsonify({
+        'success': True,
+        'handler_cache': handler_cache.get_stats(),
+        'event_dispatcher': event_dispatcher.get_stats(),
+        'admission': {group: gate.get_stats() for group, gate in admission_gates.items()},
+        'circuit_breakers': {name: breaker.get_stats() for name, breaker in circuit_breakers.items()},
+        'outbound_jobs': OutboundJobService(db).count_by_status(),
+        'mailketing_limiter': mailketing_limiter.get_stats(),
+        'order_data': OrderDataService(db).get_stats(),
+        'pending_order_events': OrderEventService(db).count_pending(),
+        'telegram_notifier': telegram_notifier.get_stats()
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint; requires `Authorization: Bearer $METRICS_TOKEN` when that is set"""
+    token = os.environ.get('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+@app.route('/api/diagnostics/memory', methods=['GET'])
+@login_required
+def get_memory_diagnostics():
+    """RSS, tracemalloc status, snapshots and per-job session sizes"""
+    return jsonify(dict(memory_diagnostics.get_stats(), success=True))
+
+@app.route('/api/diagnostics/memory/tracing', methods=['POST'])
+@login_required
+def set_memory_tracing():
+    """Body: {"enabled": true, "frames": 10}"""
+    data = request.get_json(silent=True) or {}
+    if data.get('enabled'):
+        memory_diagnostics.start_tracing(data.get('frames') or 10)
+    else:
+        memory_diagnostics.stop_tracing()
+    return jsonify({'success': True, 'tracing': memory_diagnostics.get_stats()['tracing']})
+
+@app.route('/api/diagnostics/memory/snapshots', methods=['POST'])
+@login_required
+def capture_memory_snapshot():
+    data = request.get_json(silent=True) or {}
     try:
-        scalev = ScalevService(settings_obj.scalev_api_key)
-        sales_people = scalev.get_store_sales_people(store_id)
-        return jsonify({'success': True, 'sales_people': sales_people})
-    except Exception as e:
-        return jsonify({'success': False, 'message': str(e)}), 400
+        snapshot = memory_diagnostics.capture(data.get('label'))
+    except RuntimeError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, 'snapshot': snapshot,
+                    'top': memory_diagnostics.top(snapshot['id'], limit=request.args.get('limit', 25, type=int))})
+
+@app.route('/api/diagnostics/memory/diff', methods=['GET'])
+@login_required
+def diff_memory_snapshots():
+    """Top allocation-site growth between ?from=<id>&to=<id> (group_by: lineno, filename, traceback)"""
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in ('lineno', 'filename', 'traceback'):
+        return jsonify({'success': False, 'error': 'group_by must be lineno, filename or traceback'}), 400
+    try:
+        result = memory_diagnostics.diff(
+            request.args.get('from', type=int), request.args.get('to', type=int),
+            limit=request.args.get('limit', 25, type=int), group_by=group_by
+        )
+    except KeyError as e:
+        return jsonify({'success': False, 'error': e.args[0]}), 404
+    return jsonify(dict(result, success=True))
+
+@app.route('/api/diagnostics/queries', methods=['GET', 'DELETE'])
+@login_required
+def get_query_diagnostics():
+    """SQL query counts per route / job / event and likely N+1 statements (DELETE resets)"""
+    if request.method == 'DELETE':
+        query_stats.reset()
+    return jsonify(dict(query_stats.get_stats(), success=True))
 
 # ============================================================================
 # MAILKETING WEBHOOK ENDPOINTS
 # ============================================================================
 
 @app.route('/webhooks/mailketing/bounce', methods=['POST'])
+@sampled_event()
+@admission_controlled('mailketing')
 def mailketing_webhook_bounce():
     """Mailketing bounce webhook endpoint"""
     try:
@@ -1227,11 +1984,9 @@ def mailketing_webhook_bounce():
         reason = data.get('reason', 'Unknown reason')
         date = data.get('date', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
         
-        print(f"\n🚫 Bounce Event Received")
-        print(f"   Email: {email}")
-        print(f"   Reason: {reason}")
-        print(f"   Date: {date}")
-        print(f"   Full payload: {json.dumps(data, indent=2)}")
+        logger.info("🚫 Bounce Event Received: %s", email, extra={'reason': reason, 'date': date})
+        if verbose(logger):
+            logger.debug("Full payload: %s", json.dumps(data))
         
         # Persist bounce record
         try:
@@ -1258,42 +2013,30 @@ def mailketing_webhook_bounce():
                 )
                 db.session.add(bounce_record)
             db.session.commit()
-            print(f"   ✓ Bounce saved for {email}")
+            logger.info("✓ Bounce saved for %s", email)
         except Exception as save_err:
             db.session.rollback()
-            print(f"   ⚠️  Failed to save bounce record: {save_err}")
-        
-        # Send Telegram notification if enabled
-        settings_obj = Settings.query.first()
-        if settings_obj and settings_obj.telegram_enabled and settings_obj.telegram_bot_token and settings_obj.telegram_chat_id:
-            from services.telegram_service import TelegramService
-            telegram = TelegramService(settings_obj.telegram_bot_token, settings_obj.telegram_chat_id)
-            
-            # Check if debug mode is enabled
-            if settings_obj.telegram_debug_mode:
-                # Send full JSON payload for debugging
-                debug_message = f"""
-🐛 <b>DEBUG: Bounce Event</b>
-
-<b>Full Webhook Payload:</b>
-<pre>{json.dumps(data, indent=2, ensure_ascii=False)}</pre>
-
-Gunakan data ini untuk memilih field yang ingin ditampilkan di notifikasi.
-"""
-                telegram.send_message(debug_message.strip())
-            else:
-                # Send normal formatted notification
-                telegram.send_bounce_notification(email, reason, date)
+            logger.warning("⚠️  Failed to save bounce record: %s", save_err)
+        
+        # Send Telegram notification (queued, sent in background)
+        notify_telegram(
+            'bounce',
+            TelegramService.build_bounce_message(email, reason, date),
+            data,
+            debug_title='Bounce Event',
+            debug_footer='Gunakan data ini untuk memilih field yang ingin ditampilkan di notifikasi.',
+            coalesce_key=('bounce', normalize_email(email))
+        )
         
         return jsonify({'success': True, 'message': 'Bounce event processed'}), 200
         
     except Exception as e:
-        print(f"❌ Error processing bounce webhook: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error processing bounce webhook: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/webhooks/mailketing/open', methods=['POST'])
+@sampled_event()
+@admission_controlled('mailketing')
 def mailketing_webhook_open():
     """Mailketing email open webhook endpoint"""
     try:
@@ -1305,37 +2048,30 @@ def mailketing_webhook_open():
         email = data.get('email')
         date = data.get('date', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
         
-        print(f"\n👁️ Email Open Event Received")
-        print(f"   Email: {email}")
-        print(f"   Date: {date}")
-        print(f"   Full payload: {json.dumps(data, indent=2)}")
+        logger.info("👁️ Email Open Event Received: %s", email, extra={'date': date})
+        if verbose(logger):
+            logger.debug("Full payload: %s", json.dumps(data))
         
-        # Send Telegram notification if enabled
-        settings_obj = Settings.query.first()
-        if settings_obj and settings_obj.telegram_enabled and settings_obj.telegram_bot_token and settings_obj.telegram_chat_id:
-            from services.telegram_service import TelegramService
-            telegram = TelegramService(settings_obj.telegram_bot_token, settings_obj.telegram_chat_id)
-            
-            if settings_obj.telegram_debug_mode:
-                debug_message = f"""
-🐛 <b>DEBUG: Email Open Event</b>
-
-<b>Full Webhook Payload:</b>
-<pre>{json.dumps(data, indent=2, ensure_ascii=False)}</pre>
-"""
-                telegram.send_message(debug_message.strip())
-            else:
-                telegram.send_email_open_notification(email, date)
+        record_engagement_event('open', data)
+        
+        # Send Telegram notification (queued, sent in background)
+        notify_telegram(
+            'open',
+            TelegramService.build_email_open_message(email, date),
+            data,
+            debug_title='Email Open Event',
+            coalesce_key=('open', normalize_email(email))
+        )
         
         return jsonify({'success': True, 'message': 'Email open event processed'}), 200
         
     except Exception as e:
-        print(f"❌ Error processing email open webhook: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error processing email open webhook: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/webhooks/mailketing/click', methods=['POST'])
+@sampled_event()
+@admission_controlled('mailketing')
 def mailketing_webhook_click():
     """Mailketing link click webhook endpoint"""
     try:
@@ -1348,38 +2084,30 @@ def mailketing_webhook_click():
         link_clicked = data.get('link_clicked', 'Unknown link')
         date = data.get('date', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
         
-        print(f"\n🖱️ Link Click Event Received")
-        print(f"   Email: {email}")
-        print(f"   Link: {link_clicked}")
-        print(f"   Date: {date}")
-        print(f"   Full payload: {json.dumps(data, indent=2)}")
+        logger.info("🖱️ Link Click Event Received: %s", email, extra={'link': link_clicked, 'date': date})
+        if verbose(logger):
+            logger.debug("Full payload: %s", json.dumps(data))
         
-        # Send Telegram notification if enabled
-        settings_obj = Settings.query.first()
-        if settings_obj and settings_obj.telegram_enabled and settings_obj.telegram_bot_token and settings_obj.telegram_chat_id:
-            from services.telegram_service import TelegramService
-            telegram = TelegramService(settings_obj.telegram_bot_token, settings_obj.telegram_chat_id)
-            
-            if settings_obj.telegram_debug_mode:
-                debug_message = f"""
-🐛 <b>DEBUG: Link Click Event</b>
-
-<b>Full Webhook Payload:</b>
-<pre>{json.dumps(data, indent=2, ensure_ascii=False)}</pre>
-"""
-                telegram.send_message(debug_message.strip())
-            else:
-                telegram.send_link_click_notification(email, link_clicked, date)
+        record_engagement_event('click', data)
+        
+        # Send Telegram notification (queued, sent in background)
+        notify_telegram(
+            'click',
+            TelegramService.build_link_click_message(email, link_clicked, date),
+            data,
+            debug_title='Link Click Event',
+            coalesce_key=('click', normalize_email(email), link_clicked)
+        )
         
         return jsonify({'success': True, 'message': 'Link click event processed'}), 200
         
     except Exception as e:
-        print(f"❌ Error processing link click webhook: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error processing link click webhook: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/webhooks/mailketing/unsubscribe', methods=['POST'])
+@sampled_event()
+@admission_controlled('mailketing')
 def mailketing_webhook_unsubscribe():
     """Mailketing unsubscribe webhook endpoint"""
     try:
@@ -1391,37 +2119,30 @@ def mailketing_webhook_unsubscribe():
         email = data.get('email')
         date = data.get('date', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
         
-        print(f"\n❌ Unsubscribe Event Received")
-        print(f"   Email: {email}")
-        print(f"   Date: {date}")
-        print(f"   Full payload: {json.dumps(data, indent=2)}")
+        logger.info("❌ Unsubscribe Event Received: %s", email, extra={'date': date})
+        if verbose(logger):
+            logger.debug("Full payload: %s", json.dumps(data))
         
-        # Send Telegram notification if enabled
-        settings_obj = Settings.query.first()
-        if settings_obj and settings_obj.telegram_enabled and settings_obj.telegram_bot_token and settings_obj.telegram_chat_id:
-            from services.telegram_service import TelegramService
-            telegram = TelegramService(settings_obj.telegram_bot_token, settings_obj.telegram_chat_id)
-            
-            if settings_obj.telegram_debug_mode:
-                debug_message = f"""
-🐛 <b>DEBUG: Unsubscribe Event</b>
-
-<b>Full Webhook Payload:</b>
-<pre>{json.dumps(data, indent=2, ensure_ascii=False)}</pre>
-"""
-                telegram.send_message(debug_message.strip())
-            else:
-                telegram.send_unsubscribe_notification(email, date)
+        record_engagement_event('unsubscribe', data)
+        
+        # Send Telegram notification (queued, sent in background)
+        notify_telegram(
+            'unsubscribe',
+            TelegramService.build_unsubscribe_message(email, date),
+            data,
+            debug_title='Unsubscribe Event',
+            coalesce_key=('unsubscribe', normalize_email(email))
+        )
         
         return jsonify({'success': True, 'message': 'Unsubscribe event processed'}), 200
         
     except Exception as e:
-        print(f"❌ Error processing unsubscribe webhook: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error processing unsubscribe webhook: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/webhooks/mailketing/newsubscriber', methods=['POST'])
+@sampled_event()
+@admission_controlled('mailketing')
 def mailketing_webhook_newsubscriber():
     """Mailketing new subscriber webhook endpoint (optional)"""
     try:
@@ -1436,36 +2157,25 @@ def mailketing_webhook_newsubscriber():
         mobile = data.get('mobile', '')
         date = data.get('date', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
         
-        print(f"\n✅ New Subscriber Event Received")
-        print(f"   Email: {email}")
-        print(f"   Name: {first_name} {last_name}")
-        print(f"   Mobile: {mobile}")
-        print(f"   Date: {date}")
-        print(f"   Full payload: {json.dumps(data, indent=2)}")
+        logger.info("✅ New Subscriber Event Received: %s", email, extra={'date': date})
+        if verbose(logger):
+            logger.debug("Full payload: %s", json.dumps(data))
         
-        # Send Telegram notification if enabled
-        settings_obj = Settings.query.first()
-        if settings_obj and settings_obj.telegram_enabled and settings_obj.telegram_bot_token and settings_obj.telegram_chat_id:
-            from services.telegram_service import TelegramService
-            telegram = TelegramService(settings_obj.telegram_bot_token, settings_obj.telegram_chat_id)
-            
-            if settings_obj.telegram_debug_mode:
-                debug_message = f"""
-🐛 <b>DEBUG: New Subscriber Event</b>
-
-<b>Full Webhook Payload:</b>
-<pre>{json.dumps(data, indent=2, ensure_ascii=False)}</pre>
-"""
-                telegram.send_message(debug_message.strip())
-            else:
-                telegram.send_new_subscriber_notification(email, first_name, last_name, mobile, date)
+        record_engagement_event('newsubscriber', data)
+        
+        # Send Telegram notification (queued, sent in background)
+        notify_telegram(
+            'newsubscriber',
+            TelegramService.build_new_subscriber_message(email, first_name, last_name, mobile, date),
+            data,
+            debug_title='New Subscriber Event',
+            coalesce_key=('newsubscriber', normalize_email(email))
+        )
         
         return jsonify({'success': True, 'message': 'New subscriber event processed'}), 200
         
     except Exception as e:
-        print(f"❌ Error processing new subscriber webhook: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error processing new subscriber webhook: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # ============================================================================
@@ -1483,7 +2193,6 @@ def test_telegram():
         return jsonify({'success': False, 'message': 'Bot token and chat ID are required'}), 400
     
     try:
-        from services.telegram_service import TelegramService
         telegram = TelegramService(bot_token, chat_id)
         
         # Test connection
@@ -1535,12 +2244,79 @@ if __name__ == '__main__':
         name='Check expired follow-up leads',
         replace_existing=True
     )
+    scheduler.add_job(
+        func=flush_engagement_events,
+        trigger='interval',
+        seconds=10,
+        id='flush_engagement_events',
+        name='Flush buffered engagement events',
+        replace_existing=True
+    )
+    scheduler.add_job(
+        func=purge_engagement_events,
+        trigger='interval',
+        hours=24,
+        id='purge_engagement_events',
+        name='Purge expired engagement event partitions',
+        replace_existing=True
+    )
+    scheduler.add_job(
+        func=train_order_data_dictionary,
+        trigger='interval',
+        hours=24,
+        id='train_order_data_dictionary',
+        name='Train order data compression dictionary',
+        replace_existing=True
+    )
+    scheduler.add_job(
+        func=resume_resync_jobs,
+        trigger='interval',
+        minutes=1,
+        id='resume_resync_jobs',
+        name='Resume Mailketing re-sync jobs',
+        replace_existing=True
+    )
+    scheduler.add_job(
+        func=drain_outbound_jobs,
+        trigger='interval',
+        minutes=1,
+        id='drain_outbound_jobs',
+        name='Retry deferred outbound calls',
+        replace_existing=True
+    )
+    scheduler.add_job(
+        func=purge_pending_order_events,
+        trigger='interval',
+        hours=24,
+        id='purge_pending_order_events',
+        name='Purge applied and expired pending order events',
+        replace_existing=True
+    )
+    scheduler.add_job(
+        func=verify_lead_scores,
+        trigger='interval',
+        hours=24,
+        id='verify_lead_scores',
+        name='Verify incremental lead scores',
+        replace_existing=True
+    )
+    scheduler.add_job(
+        func=sync_scalev_catalog,
+        trigger='interval',
+        minutes=15,
+        id='sync_scalev_catalog',
+        name='Sync ScaleV catalog mirror',
+        replace_existing=True
+    )
     scheduler.start()
     
     try:
         app.run(debug=False, host='0.0.0.0', port=5000)
     except (KeyboardInterrupt, SystemExit):
         scheduler.shutdown()
+    finally:
+        # Don't lose events still waiting for a batch
+        flush_engagement_events()
 
 # Auto-run migration on first request (Flask 3.0 compatible)
 _migration_done = False
@@ -1560,6 +2336,9 @@ def run_migrations():
             print("\n🔄 [First Request] Running database migration...")
             migrate()
             print("✅ [First Request] Migration check completed\n")
+            
+            # Lead scores are scaled to the persisted epoch (see LeadScoringService)
+            LeadScoringService(db).load_epoch()
         except Exception as e:
             print(f"⚠️  [First Request] Migration failed: {str(e)}")
             import traceback
@@ -0,0 +1,102 @@
+"""
+Compare two benchmark results written by bench/run.py
+
+    python -m bench.compare bench/results/20250101-120000-baseline.json bench/results/20250102-090000-change.json
+    python -m bench.compare old.json new.json --threshold 5 --fail-on-regression
+
+Prints the key numbers of every scenario side by side with the relative
+change; changes in the bad direction beyond --threshold percent are
+marked as regressions (exit status 1 with --fail-on-regression).
+"""
+
+import argparse
+import sys
+
+from bench.report import load
+
+
+# (path in the scenario report, higher is better)
+METRICS = (
+    ('throughput_rps', True),
+    ('leads_per_s', True),
+    ('elapsed_s', False),
+    ('latency_ms.p50', False),
+    ('latency_ms.p95', False),
+    ('latency_ms.p99', False),
+    ('service_ms.p99', False),
+    ('errors', False),
+    ('db_locks.write_ms.p99', False),
+    ('db_locks.commit_ms.p99', False),
+    ('db_locks.wait_total_ms', False),
+    ('db_locks.locked_errors', False),
+)
+
+
+def lookup(report, path):
+    value = report
+    for key in path.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare(old, new, threshold=10.0):
+    """Rows of (scenario, metric, old, new, change %, regression)"""
+    rows = []
+    for scenario in sorted(set(old.get('scenarios', {})) | set(new.get('scenarios', {}))):
+        before = old.get('scenarios', {}).get(scenario, {})
+        after = new.get('scenarios', {}).get(scenario, {})
+        for path, higher_is_better in METRICS:
+            a, b = lookup(before, path), lookup(after, path)
+            if a is None and b is None:
+                continue
+            change = None
+            regression = False
+            if a is not None and b is not None:
+                if a:
+                    change = (b - a) / abs(a) * 100
+                    worse = -change if higher_is_better else change
+                    regression = worse > threshold
+                elif b:
+                    # From zero (e.g. no locked errors before): any increase of a cost is a regression
+                    regression = not higher_is_better
+            rows.append((scenario, path, a, b, change, regression))
+    return rows
+
+
+def _format(value):
+    if value is None:
+        return '-'
+    return f'{value:,.3f}'.rstrip('0').rstrip('.') if isinstance(value, float) else f'{value:,}'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Percent change in the bad direction counted as a regression (default 10)')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    old, new = load(args.old), load(args.new)
+    print(f"old: {old.get('label')} {old.get('started_at')} (git {old.get('environment', {}).get('git')})")
+    print(f"new: {new.get('label')} {new.get('started_at')} (git {new.get('environment', {}).get('git')})")
+    if old.get('config') != new.get('config'):
+        changed = sorted(key for key in set(old.get('config', {})) | set(new.get('config', {}))
+                         if old.get('config', {}).get(key) != new.get('config', {}).get(key))
+        print(f"⚠️  Runs used different settings: {', '.join(changed)}")
+    print()
+
+    rows = compare(old, new, args.threshold)
+    print(f"{'scenario':<22}{'metric':<26}{'old':>14}{'new':>14}{'change':>10}")
+    for scenario, path, a, b, change, regression in rows:
+        change_text = f'{change:+.1f}%' if change is not None else '-'
+        marker = '  ❌ regression' if regression else ''
+        print(f"{scenario:<22}{path:<26}{_format(a):>14}{_format(b):>14}{change_text:>10}{marker}")
+
+    regressions = sum(1 for row in rows if row[5])
+    print(f"\n{regressions} regression(s) beyond {args.threshold:g}%")
+    if args.fail_on_regression and regressions:
+        sys.exit(1)
@@ -0,0 +1,569 @@
+"""
+Synthetic dataset generator for scale testing
+
+Writes product lists with their sales people (SalesPerson and
+ProductListSalesPerson, plus the legacy JSON columns), then leads with
+their LeadHistory chain, compressed order payload (LeadOrderData, encoded
+with OrderDataService like the webhook does), the Mailketing membership
+ledger rows of the leads that were sent (MailketingMembership) and a share
+of bounced emails (BounceEmail), straight to the database with chunked
+executemany inserts. About 5.7 rows are written per lead, so
+`--leads 1750000` is roughly 10M rows.
+
+Output is deterministic for a seed: every block of leads draws from its
+own generator seeded with (seed, block), and all dates are offsets from
+--anchor (default: today 00:00 WIB), so pass the same --anchor to get an
+identical database on another day.
+
+    python -m bench.dataset --product-lists 300 --leads 1750000 --seed 42
+    python -m bench.dataset --database-url sqlite:////tmp/scale.db --leads 500000
+    python -m bench.dataset --leads 100000 --append      # more leads for the existing product lists
+
+Distributions: lead creation grows towards the anchor over --days with
+a WIB daytime/evening peak; leads younger than 7 days are mostly still in
+follow-up, older ones closed (paid within hours to days) or not closing
+(moved by check_expired_leads after 7 days), except --expired-backlog of
+them which are left in follow-up for the expiry job. ~10% of orders come
+from a returning customer (same email).
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+
+FIRST_NAMES = ('Adi', 'Agus', 'Ahmad', 'Andi', 'Anisa', 'Ayu', 'Bambang', 'Budi', 'Citra', 'Dedi', 'Dewi', 'Dian',
+               'Eko', 'Fajar', 'Fitri', 'Hadi', 'Hendra', 'Indah', 'Intan', 'Joko', 'Kurnia', 'Lestari', 'Maya',
+               'Muhammad', 'Nur', 'Putri', 'Rahmat', 'Rina', 'Rizky', 'Sari', 'Siti', 'Sri', 'Teguh', 'Tri',
+               'Wahyu', 'Wulan', 'Yanti', 'Yogi', 'Yusuf', 'Zahra')
+LAST_NAMES = ('Pratama', 'Saputra', 'Wijaya', 'Santoso', 'Hidayat', 'Nugroho', 'Kusuma', 'Lestari', 'Permata',
+              'Setiawan', 'Siregar', 'Nasution', 'Harahap', 'Simanjuntak', 'Wibowo', 'Rahayu', 'Gunawan', 'Susanto',
+              'Purnomo', 'Hakim', 'Ramadhan', 'Firmansyah', 'Utami', 'Handayani', 'Sihombing')
+EMAIL_DOMAINS = (('gmail.com', 70), ('yahoo.com', 12), ('yahoo.co.id', 6), ('hotmail.com', 4), ('outlook.com', 4),
+                 ('icloud.com', 2), ('ymail.com', 2))
+CITIES = (('Jakarta Selatan', 'DKI Jakarta'), ('Bandung', 'Jawa Barat'), ('Surabaya', 'Jawa Timur'),
+          ('Semarang', 'Jawa Tengah'), ('Medan', 'Sumatera Utara'), ('Makassar', 'Sulawesi Selatan'),
+          ('Yogyakarta', 'DI Yogyakarta'), ('Depok', 'Jawa Barat'), ('Bekasi', 'Jawa Barat'),
+          ('Tangerang', 'Banten'), ('Palembang', 'Sumatera Selatan'), ('Denpasar', 'Bali'),
+          ('Malang', 'Jawa Timur'), ('Balikpapan', 'Kalimantan Timur'), ('Pekanbaru', 'Riau'))
+PRODUCT_KINDS = ('Kelas', 'Ebook', 'Bootcamp', 'Mentoring', 'Paket', 'Workshop', 'Webinar', 'Template', 'Kursus')
+PRODUCT_TOPICS = ('Digital Marketing', 'Bisnis Online', 'Facebook Ads', 'Copywriting', 'Desain Canva', 'Excel',
+                  'Public Speaking', 'Investasi Saham', 'Trading Forex', 'Parenting', 'Bahasa Inggris', 'Hijab Fashion',
+                  'Skincare Alami', 'Resep Kue', 'Fotografi', 'Videografi', 'TikTok Shop', 'Shopee Affiliate',
+                  'SEO', 'Web Developer', 'Data Analyst', 'Keuangan Keluarga', 'Herbal', 'Quran Tahsin')
+PRODUCT_TIERS = ('', ' Basic', ' Premium', ' VIP', ' Pro', ' 2.0', ' Batch 3')
+PRICES = (49000, 79000, 99000, 149000, 199000, 249000, 299000, 499000, 999000)
+PAYMENT_METHODS = (('bank_transfer', 45), ('qris', 20), ('va_bca', 12), ('va_bri', 6), ('va_mandiri', 5),
+                   ('gopay', 5), ('ovo', 3), ('cod', 4))
+COURIERS = ('jne', 'jnt', 'sicepat', 'anteraja', 'pos', 'digital')
+
+# Share of orders per hour of day (WIB): quiet at night, peaks after lunch and in the evening
+HOURLY_WEIGHTS = (1, 0.6, 0.4, 0.3, 0.4, 0.8, 1.5, 2.5, 3.5, 4.5, 5, 5.5, 6, 6, 5.5, 5, 5, 5.5, 6.5, 7.5, 8, 7, 5, 2.5)
+
+# Number of sales people mapped to a product list (0 = for all sales)
+SALES_PER_LIST = ((0, 10), (1, 40), (2, 20), (3, 12), (4, 8), (6, 6), (8, 4))
+
+FOLLOW_UP_DAYS = 7
+
+
+def _weighted(pairs):
+    values, weights = zip(*pairs)
+    return list(values), list(weights)
+
+
+class LeadBlockBuilder:
+    """Rows of one block of leads, computed without the database
+
+    Everything a block needs is in here, so blocks can be built in worker
+    processes; a block only depends on (seed, block number), never on the
+    blocks before it.
+    """
+
+    def __init__(self, seed, anchor, days, bounce_rate, expired_backlog, order_data, product_lists,
+                 zdict=None, dictionary_id=None, score_epoch=None):
+        self.seed = seed
+        self.anchor = anchor
+        self.days = days
+        self.bounce_rate = bounce_rate
+        self.expired_backlog = expired_backlog
+        self.order_data = order_data
+        self.product_lists = product_lists
+        self.zdict = zdict
+        self.dictionary_id = dictionary_id
+        self.score_epoch = score_epoch
+        self._domains = _weighted(EMAIL_DOMAINS)
+        self._payment_methods = _weighted(PAYMENT_METHODS)
+
+    def _created_at(self, rng):
+        # Density grows linearly towards the anchor (business growth)
+        day = int(self.days * (1 - rng.random() ** 0.5))
+        hour = rng.choices(range(24), HOURLY_WEIGHTS)[0]
+        return self.anchor - timedelta(days=day + 1) + timedelta(hours=hour, seconds=rng.randrange(3600))
+
+    def _person(self, rng, n):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        domain = rng.choices(*self._domains)[0]
+        style = rng.random()
+        if style < 0.4:
+            local = f'{first}.{last}{rng.randrange(100)}'
+        elif style < 0.7:
+            local = f'{first}{last}{rng.randrange(1970, 2008)}'
+        else:
+            local = f'{first}_{n}'
+        email = f'{local}@{domain}'
+        if rng.random() < 0.03:
+            email = email.upper() if rng.random() < 0.5 else email.capitalize()
+        return f'{first} {last}', email, f'08{rng.choice((11, 12, 13, 21, 22, 52, 53, 57, 77, 78, 81, 95, 96))}' \
+                                         f'{rng.randrange(10 ** 7, 10 ** 9)}'
+
+    def _order_payload(self, rng, order_id, name, email, phone, entry, created_at, payment_status):
+        city, province = rng.choice(CITIES)
+        quantity = 1 if rng.random() < 0.9 else rng.randrange(2, 4)
+        shipping = 0 if rng.random() < 0.6 else rng.choice((9000, 12000, 18000, 25000))
+        gross = entry['price'] * quantity + shipping
+        return {
+            'order_id': order_id,
+            'status': 'confirmed' if payment_status == 'paid' else rng.choice(('pending', 'confirmed')),
+            'payment_status': payment_status,
+            'payment_method': rng.choices(*self._payment_methods)[0],
+            'gross_revenue': gross,
+            'shipping_cost': shipping,
+            'courier': rng.choice(COURIERS),
+            'created_at': created_at.isoformat(),
+            'orderlines': [{
+                'product_name': entry['product_name'],
+                'variant_sku': entry['sku'],
+                'variant_unique_id': entry['variant_unique_id'],
+                'quantity': quantity,
+                'product_price': entry['price']
+            }],
+            'destination_address': {
+                'name': name, 'email': email, 'phone': phone,
+                'address': f'Jl. {rng.choice(LAST_NAMES)} No. {rng.randrange(1, 250)}',
+                'city': city, 'province': province, 'postal_code': str(rng.randrange(10110, 99999))
+            },
+            'notes': rng.choice(('', '', '', 'Tolong dikirim cepat ya', 'Transfer sudah, mohon dicek',
+                                 'Bonusnya jangan lupa kak'))
+        }
+
+    def _engagement_score(self, rng, created_at, status):
+        from services.scoring_service import LeadScoringService
+
+        if rng.random() < 0.45:
+            return 0.0
+        opens = int(rng.expovariate(0.4)) + 1
+        score = 0.0
+        for _ in range(opens):
+            ts = min(created_at + timedelta(hours=rng.expovariate(1 / 48)), self.anchor)
+            score += LeadScoringService.event_value(1, ts)
+            if rng.random() < 0.25:
+                score += LeadScoringService.event_value(2, ts)
+        if status == 'not_closing' and rng.random() < 0.05:
+            score += LeadScoringService.event_value(3, min(created_at + timedelta(days=FOLLOW_UP_DAYS + 1), self.anchor))
+        return score
+
+    def build(self, block, first_id, count):
+        """(leads, history, order data, memberships, bounces) rows of leads first_id .. first_id + count - 1"""
+        from services.order_data_service import OrderDataService
+
+        rng = random.Random(f'{self.seed}:leads:{block}')
+        product_lists = self.product_lists
+        leads, history, orders, memberships, bounces = [], [], [], [], []
+        recent_customers = []
+        for i in range(count):
+            lead_id = first_id + i
+            entry = rng.choice(product_lists)
+            handler = rng.choice(entry['handlers'])
+            created_at = self._created_at(rng)
+            age = self.anchor - created_at
+
+            if recent_customers and rng.random() < 0.1:
+                name, email, phone = rng.choice(recent_customers)
+            else:
+                name, email, phone = self._person(rng, lead_id)
+                if len(recent_customers) < 500:
+                    recent_customers.append((name, email, phone))
+                else:
+                    recent_customers[rng.randrange(500)] = (name, email, phone)
+
+            follow_up_start = created_at + timedelta(seconds=rng.randrange(1, 120))
+            expired = age > timedelta(days=FOLLOW_UP_DAYS, hours=1)
+            roll = rng.random()
+            closed_at = None
+            moved_at = None
+            if not expired:
+                # Still inside the follow-up window: some already paid
+                paid_within = timedelta(hours=rng.lognormvariate(1.5, 1.3))
+                if roll < 0.3 and created_at + paid_within < self.anchor:
+                    status, closed_at = 'closing', created_at + paid_within
+                else:
+                    status = 'follow_up'
+            elif roll < self.expired_backlog:
+                status = 'follow_up'
+            elif roll < self.expired_backlog + 0.35:
+                status = 'closing'
+                closed_at = created_at + min(timedelta(hours=rng.lognormvariate(1.5, 1.3)),
+                                             timedelta(days=FOLLOW_UP_DAYS))
+            else:
+                status = 'not_closing'
+                moved_at = follow_up_start + timedelta(days=FOLLOW_UP_DAYS, seconds=rng.randrange(3600))
+
+            updated_at = closed_at or moved_at or follow_up_start
+            sent = rng.random() < 0.93
+            list_id = entry['lists'][status] if sent else None
+            order_id = f'SYN{self.seed}-{lead_id}'
+            leads.append({
+                'id': lead_id, 'product_list_id': entry['id'], 'order_id': order_id, 'name': name,
+                'email': email, 'phone': phone, 'sales_person_id': handler[0], 'sales_person_name': handler[1],
+                'sales_person_email': handler[2], 'status': status, 'created_at': created_at,
+                'updated_at': updated_at, 'follow_up_start': follow_up_start, 'closed_at': closed_at,
+                'sent_to_mailketing': sent, 'sent_to_mailketing_at': updated_at + timedelta(seconds=2) if sent else None,
+                'mailketing_list_id': list_id, 'engagement_score': self._engagement_score(rng, created_at, status)
+            })
+
+            if sent:
+                # Ledger rows for the Follow Up list at creation and the list of the final status;
+                # repeated (email, list) pairs are dropped by the writer (the pair is unique)
+                sends = {entry['lists']['follow_up']: follow_up_start, list_id: updated_at}
+                for sent_list_id, sent_at in sends.items():
+                    if sent_list_id:
+                        memberships.append({'email_lower': email.strip().lower(), 'list_id': str(sent_list_id),
+                                            'lead_id': lead_id, 'added_at': sent_at + timedelta(seconds=2)})
+
+            history.append({'lead_id': lead_id, 'from_status': None, 'to_status': 'follow_up',
+                            'notes': 'Lead created from order', 'created_at': follow_up_start})
+            if status == 'closing':
+                history.append({'lead_id': lead_id, 'from_status': 'follow_up', 'to_status': 'closing',
+                                'notes': 'Payment received - order paid', 'created_at': closed_at})
+            elif status == 'not_closing':
+                history.append({'lead_id': lead_id, 'from_status': 'follow_up', 'to_status': 'not_closing',
+                                'notes': f'No payment after {FOLLOW_UP_DAYS} days in follow-up',
+                                'created_at': moved_at})
+
+            if self.order_data:
+                data = self._order_payload(rng, order_id, name, email, phone, entry, created_at,
+                                           'paid' if status == 'closing' else 'unpaid')
+                raw, payload = OrderDataService.encode(data, self.zdict)
+                orders.append(dict(OrderDataService.extract(data), lead_id=lead_id, payload=payload,
+                                   dictionary_id=self.dictionary_id, raw_size=len(raw), stored_size=len(payload),
+                                   created_at=created_at))
+
+            if rng.random() < self.bounce_rate:
+                # Repeated emails are dropped by the writer (email_lower is unique)
+                bounced_at = min(follow_up_start + timedelta(minutes=rng.randrange(1, 600)), self.anchor)
+                reason = rng.choice(('Mailbox full', 'User unknown', '550 5.1.1 The email account does not exist',
+                                     'Domain not found'))
+                bounces.append({'email': email, 'email_lower': email.strip().lower(), 'reason': reason,
+                                'source': 'mailketing', 'bounced_at': bounced_at, 'created_at': bounced_at,
+                                'updated_at': bounced_at,
+                                'raw_payload': f'{{"event":"bounce","email":"{email}","reason":"{reason}"}}'})
+        return leads, history, orders, memberships, bounces
+
+
+_builder = None
+
+
+def _init_worker(builder):
+    global _builder
+    from services.scoring_service import LeadScoringService
+
+    # Scores are scaled to the target database's epoch (spawned workers start with the default)
+    if builder.score_epoch:
+        LeadScoringService.epoch = builder.score_epoch
+    _builder = builder
+
+
+def _build_block(task):
+    return _builder.build(*task)
+
+
+class DatasetGenerator:
+    """Bulk-insert a realistic catalog and lead history
+
+    Rows are built in worker processes (LeadBlockBuilder) and written by
+    this process with Core executemany inserts on one connection. Leads get
+    explicit ids (after the current maximum) so child rows can reference
+    them without reading ids back. Every `chunk_size` leads (with their
+    child rows) are committed together.
+    """
+
+    BLOCK = 10000  # leads per deterministic random stream; independent of chunk_size
+
+    def __init__(self, db, seed=1, anchor=None, days=180, chunk_size=20000, bounce_rate=0.02,
+                 expired_backlog=0.05, order_data=True, workers=None, log=print):
+        from models import get_wib_now
+        self.db = db
+        self.seed = seed
+        self.anchor = anchor or get_wib_now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.days = days
+        self.chunk_size = chunk_size
+        self.bounce_rate = bounce_rate
+        self.expired_backlog = expired_backlog
+        self.order_data = order_data
+        self.workers = workers if workers is not None else max(1, (os.cpu_count() or 2) - 1)
+        self.log = log
+        self.counts = {}
+
+    # ------------------------------------------------------------------
+    # Database helpers
+    # ------------------------------------------------------------------
+
+    def _tables(self):
+        from models import (SalesPerson, ProductList, ProductListSalesPerson, Lead, LeadHistory, LeadOrderData,
+                            MailketingMembership, BounceEmail)
+        return {model.__tablename__: model.__table__ for model in
+                (SalesPerson, ProductList, ProductListSalesPerson, Lead, LeadHistory, LeadOrderData,
+                 MailketingMembership, BounceEmail)}
+
+    def _next_id(self, conn, table):
+        from sqlalchemy import func, select
+        return (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+    def _insert(self, conn, table, rows):
+        if rows:
+            conn.execute(table.insert(), rows)
+            self.counts[table.name] = self.counts.get(table.name, 0) + len(rows)
+
+    def _connect(self):
+        """One connection for the whole run; SQLite skips fsync while generating"""
+        conn = self.db.engine.connect()
+        restore = None
+        if conn.dialect.name == 'sqlite':
+            restore = conn.exec_driver_sql('PRAGMA synchronous').scalar()
+            conn.exec_driver_sql('PRAGMA synchronous=OFF')
+            conn.commit()
+        return conn, restore
+
+    def _close(self, conn, restore):
+        if restore is not None:
+            conn.exec_driver_sql(f'PRAGMA synchronous={int(restore)}')
+            conn.commit()
+        conn.close()
+
+    # ------------------------------------------------------------------
+    # Catalog
+    # ------------------------------------------------------------------
+
+    def generate_catalog(self, conn, product_lists, sales_people, stores):
+        """Sales people, product lists and their mappings; returns the product lists"""
+        import json
+
+        tables = self._tables()
+        rng = random.Random(f'{self.seed}:catalog')
+        person_id = self._next_id(conn, tables['sales_person'])
+        existing_scalev_ids = {row[0] for row in conn.execute(tables['sales_person'].select()
+                                                              .with_only_columns(tables['sales_person'].c.scalev_id))}
+        people = []
+        scalev_id = 700000
+        for n in range(sales_people):
+            while str(scalev_id) in existing_scalev_ids:
+                scalev_id += 1
+            name = f'CS {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+            email = f"cs.{name[3:].lower().replace(' ', '.')}{n}@tokoonline.id"
+            people.append({'id': person_id + n, 'scalev_id': str(scalev_id), 'name': name, 'name_lower': name.lower(),
+                           'email': email, 'email_lower': email, 'created_at': self.anchor - timedelta(days=self.days)})
+            scalev_id += 1
+        self._insert(conn, tables['sales_person'], people)
+
+        list_id = self._next_id(conn, tables['product_list'])
+        link_id = self._next_id(conn, tables['product_list_sales_person'])
+        store_names = [(str(3000 + s), f'{rng.choice(("Toko", "Akademi", "Kelas", "Rumah"))} '
+                                       f'{rng.choice(LAST_NAMES)} {s}') for s in range(1, stores + 1)]
+        mailketing_lists = [str(rng.randrange(10000, 99999)) for _ in range(max(3, product_lists // 2))]
+        sizes, size_weights = _weighted(SALES_PER_LIST)
+        lists, links, created = [], [], []
+        product = None
+        for n in range(product_lists):
+            # One in five lists repeats the previous product for other CS (same product, different team)
+            if product is None or rng.random() >= 0.2:
+                store_id, store_name = rng.choice(store_names)
+                name = f'{rng.choice(PRODUCT_KINDS)} {rng.choice(PRODUCT_TOPICS)}{rng.choice(PRODUCT_TIERS)}'
+                product = (store_id, store_name, name, f'SKU-{store_id}-{n:05d}', rng.choice(PRICES))
+            store_id, store_name, name, sku, price = product
+            team = rng.sample(people, min(len(people), rng.choices(sizes, size_weights)[0]))
+            created_at = self.anchor - timedelta(days=self.days + rng.uniform(0, 30))
+            lists.append({
+                'id': list_id + n, 'store_id': store_id, 'store_name': store_name, 'product_name': name,
+                'product_id': sku,
+                'sales_person_ids': json.dumps([p['scalev_id'] for p in team]) if team else None,
+                'sales_person_names': json.dumps([p['name'] for p in team]) if team else None,
+                'sales_person_emails': json.dumps([p['email'] for p in team]) if team else None,
+                'mailketing_list_followup': rng.choice(mailketing_lists),
+                'mailketing_list_closing': rng.choice(mailketing_lists),
+                'mailketing_list_not_closing': rng.choice(mailketing_lists),
+                'is_active': rng.random() < 0.9, 'created_at': created_at, 'updated_at': created_at
+            })
+            for position, person in enumerate(team):
+                links.append({'id': link_id + len(links), 'product_list_id': list_id + n,
+                              'sales_person_id': person['id'], 'position': position})
+            created.append(self._product_list_entry(lists[-1], team, price))
+        self._insert(conn, tables['product_list'], lists)
+        self._insert(conn, tables['product_list_sales_person'], links)
+        conn.commit()
+        return created
+
+    @staticmethod
+    def _product_list_entry(row, team, price):
+        return {
+            'id': row['id'], 'product_name': row['product_name'], 'sku': row['product_id'],
+            'variant_unique_id': f"var-{row['product_id'].lower()}", 'price': price,
+            'lists': {'follow_up': row['mailketing_list_followup'], 'closing': row['mailketing_list_closing'],
+                      'not_closing': row['mailketing_list_not_closing']},
+            'team': [(p['scalev_id'], p['name'], p['email']) for p in team]
+        }
+
+    def load_product_lists(self, conn):
+        """Existing product lists with their sales people, for --append and bench/run.py"""
+        from sqlalchemy import select
+
+        tables = self._tables()
+        product_list, links, person = tables['product_list'], tables['product_list_sales_person'], tables['sales_person']
+        teams = {}
+        for list_id, scalev_id, name, email in conn.execute(
+                select(links.c.product_list_id, person.c.scalev_id, person.c.name, person.c.email)
+                .join(person, person.c.id == links.c.sales_person_id).order_by(links.c.position)):
+            teams.setdefault(list_id, []).append((scalev_id, name, email))
+        all_people = sorted({member for team in teams.values() for member in team})
+        rng = random.Random(f'{self.seed}:prices')
+        entries = []
+        for row in conn.execute(select(product_list).order_by(product_list.c.id)).mappings():
+            entry = self._product_list_entry(row, [], rng.choice(PRICES))
+            entry['team'] = teams.get(row['id'], [])
+            entries.append(entry)
+        # Lists "for all sales" are handled by anyone
+        for entry in entries:
+            entry['handlers'] = entry['team'] or all_people or [(None, None, None)]
+        return entries
+
+    def generate_leads(self, conn, count, product_lists):
+        """Leads and their child rows, built in `workers` processes and written here in block order"""
+        from sqlalchemy import select
+        from models import OrderDataDictionary
+        from services.scoring_service import LeadScoringService
+
+        if not product_lists:
+            raise ValueError('No product lists to attach leads to; generate some with --product-lists')
+        tables = self._tables()
+        bounced = {row[0] for row in conn.execute(select(tables['bounce_email'].c.email_lower))}
+        membership_table = tables['mailketing_membership']
+        members = set(conn.execute(select(membership_table.c.email_lower, membership_table.c.list_id)).tuples())
+        dictionary_table = OrderDataDictionary.__table__
+        dictionary = conn.execute(select(dictionary_table).order_by(dictionary_table.c.id.desc()).limit(1)).first()
+        for entry in product_lists:
+            entry.setdefault('handlers', entry['team'] or [(None, None, None)])
+        builder = LeadBlockBuilder(self.seed, self.anchor, self.days, self.bounce_rate, self.expired_backlog,
+                                   self.order_data, product_lists, dictionary.data if dictionary else None,
+                                   dictionary.id if dictionary else None, LeadScoringService(self.db).load_epoch())
+
+        first_id = self._next_id(conn, tables['lead'])
+        tasks = [(block, first_id + start, min(self.BLOCK, count - start))
+                 for block, start in enumerate(range(0, count, self.BLOCK))]
+        pool = None
+        if self.workers > 1 and len(tasks) > 1:
+            method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+            pool = multiprocessing.get_context(method).Pool(self.workers, _init_worker, (builder,))
+            blocks = pool.imap(_build_block, tasks)
+        else:
+            blocks = (builder.build(*task) for task in tasks)
+
+        started = time.monotonic()
+        pending = {name: [] for name in
+                   ('lead', 'lead_history', 'lead_order_data', 'mailketing_membership', 'bounce_email')}
+        written = 0
+        try:
+            for task, rows in zip(tasks, blocks):
+                leads, history, orders, memberships, bounces = rows
+                for row in memberships:
+                    key = (row['email_lower'], row['list_id'])
+                    if key not in members:
+                        members.add(key)
+                        pending['mailketing_membership'].append(row)
+                for row in bounces:
+                    if row['email_lower'] not in bounced:
+                        bounced.add(row['email_lower'])
+                        pending['bounce_email'].append(row)
+                pending['lead'].extend(leads)
+                pending['lead_history'].extend(history)
+                pending['lead_order_data'].extend(orders)
+                written += task[2]
+                if len(pending['lead']) >= self.chunk_size or written == count:
+                    # Parents first so foreign keys hold if they are enforced
+                    for name in pending:
+                        self._insert(conn, tables[name], pending[name])
+                        pending[name] = []
+                    conn.commit()
+                    elapsed = time.monotonic() - started
+                    self.log(f"  {written:,}/{count:,} leads, {sum(self.counts.values()):,} rows "
+                             f"({written / elapsed:,.0f} leads/s)")
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    def generate(self, product_lists=0, leads=0, sales_people=60, stores=5):
+        """Generate a catalog (when product_lists > 0) and leads; returns rows written per table"""
+        self.counts = {}
+        conn, restore = self._connect()
+        try:
+            if product_lists:
+                self.generate_catalog(conn, product_lists, sales_people, stores)
+            if leads:
+                self.generate_leads(conn, leads, self.load_product_lists(conn))
+        finally:
+            self._close(conn, restore)
+        return dict(self.counts)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic dataset for scale testing')
+    parser.add_argument('--database-url', help='Target database (default: DATABASE_URL, as used by the app)')
+    parser.add_argument('--product-lists', type=int,
+                        help='Product lists to create (default 200, none with --append)')
+    parser.add_argument('--sales-people', type=int, default=60, help='Sales people to create (default 60)')
+    parser.add_argument('--stores', type=int, default=5)
+    parser.add_argument('--leads', type=int, default=100000, help='Leads to create (default 100000)')
+    parser.add_argument('--days', type=int, default=180, help='Spread leads over this many days (default 180)')
+    parser.add_argument('--anchor', help='Newest date of the data, YYYY-MM-DD (default today)')
+    parser.add_argument('--bounce-rate', type=float, default=0.02, help='Share of leads whose email bounced')
+    parser.add_argument('--expired-backlog', type=float, default=0.05,
+                        help='Share of leads past 7 days still in follow-up (for check_expired_leads)')
+    parser.add_argument('--no-order-data', action='store_true', help='Skip LeadOrderData payloads')
+    parser.add_argument('--chunk-size', type=int, default=20000, help='Leads per transaction (default 20000)')
+    parser.add_argument('--workers', type=int, help='Processes building rows (default: CPU count - 1)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--append', action='store_true', help='Allow adding to a database that has leads')
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+
+    from app import app
+    from database import db
+    from models import Lead
+
+    with app.app_context():
+        db.create_all()
+        if Lead.query.first() is not None and not args.append:
+            parser.error(f"{db.engine.url} already has leads; pass --append to add to it")
+        product_lists = args.product_lists if args.product_lists is not None else (0 if args.append else 200)
+
+        print("=" * 60)
+        print(f"Generating {product_lists:,} product lists and {args.leads:,} leads into {db.engine.url!r}")
+        print("=" * 60)
+        generator = DatasetGenerator(
+            db, seed=args.seed, anchor=datetime.strptime(args.anchor, '%Y-%m-%d') if args.anchor else None,
+            days=args.days, chunk_size=args.chunk_size, bounce_rate=args.bounce_rate,
+            expired_backlog=args.expired_backlog, order_data=not args.no_order_data, workers=args.workers
+        )
+        started = time.monotonic()
+        counts = generator.generate(product_lists=product_lists, leads=args.leads, sales_people=args.sales_people,
+                                    stores=args.stores)
+        elapsed = time.monotonic() - started
+
+        print()
+        for table, count in counts.items():
+            print(f"{table:<28}{count:>12,}")
+        total = sum(counts.values())
+        print(f"{'total':<28}{total:>12,}  in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
@@ -0,0 +1,182 @@
+"""
+Load driver replaying signed ScaleV webhooks at a target rate
+
+Orders are created with `order.created` and a share of them is later paid
+with `order.payment_status_changed`, each body signed like ScaleV does
+(HMAC-SHA256 of the raw body in X-Scalev-Signature). Sends follow a fixed
+schedule (open loop): when the app falls behind, requests queue up in the
+driver instead of slowing the offered rate, and latency is measured from
+the scheduled send time so that queueing shows up in the percentiles.
+
+    python -m bench.load http://127.0.0.1:5000 --secret s3cret --rate 20 --duration 30 --products "Produk A"
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from bench.report import percentiles
+
+
+class WebhookLoadDriver:
+    """Send signed webhooks to `<base_url>/webhook/scalev` at `rate` per second
+
+    `products` are (product_name, variant_sku, variant_unique_id) tuples the
+    orders pick from; `paid_ratio` of the sends pay an earlier order instead
+    of creating a new one.
+    """
+
+    def __init__(self, base_url, secret, products, rate=10, duration=30, concurrency=32,
+                 paid_ratio=0.3, seed=1, order_prefix=None, timeout=30):
+        self.url = base_url.rstrip('/') + '/webhook/scalev'
+        self.secret = secret.encode()
+        self.products = list(products)
+        self.rate = rate
+        self.duration = duration
+        self.concurrency = concurrency
+        self.paid_ratio = paid_ratio
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.order_prefix = order_prefix or f"B{datetime.now().strftime('%H%M%S')}"
+        self._sequence = 0
+        self._unpaid = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._samples = []  # (event, status, latency_ms, service_ms)
+
+    # ------------------------------------------------------------------
+    # Payloads
+    # ------------------------------------------------------------------
+
+    def _order_created(self):
+        self._sequence += 1
+        order_id = f'{self.order_prefix}{self._sequence:07d}'
+        product_name, sku, unique_id = self.rng.choice(self.products)
+        self._unpaid.append(order_id)
+        return {
+            'event': 'order.created',
+            'unique_id': f'evt-{order_id}-created',
+            'timestamp': datetime.now().isoformat(),
+            'data': {
+                'order_id': order_id,
+                'payment_status': 'unpaid',
+                'orderlines': [{
+                    'product_name': product_name,
+                    'variant_sku': sku,
+                    'variant_unique_id': unique_id,
+                    'quantity': 1,
+                    'product_price': self.rng.choice((99000, 149000, 249000))
+                }],
+                'destination_address': {
+                    'name': f'Pembeli {self._sequence}',
+                    'email': f'pembeli{self._sequence}.{self.order_prefix.lower()}@bench.test',
+                    'phone': f'08{self.rng.randrange(10**9, 10**10)}'
+                }
+            }
+        }
+
+    def _order_paid(self):
+        order_id = self._unpaid.pop(self.rng.randrange(len(self._unpaid)))
+        return {
+            'event': 'order.payment_status_changed',
+            'unique_id': f'evt-{order_id}-paid',
+            'timestamp': datetime.now().isoformat(),
+            'data': {'order_id': order_id, 'payment_status': 'paid'}
+        }
+
+    def next_payload(self):
+        if self._unpaid and self.rng.random() < self.paid_ratio:
+            return self._order_paid()
+        return self._order_created()
+
+    def sign(self, body):
+        return hmac.new(self.secret, body, hashlib.sha256).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Sending
+    # ------------------------------------------------------------------
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _send(self, payload, scheduled_at):
+        body = json.dumps(payload).encode()
+        headers = {'Content-Type': 'application/json', 'X-Scalev-Signature': self.sign(body)}
+        sent_at = time.perf_counter()
+        try:
+            response = self._session().post(self.url, data=body, headers=headers, timeout=self.timeout)
+            status = response.status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        done_at = time.perf_counter()
+        with self._lock:
+            self._samples.append((payload['event'], status, (done_at - scheduled_at) * 1000,
+                                  (done_at - sent_at) * 1000))
+
+    def run(self):
+        """Send for `duration` seconds, wait for the answers, return the report"""
+        total = int(self.rate * self.duration)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='load') as pool:
+            for i in range(total):
+                scheduled_at = started + i / self.rate
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._send, self.next_payload(), scheduled_at)
+            offered_seconds = time.perf_counter() - started
+        elapsed = time.perf_counter() - started
+        return self.report(total, offered_seconds, elapsed)
+
+    def report(self, sent, offered_seconds, elapsed):
+        statuses = Counter(str(status) for _, status, _, _ in self._samples)
+        ok = [s for s in self._samples if isinstance(s[1], int) and s[1] < 400]
+        by_event = defaultdict(list)
+        for event, _, latency, _ in self._samples:
+            by_event[event].append(latency)
+        return {
+            'target_rate': self.rate,
+            'duration_s': self.duration,
+            'sent': sent,
+            'offered_rate': round(sent / offered_seconds, 2) if offered_seconds else None,
+            'elapsed_s': round(elapsed, 3),
+            'throughput_rps': round(len(ok) / elapsed, 2) if elapsed else None,
+            'ok': len(ok),
+            'errors': sent - len(ok),
+            'statuses': dict(statuses),
+            'latency_ms': percentiles([s[2] for s in self._samples]),
+            'service_ms': percentiles([s[3] for s in self._samples]),
+            'by_event': {event: dict(count=len(values), latency_ms=percentiles(values))
+                         for event, values in sorted(by_event.items())}
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay signed ScaleV webhooks at a target rate')
+    parser.add_argument('base_url', help='App base URL, e.g. http://127.0.0.1:5000')
+    parser.add_argument('--secret', required=True, help='ScaleV webhook secret configured in Settings')
+    parser.add_argument('--products', action='append', required=True, metavar='NAME[:SKU[:VARIANT_ID]]',
+                        help='Product of a configured product list (repeatable)')
+    parser.add_argument('--rate', type=float, default=10, help='Webhooks per second (default 10)')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to send for (default 30)')
+    parser.add_argument('--concurrency', type=int, default=32, help='Max requests in flight (default 32)')
+    parser.add_argument('--paid-ratio', type=float, default=0.3, help='Share of sends that pay an order')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    products = [tuple((value.split(':') + [None, None])[:3]) for value in args.products]
+    driver = WebhookLoadDriver(args.base_url, args.secret, products, rate=args.rate, duration=args.duration,
+                               concurrency=args.concurrency, paid_ratio=args.paid_ratio, seed=args.seed)
+    print(json.dumps(driver.run(), indent=2))
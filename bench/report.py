@@ -0,0 +1,56 @@
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentiles(values):
+    """{'p50': .., 'p90': .., 'p95': .., 'p99': .., 'max': .., 'mean': ..} (nearest rank)"""
+    if not values:
+        return dict({f'p{p}': None for p in PERCENTILES}, max=None, mean=None)
+    ordered = sorted(values)
+    summary = {}
+    for p in PERCENTILES:
+        rank = max(1, -(-p * len(ordered) // 100))  # ceil(p/100 * n)
+        summary[f'p{p}'] = round(ordered[rank - 1], 3)
+    summary['max'] = round(ordered[-1], 3)
+    summary['mean'] = round(sum(ordered) / len(ordered), 3)
+    return summary
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(RESULTS_DIR), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment():
+    return {
+        'git': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count()
+    }
+
+
+def save(result, label, directory=RESULTS_DIR):
+    """Write a run to `<directory>/<timestamp>-<label>.json`; returns the path"""
+    os.makedirs(directory, exist_ok=True)
+    slug = ''.join(ch if ch.isalnum() or ch in '-_' else '_' for ch in label)[:60] or 'run'
+    path = os.path.join(directory, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{slug}.json")
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+    return path
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
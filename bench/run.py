@@ -0,0 +1,379 @@
+"""
+Offline benchmark of the webhook path, /leads and check_expired_leads
+
+Starts the provider stubs (bench/stubs.py), points the app at them and at
+a throwaway SQLite database, seeds settings, product lists and leads, and
+serves the app on a local port with the threaded development server. Then
+it runs three scenarios and writes one JSON result file that
+bench/compare.py can diff against another run:
+
+    webhook              signed ScaleV webhooks at --rate for --duration (bench/load.py)
+    leads                GET /leads with the common filters, --leads-concurrency at a time
+    check_expired_leads  one run of the job over --expired follow-up leads older than 7 days
+
+Every scenario reports throughput, latency percentiles and DB lock waits:
+SQLite takes its write lock on the first write statement of a transaction
+and the exclusive lock at commit, so the time spent in those calls is
+where writers wait for each other (up to the 5s busy timeout, after which
+"database is locked" is raised and counted).
+
+    python -m bench.run --label baseline
+    python -m bench.run --label slow-scalev --rate 30 --latency scalev=300 --error-rate mailketing=0.05
+    python -m bench.compare bench/results/<a>.json bench/results/<b>.json
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+
+from bench.dataset import DatasetGenerator
+from bench.load import WebhookLoadDriver
+from bench.report import RESULTS_DIR, environment, percentiles, save
+from bench.stubs import StubCatalog, StubServer, add_profile_arguments, profiles_from_args
+
+
+WEBHOOK_SECRET = 'bench-webhook-secret'
+
+LEADS_QUERIES = (
+    {},
+    {'status': 'follow_up'},
+    {'status': 'closing'},
+    {'sort': 'score'},
+    {'page': 5},
+    {'sales_person': 'CS 1'},
+    {'product': 'Produk Bench 2'},
+)
+
+
+class DbLockProbe:
+    """Time spent in write statements and commits, and "database is locked" errors"""
+
+    WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+    def __init__(self, engine, slow_ms=50):
+        from sqlalchemy import event
+
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self.reset()
+        event.listen(engine, 'before_cursor_execute', self._before_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+
+        # Commits have no "after" event; time the dialect call instead
+        do_commit = engine.dialect.do_commit
+
+        def timed_commit(dbapi_connection):
+            started = time.perf_counter()
+            try:
+                do_commit(dbapi_connection)
+            finally:
+                self._record('commit', (time.perf_counter() - started) * 1000)
+        engine.dialect.do_commit = timed_commit
+
+    def reset(self):
+        with self._lock:
+            self._timings = {'write': [], 'commit': []}
+            self._locked_errors = 0
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('bench_started_at', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('bench_started_at')
+        if not started:
+            return
+        elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+        if statement.lstrip().upper().startswith(self.WRITE_PREFIXES):
+            self._record('write', elapsed_ms)
+
+    def _handle_error(self, context):
+        started = context.connection.info.get('bench_started_at') if context.connection is not None else None
+        if started:
+            started.pop()
+        if 'database is locked' in str(context.original_exception):
+            with self._lock:
+                self._locked_errors += 1
+
+    def _record(self, kind, elapsed_ms):
+        with self._lock:
+            self._timings[kind].append(elapsed_ms)
+
+    def report(self):
+        with self._lock:
+            writes = list(self._timings['write'])
+            commits = list(self._timings['commit'])
+            locked_errors = self._locked_errors
+        waits = writes + commits
+        return {
+            'write_statements': len(writes),
+            'commits': len(commits),
+            'write_ms': percentiles(writes),
+            'commit_ms': percentiles(commits),
+            f'waits_over_{self.slow_ms}ms': sum(1 for value in waits if value > self.slow_ms),
+            'wait_total_ms': round(sum(waits), 1),
+            'locked_errors': locked_errors
+        }
+
+
+# ----------------------------------------------------------------------
+# Setup
+# ----------------------------------------------------------------------
+
+def configure_environment(stub_url, database_url, work_dir):
+    """Must run before `app` is imported: services read these at construction"""
+    os.environ['SCALEV_API_BASE'] = stub_url
+    os.environ['MAILKETING_API_BASE'] = stub_url
+    os.environ['TELEGRAM_API_BASE'] = stub_url
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['METRICS_DIR'] = os.path.join(work_dir, 'metrics')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+
+def seed(app, db, catalog, background_leads, rng, dataset_seed):
+    """Settings pointing at the stubs, product lists from the stub catalog and background leads"""
+    from models import Settings, ProductList
+
+    with app.app_context():
+        db.create_all()
+        settings_obj = Settings.query.first() or Settings()
+        settings_obj.scalev_api_key = 'bench-scalev-key'
+        settings_obj.scalev_webhook_secret = WEBHOOK_SECRET
+        settings_obj.mailketing_api_key = 'bench-mailketing-key'
+        settings_obj.telegram_bot_token = '123456:bench-telegram-token'
+        settings_obj.telegram_chat_id = '1'
+        settings_obj.telegram_enabled = True
+        db.session.add(settings_obj)
+
+        # Two lists per product, each for half of the sales people, so every
+        # handler matches one of several candidates (like multi-CS setups)
+        people = catalog.all_sales_people()
+        halves = (people[::2], people[1::2])
+        list_ids = [str(entry['list_id']) for entry in catalog.lists]
+        existing = {pl.product_id for pl in ProductList.query.all()}
+        for store in catalog.stores:
+            for product in catalog.products[store['id']]:
+                variant = product['variants'][0]
+                if variant['sku'] in existing:
+                    continue
+                for half in halves:
+                    product_list = ProductList(
+                        store_id=store['id'], store_name=store['name'], product_name=product['name'],
+                        product_id=variant['sku'], mailketing_list_followup=rng.choice(list_ids),
+                        mailketing_list_closing=rng.choice(list_ids), mailketing_list_not_closing=rng.choice(list_ids)
+                    )
+                    product_list.set_sales_persons([str(p['id']) for p in half], [p['fullname'] for p in half],
+                                                   [p['email'] for p in half])
+                    db.session.add(product_list)
+                    # Sales people of this list must exist before the next one looks them up
+                    db.session.flush()
+        db.session.commit()
+
+        # Background leads from bench/dataset.py, all younger than the 7 day
+        # follow-up window so check_expired_leads only sees its own leads
+        if background_leads:
+            from models import get_wib_now
+            DatasetGenerator(db, seed=dataset_seed, anchor=get_wib_now(), days=6, expired_backlog=0,
+                             log=lambda message: None).generate(leads=background_leads)
+
+
+def insert_expired_leads(app, db, count, rng):
+    """Follow-up leads older than 7 days, for check_expired_leads to move"""
+    from sqlalchemy import insert
+    from models import ProductList, Lead
+
+    with app.app_context():
+        product_list_ids = [pl.id for pl in ProductList.query.all()]
+        started = datetime.now() - timedelta(days=8)
+        rows = [{
+            'product_list_id': rng.choice(product_list_ids), 'order_id': f'EXP{n:08d}', 'name': f'Expired {n}',
+            'email': f'expired{n}@bench.test', 'status': 'follow_up', 'created_at': started,
+            'updated_at': started, 'follow_up_start': started - timedelta(hours=rng.uniform(0, 48))
+        } for n in range(count)]
+        for i in range(0, len(rows), 5000):
+            db.session.execute(insert(Lead), rows[i:i + 5000])
+        db.session.commit()
+
+
+def serve(app, host='127.0.0.1'):
+    from werkzeug.serving import make_server
+
+    server = make_server(host, 0, app, threaded=True)
+    # One access log line per request would dominate the output (and the CPU)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    threading.Thread(target=server.serve_forever, name='bench-app', daemon=True).start()
+    return server, f'http://{host}:{server.server_port}'
+
+
+def app_state(app, db):
+    from sqlalchemy import func
+    from models import Lead
+    from services.outbound_job_service import OutboundJobService
+
+    with app.app_context():
+        statuses = dict(db.session.query(Lead.status, func.count(Lead.id)).group_by(Lead.status).all())
+        return {'leads_by_status': statuses, 'outbound_jobs': OutboundJobService(db).count_by_status()}
+
+
+# ----------------------------------------------------------------------
+# Scenarios
+# ----------------------------------------------------------------------
+
+def run_webhook(base_url, catalog, args):
+    products = [(p['name'], p['variants'][0]['sku'], p['variants'][0]['unique_id'])
+                for store in catalog.stores for p in catalog.products[store['id']]]
+    driver = WebhookLoadDriver(base_url, WEBHOOK_SECRET, products, rate=args.rate, duration=args.duration,
+                               concurrency=args.concurrency, paid_ratio=args.paid_ratio, seed=args.seed)
+    return driver.run()
+
+
+def run_leads(base_url, app_module, args):
+    local = threading.local()
+
+    def session():
+        if getattr(local, 'session', None) is None:
+            local.session = requests.Session()
+            local.session.post(f'{base_url}/login', data={'email': app_module.ADMIN_EMAIL,
+                                                          'password': app_module.ADMIN_PASSWORD})
+        return local.session
+
+    def fetch(params):
+        started = time.perf_counter()
+        response = session().get(f'{base_url}/leads', params=params, allow_redirects=False, timeout=60)
+        return response.status_code, (time.perf_counter() - started) * 1000
+
+    queries = [LEADS_QUERIES[i % len(LEADS_QUERIES)] for i in range(args.leads_requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.leads_concurrency, thread_name_prefix='leads') as pool:
+        results = list(pool.map(fetch, queries))
+    elapsed = time.perf_counter() - started
+    ok = [latency for status, latency in results if status == 200]
+    return {
+        'requests': len(results),
+        'concurrency': args.leads_concurrency,
+        'ok': len(ok),
+        'errors': len(results) - len(ok),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(ok) / elapsed, 2) if elapsed else None,
+        'latency_ms': percentiles([latency for _, latency in results])
+    }
+
+
+def run_check_expired_leads(app_module, args):
+    quiet = open(os.devnull, 'w') if not args.verbose else None
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+        app_module.check_expired_leads()
+    elapsed = time.perf_counter() - started
+    if quiet:
+        quiet.close()
+    return {
+        'expired_leads': args.expired,
+        'elapsed_s': round(elapsed, 3),
+        'leads_per_s': round(args.expired / elapsed, 1) if elapsed else None
+    }
+
+
+SCENARIOS = ('webhook', 'leads', 'check_expired_leads')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmark with local provider stubs')
+    parser.add_argument('--label', default='run', help='Name of the result file')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Only run these (repeatable)')
+    parser.add_argument('--rate', type=float, default=20, help='Webhooks per second (default 20)')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of webhook load (default 30)')
+    parser.add_argument('--concurrency', type=int, default=32, help='Webhooks in flight at most (default 32)')
+    parser.add_argument('--paid-ratio', type=float, default=0.3, help='Share of webhooks that pay an order')
+    parser.add_argument('--leads', type=int, default=5000, help='Background leads to seed (default 5000)')
+    parser.add_argument('--leads-requests', type=int, default=200, help='GET /leads requests (default 200)')
+    parser.add_argument('--leads-concurrency', type=int, default=4)
+    parser.add_argument('--expired', type=int, default=500, help='Expired leads for the job (default 500)')
+    parser.add_argument('--database-url', help='Run against this database instead of a temporary SQLite file')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output-dir', help='Where to write the result (default bench/results)')
+    parser.add_argument('--verbose', action='store_true', help='Keep the job output')
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    scenarios = args.scenario or list(SCENARIOS)
+
+    work_dir = tempfile.mkdtemp(prefix='bench-')
+    catalog = StubCatalog(seed=args.seed)
+    stubs = StubServer(catalog=catalog, profiles=profiles_from_args(args)).start()
+    database_url = args.database_url or f"sqlite:///{os.path.join(work_dir, 'bench.db')}"
+    configure_environment(stubs.url, database_url, work_dir)
+
+    import app as app_module
+    from database import db
+
+    rng = random.Random(args.seed)
+    print(f"Seeding {args.leads} leads...")
+    seed(app_module.app, db, catalog, args.leads, rng, args.seed)
+    with app_module.app.app_context():
+        probe = DbLockProbe(db.engine)
+    server, base_url = serve(app_module.app)
+    print(f"App on {base_url}, stubs on {stubs.url}")
+
+    result = {
+        'label': args.label,
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('label', 'output_dir', 'verbose')},
+        'stub_profiles': stubs.state.stats()['profiles'],
+        'scenarios': {}
+    }
+    try:
+        for name in scenarios:
+            if name == 'check_expired_leads':
+                insert_expired_leads(app_module.app, db, args.expired, rng)
+            probe.reset()
+            stubs.state.reset()
+            print(f"Running {name}...")
+            if name == 'webhook':
+                report = run_webhook(base_url, catalog, args)
+            elif name == 'leads':
+                report = run_leads(base_url, app_module, args)
+            else:
+                report = run_check_expired_leads(app_module, args)
+            report['db_locks'] = probe.report()
+            report['stub_requests'] = stubs.state.stats()['requests']
+            report['stub_faults'] = stubs.state.stats()['faults']
+            result['scenarios'][name] = report
+            print(f"  {name}: {summary_line(report)}")
+        result['final_state'] = app_state(app_module.app, db)
+    finally:
+        server.shutdown()
+        stubs.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    path = save(result, args.label, args.output_dir or RESULTS_DIR)
+    print(f"Result written to {path}")
+    return result
+
+
+def summary_line(report):
+    latency = report.get('latency_ms') or {}
+    parts = []
+    if 'throughput_rps' in report:
+        parts.append(f"{report['throughput_rps']} req/s")
+    if latency.get('p50') is not None:
+        parts.append(f"p50 {latency['p50']:.0f}ms p99 {latency['p99']:.0f}ms")
+    if 'elapsed_s' in report and 'leads_per_s' in report:
+        parts.append(f"{report['elapsed_s']}s ({report['leads_per_s']} leads/s)")
+    locks = report['db_locks']
+    parts.append(f"lock wait {locks['wait_total_ms']:.0f}ms, {locks['locked_errors']} locked errors")
+    return ', '.join(parts)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,347 @@
+"""
+Local stub servers for ScaleV, Mailketing and Telegram
+
+One HTTP server answers the endpoints the app calls on all three
+providers, so a benchmark never touches the real APIs:
+
+    GET  /v2/order/<id>                      ScaleV order detail (handler)
+    GET  /v2/stores                          ScaleV stores (paginated)
+    GET  /v2/stores/<id>/products            ScaleV products of a store
+    GET  /v2/stores/<id>/sales-people        ScaleV sales people of a store
+    POST /api/v1/addsubtolist                Mailketing add subscriber
+    POST /api/v1/viewlist                    Mailketing lists
+    POST /bot<token>/sendMessage             Telegram message
+    GET  /bot<token>/getMe                   Telegram bot info
+    GET  /__stats                            request counts and injected faults
+    POST /__reset                            clear the counts
+
+Point the app at it with SCALEV_API_BASE, MAILKETING_API_BASE and
+TELEGRAM_API_BASE. Latency, jitter, error rate (HTTP 503) and throttle
+rate (HTTP 429) are set per provider:
+
+    python -m bench.stubs --port 8099 --latency scalev=120 --error-rate mailketing=0.02
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+PROVIDERS = ('scalev', 'mailketing', 'telegram')
+
+
+class ProviderProfile:
+    """Latency and fault injection of one stubbed provider"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, throttle_rate=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+class StubCatalog:
+    """Deterministic stores, products, sales people and Mailketing lists
+
+    The benchmark seeds product lists from the same catalog, so webhooks for
+    its products match and the handler returned for an order is one of the
+    sales people mapped to them.
+    """
+
+    def __init__(self, stores=3, products_per_store=10, sales_people_per_store=4, lists=12, seed=1):
+        self.seed = seed
+        self.stores = []
+        self.products = {}
+        self.sales_people = {}
+        for s in range(1, stores + 1):
+            store_id = str(1000 + s)
+            self.stores.append({'id': store_id, 'name': f'Toko Bench {s}', 'unique_id': f'store-{store_id}'})
+            self.products[store_id] = [
+                {
+                    'id': f'{store_id}{p:03d}',
+                    'name': f'Produk Bench {s}-{p}',
+                    'variants': [{
+                        'id': f'{store_id}{p:03d}1',
+                        'unique_id': f'var-{store_id}-{p}',
+                        'sku': f'SKU-{s}-{p}',
+                        'name': f'Produk Bench {s}-{p}'
+                    }]
+                }
+                for p in range(1, products_per_store + 1)
+            ]
+            self.sales_people[store_id] = [
+                {'user': {'id': 50000 + s * 100 + c, 'fullname': f'CS {s}-{c}', 'email': f'cs{s}.{c}@bench.test'}}
+                for c in range(1, sales_people_per_store + 1)
+            ]
+        self.lists = [{'list_id': 9000 + i, 'list_name': f'Bench List {i}'} for i in range(1, lists + 1)]
+
+    def all_sales_people(self):
+        return [person['user'] for people in self.sales_people.values() for person in people]
+
+    def handler_for(self, order_id):
+        """Sales person handling an order: stable per order id"""
+        people = self.all_sales_people()
+        if not people:
+            return None
+        index = random.Random(f'{self.seed}:{order_id}').randrange(len(people))
+        return people[index]
+
+
+class StubState:
+    def __init__(self, catalog, profiles):
+        self.catalog = catalog
+        self.profiles = profiles
+        self.counts = Counter()
+        self.faults = Counter()
+        self.lock = threading.Lock()
+        self.rng = random.Random(7)
+
+    def count(self, provider, endpoint, fault=None):
+        with self.lock:
+            self.counts[f'{provider} {endpoint}'] += 1
+            if fault:
+                self.faults[f'{provider} {fault}'] += 1
+
+    def roll(self):
+        with self.lock:
+            return self.rng.random()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'requests': dict(self.counts),
+                'faults': dict(self.faults),
+                'profiles': {name: profile.to_dict() for name, profile in self.profiles.items()}
+            }
+
+    def reset(self):
+        with self.lock:
+            self.counts.clear()
+            self.faults.clear()
+
+
+def _paginate(items, query, page_size_default=25):
+    page_size = int(query.get('page_size', [page_size_default])[0])
+    last_id = query.get('last_id', [None])[0]
+    start = 0
+    if last_id is not None:
+        ids = [str(item.get('id', item.get('user', {}).get('id'))) for item in items]
+        start = ids.index(last_id) + 1 if last_id in ids else len(items)
+    page = items[start:start + page_size]
+    has_next = start + page_size < len(items)
+    last = page[-1] if page else None
+    return {
+        'status': 'Success',
+        'data': {
+            'results': page,
+            'has_next': has_next,
+            'last_id': str(last.get('id', last.get('user', {}).get('id'))) if last else last_id
+        }
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'BenchStub/1.0'
+
+    ROUTES = (
+        ('GET', re.compile(r'^/v2/order/(?P<order_id>[^/]+)$'), 'scalev', 'order'),
+        ('GET', re.compile(r'^/v2/stores$'), 'scalev', 'stores'),
+        ('GET', re.compile(r'^/v2/stores/(?P<store_id>[^/]+)/products$'), 'scalev', 'store_products'),
+        ('GET', re.compile(r'^/v2/stores/(?P<store_id>[^/]+)/sales-people$'), 'scalev', 'store_sales_people'),
+        ('POST', re.compile(r'^/api/v1/addsubtolist$'), 'mailketing', 'addsubtolist'),
+        ('POST', re.compile(r'^/api/v1/viewlist$'), 'mailketing', 'viewlist'),
+        ('POST', re.compile(r'^/bot[^/]+/sendMessage$'), 'telegram', 'sendMessage'),
+        ('GET', re.compile(r'^/bot[^/]+/getMe$'), 'telegram', 'getMe'),
+    )
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if 'application/json' in (self.headers.get('Content-Type') or ''):
+            try:
+                return json.loads(raw or b'{}')
+            except ValueError:
+                return {}
+        return {key: values[0] for key, values in parse_qs(raw.decode()).items()}
+
+    def _dispatch(self, method):
+        state = self.server.state
+        url = urlsplit(self.path)
+        # Always consume the body so the keep-alive connection stays usable
+        body = self._read_body() if method == 'POST' else {}
+        if method == 'GET' and url.path == '/__stats':
+            return self._send_json(200, state.stats())
+        if method == 'POST' and url.path == '/__reset':
+            state.reset()
+            return self._send_json(200, {'ok': True})
+
+        for route_method, pattern, provider, endpoint in self.ROUTES:
+            match = pattern.match(url.path)
+            if route_method == method and match:
+                break
+        else:
+            return self._send_json(404, {'status': 'error', 'message': f'No stub for {method} {url.path}'})
+
+        profile = state.profiles[provider]
+        delay = profile.latency_ms + (state.roll() * profile.jitter_ms if profile.jitter_ms else 0)
+        if delay:
+            time.sleep(delay / 1000)
+
+        roll = state.roll()
+        if roll < profile.throttle_rate:
+            state.count(provider, endpoint, 'throttled')
+            if provider == 'telegram':
+                return self._send_json(429, {'ok': False, 'error_code': 429, 'parameters': {'retry_after': 1}})
+            return self._send_json(429, {'status': 'error', 'message': 'Too Many Requests'}, {'Retry-After': '1'})
+        if roll < profile.throttle_rate + profile.error_rate:
+            state.count(provider, endpoint, 'error')
+            return self._send_json(503, {'status': 'error', 'message': 'Injected failure'})
+
+        state.count(provider, endpoint)
+        status, response = getattr(self, f'_{provider}_{endpoint}')(state.catalog, match.groupdict(),
+                                                                   parse_qs(url.query), body)
+        self._send_json(status, response)
+
+    # ScaleV ----------------------------------------------------------
+
+    def _scalev_order(self, catalog, params, query, body):
+        order_id = params['order_id']
+        handler = catalog.handler_for(order_id)
+        return 200, {'status': 'Success', 'data': {'order_id': order_id, 'handler': handler}}
+
+    def _scalev_stores(self, catalog, params, query, body):
+        return 200, _paginate(catalog.stores, query)
+
+    def _scalev_store_products(self, catalog, params, query, body):
+        return 200, _paginate(catalog.products.get(params['store_id'], []), query)
+
+    def _scalev_store_sales_people(self, catalog, params, query, body):
+        return 200, _paginate(catalog.sales_people.get(params['store_id'], []), query)
+
+    # Mailketing ------------------------------------------------------
+
+    def _mailketing_addsubtolist(self, catalog, params, query, body):
+        if not body.get('api_token'):
+            return 200, {'status': 'failed', 'response': 'Invalid api token'}
+        return 200, {'status': 'success', 'response': 'Mail Sukses Ditambahkan'}
+
+    def _mailketing_viewlist(self, catalog, params, query, body):
+        return 200, {'status': 'success', 'lists': catalog.lists}
+
+    # Telegram --------------------------------------------------------
+
+    def _telegram_sendMessage(self, catalog, params, query, body):
+        return 200, {'ok': True, 'result': {'message_id': 1, 'chat': {'id': body.get('chat_id')}}}
+
+    def _telegram_getMe(self, catalog, params, query, body):
+        return 200, {'ok': True, 'result': {'id': 1, 'first_name': 'Bench Bot', 'username': 'bench_bot'}}
+
+
+class StubServer:
+    """Stub providers on a background thread; `url` is the base for all three"""
+
+    def __init__(self, host='127.0.0.1', port=0, catalog=None, profiles=None):
+        profiles = dict(profiles or {})
+        for name in PROVIDERS:
+            profiles.setdefault(name, ProviderProfile())
+        self.state = StubState(catalog or StubCatalog(), profiles)
+        self.httpd = ThreadingHTTPServer((host, port), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='bench-stubs', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def parse_provider_values(pairs, cast=float):
+    """['scalev=120', 'mailketing=30'] -> {'scalev': 120.0, ...}; a bare value applies to all"""
+    values = {}
+    for pair in pairs or []:
+        name, _, value = pair.rpartition('=')
+        targets = [name] if name else PROVIDERS
+        for target in targets:
+            if target not in PROVIDERS:
+                raise ValueError(f'Unknown provider {target!r} (expected one of {", ".join(PROVIDERS)})')
+            values[target] = cast(value)
+    return values
+
+
+def add_profile_arguments(parser):
+    parser.add_argument('--latency', action='append', metavar='[PROVIDER=]MS',
+                        help='Response delay in ms (repeatable, default 0)')
+    parser.add_argument('--jitter', action='append', metavar='[PROVIDER=]MS',
+                        help='Extra random delay of up to MS')
+    parser.add_argument('--error-rate', action='append', metavar='[PROVIDER=]RATE',
+                        help='Share of requests answered with HTTP 503')
+    parser.add_argument('--throttle-rate', action='append', metavar='[PROVIDER=]RATE',
+                        help='Share of requests answered with HTTP 429')
+
+
+def profiles_from_args(args):
+    latency = parse_provider_values(args.latency)
+    jitter = parse_provider_values(args.jitter)
+    error_rate = parse_provider_values(args.error_rate)
+    throttle_rate = parse_provider_values(args.throttle_rate)
+    return {
+        name: ProviderProfile(latency.get(name, 0), jitter.get(name, 0),
+                              error_rate.get(name, 0.0), throttle_rate.get(name, 0.0))
+        for name in PROVIDERS
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the ScaleV / Mailketing / Telegram stub server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    server = StubServer(args.host, args.port, profiles=profiles_from_args(args)).start()
+    print(f"Stub providers on {server.url}")
+    print(f"  SCALEV_API_BASE={server.url} MAILKETING_API_BASE={server.url} TELEGRAM_API_BASE={server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
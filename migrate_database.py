@@ -53,6 +53,21 @@ def migrate():
                     ("ALTER TABLE lead ADD COLUMN sales_person_name VARCHAR(255)", "Add sales_person_name to lead"),
                     ("ALTER TABLE lead ADD COLUMN sales_person_email VARCHAR(255)", "Add sales_person_email to lead"),
                     ("ALTER TABLE lead ADD COLUMN mailketing_list_id VARCHAR(100)", "Add mailketing_list_id to lead"),
+                    
+                    # Telegram digest mode
+                    ("ALTER TABLE settings ADD COLUMN telegram_digest_mode BOOLEAN DEFAULT 0", "Add telegram_digest_mode to settings"),
+                    ("ALTER TABLE settings ADD COLUMN telegram_digest_interval INTEGER DEFAULT 5", "Add telegram_digest_interval to settings"),
+                    
+                    # Engagement scoring
+                    ("ALTER TABLE lead ADD COLUMN engagement_score FLOAT NOT NULL DEFAULT 0", "Add engagement_score to lead"),
+                    ("CREATE INDEX IF NOT EXISTS ix_lead_status_engagement_score ON lead (status, engagement_score)", "Add (status, engagement_score) index to lead"),
+                    ("ALTER TABLE settings ADD COLUMN score_epoch DATETIME", "Add score_epoch to settings"),
+                    
+                    # Resolved order handler
+                    ("ALTER TABLE lead ADD COLUMN sales_person_id VARCHAR(100)", "Add sales_person_id to lead"),
+                    
+                    # Keyset scans for Mailketing re-sync jobs
+                    ("CREATE INDEX IF NOT EXISTS ix_lead_product_list_status_id ON lead (product_list_id, status, id)", "Add (product_list_id, status, id) index to lead"),
                 ]
                 
                 successful = 0
@@ -134,6 +149,79 @@ def migrate():
                 except Exception as e:
                     print(f"  ⚠ Warning during sales person migration: {str(e)}")
                 
+                # Copy JSON sales persons into sales_person / product_list_sales_person
+                try:
+                    result = connection.execute(text("""
+                        SELECT id, sales_person_ids, sales_person_names, sales_person_emails
+                        FROM product_list
+                        WHERE sales_person_ids IS NOT NULL AND sales_person_ids NOT IN ('', '[]')
+                        AND id NOT IN (SELECT product_list_id FROM product_list_sales_person)
+                    """))
+                    rows_to_migrate = result.fetchall()
+                    
+                    for pl_id, ids_json, names_json, emails_json in rows_to_migrate:
+                        ids = json.loads(ids_json or '[]')
+                        names = json.loads(names_json or '[]')
+                        emails = json.loads(emails_json or '[]')
+                        for position, sp_id in enumerate(ids):
+                            if not sp_id:
+                                continue
+                            name = names[position] if position < len(names) else None
+                            email = emails[position] if position < len(emails) else None
+                            connection.execute(text("""
+                                INSERT OR IGNORE INTO sales_person (scalev_id, name, name_lower, email, email_lower, created_at)
+                                VALUES (:id, :name, lower(trim(:name)), :email, lower(trim(:email)), CURRENT_TIMESTAMP)
+                            """), {"id": str(sp_id), "name": name, "email": email})
+                            connection.execute(text("""
+                                INSERT OR IGNORE INTO product_list_sales_person (product_list_id, sales_person_id, position)
+                                SELECT :pl_id, id, :position FROM sales_person WHERE scalev_id = :id
+                            """), {"pl_id": pl_id, "position": position, "id": str(sp_id)})
+                    
+                    if rows_to_migrate:
+                        print(f"  ✓ Migrated {len(rows_to_migrate)} product lists: JSON sales persons → product_list_sales_person")
+                    else:
+                        print(f"  ⊘ No data to migrate (product_list_sales_person)")
+                except Exception as e:
+                    print(f"  ⚠ Warning during sales person normalization: {str(e)}")
+                
+                # Move uncompressed lead.order_data into lead_order_data (zlib), in batches
+                try:
+                    from services.order_data_service import OrderDataService
+                    moved = 0
+                    while True:
+                        rows = connection.execute(text("""
+                            SELECT id, order_data FROM lead
+                            WHERE order_data IS NOT NULL
+                            ORDER BY id LIMIT 500
+                        """)).fetchall()
+                        if not rows:
+                            break
+                        for lead_id, order_data in rows:
+                            try:
+                                data = json.loads(order_data)
+                            except ValueError:
+                                data = {'raw': order_data}
+                            raw, payload = OrderDataService.encode(data)
+                            fields = OrderDataService.extract(data) if isinstance(data, dict) else {}
+                            connection.execute(text("""
+                                INSERT OR IGNORE INTO lead_order_data
+                                (lead_id, payload, raw_size, stored_size, product_name, variant_sku, variant_unique_id,
+                                 payment_status, order_status, payment_method, gross_revenue, created_at)
+                                VALUES (:lead_id, :payload, :raw_size, :stored_size, :product_name, :variant_sku, :variant_unique_id,
+                                        :payment_status, :order_status, :payment_method, :gross_revenue, CURRENT_TIMESTAMP)
+                            """), dict({key: None for key in ('product_name', 'variant_sku', 'variant_unique_id', 'payment_status',
+                                                              'order_status', 'payment_method', 'gross_revenue')},
+                                       lead_id=lead_id, payload=payload, raw_size=len(raw), stored_size=len(payload), **fields))
+                            connection.execute(text("UPDATE lead SET order_data = NULL WHERE id = :id"), {"id": lead_id})
+                        moved += len(rows)
+                    
+                    if moved > 0:
+                        print(f"  ✓ Compressed order data of {moved} leads into lead_order_data")
+                    else:
+                        print(f"  ⊘ No data to migrate (lead.order_data)")
+                except Exception as e:
+                    print(f"  ⚠ Warning during order data migration: {str(e)}")
+                
                 # Drop UNIQUE constraint from product_id (allows one product for multiple CS)
                 print("\nRemoving UNIQUE constraint from product_id...")
                 try:
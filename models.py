@@ -21,6 +21,9 @@ class Settings(db.Model):
     telegram_chat_id = db.Column(db.String(100), nullable=True)
     telegram_enabled = db.Column(db.Boolean, default=False)
     telegram_debug_mode = db.Column(db.Boolean, default=False)  # Send full webhook payload for debugging
+    telegram_digest_mode = db.Column(db.Boolean, default=False)  # Summarize open/click/unsubscribe events periodically
+    telegram_digest_interval = db.Column(db.Integer, default=5)  # Digest window in minutes
+    score_epoch = db.Column(db.DateTime, nullable=True)  # Epoch of Lead.engagement_score, see LeadScoringService
     created_at = db.Column(db.DateTime, default=get_wib_now)
     updated_at = db.Column(db.DateTime, default=get_wib_now, onupdate=get_wib_now)
     
@@ -46,9 +49,14 @@ class ProductList(db.Model):
     updated_at = db.Column(db.DateTime, default=get_wib_now, onupdate=get_wib_now)
     
     leads = db.relationship('Lead', backref='product_list', lazy=True)
+    # Normalized sales persons (used for matching); the JSON columns above are still written
+    sales_person_links = db.relationship('ProductListSalesPerson', order_by='ProductListSalesPerson.position',
+                                         cascade='all, delete-orphan', lazy='selectin')
     
     def get_sales_person_ids_list(self):
         """Get sales person IDs as list (backward compatible)"""
+        if self.sales_person_links:
+            return [link.sales_person.scalev_id for link in self.sales_person_links]
         # Check if new column exists (post-migration)
         if hasattr(self, 'sales_person_ids') and self.sales_person_ids:
             try:
@@ -62,6 +70,8 @@ class ProductList(db.Model):
     
     def get_sales_person_names_list(self):
         """Get sales person names as list (backward compatible)"""
+        if self.sales_person_links:
+            return [link.sales_person.name for link in self.sales_person_links]
         # Check if new column exists (post-migration)
         if hasattr(self, 'sales_person_names') and self.sales_person_names:
             try:
@@ -75,6 +85,8 @@ class ProductList(db.Model):
     
     def get_sales_person_emails_list(self):
         """Get sales person emails as list (backward compatible)"""
+        if self.sales_person_links:
+            return [link.sales_person.email for link in self.sales_person_links]
         # Check if new column exists (post-migration)
         if hasattr(self, 'sales_person_emails') and self.sales_person_emails:
             try:
@@ -95,9 +107,29 @@ class ProductList(db.Model):
             self.sales_person_names = json.dumps(names) if names else None
         if hasattr(self, 'sales_person_emails'):
             self.sales_person_emails = json.dumps(emails) if emails else None
+        
+        # Normalized rows, reusing existing links so the unique constraint holds
+        existing = {link.sales_person.scalev_id: link for link in self.sales_person_links}
+        links = []
+        with db.session.no_autoflush:
+            for position, sales_person_id in enumerate(ids or []):
+                sales_person_id = str(sales_person_id or '')
+                if not sales_person_id or any(link.sales_person.scalev_id == sales_person_id for link in links):
+                    continue
+                person = SalesPerson.get_or_create(
+                    sales_person_id,
+                    name=names[position] if names and position < len(names) else None,
+                    email=emails[position] if emails and position < len(emails) else None
+                )
+                link = existing.get(sales_person_id) or ProductListSalesPerson(sales_person=person)
+                link.position = position
+                links.append(link)
+        self.sales_person_links = links
     
     def is_for_all_sales(self):
         """Check if this list is for all sales persons (backward compatible)"""
+        if self.sales_person_links:
+            return False
         # Check new columns first
         if hasattr(self, 'sales_person_ids'):
             return not self.sales_person_ids or len(self.get_sales_person_ids_list()) == 0
@@ -127,6 +159,51 @@ class ProductList(db.Model):
     def __repr__(self):
         return f'<ProductList {self.product_name}>'
 
+class SalesPerson(db.Model):
+    """Sales person (CS) assigned to product lists, keyed by ScaleV user ID"""
+    id = db.Column(db.Integer, primary_key=True)
+    scalev_id = db.Column(db.String(100), nullable=False, unique=True)
+    name = db.Column(db.String(255), nullable=True)
+    name_lower = db.Column(db.String(255), nullable=True, index=True)
+    email = db.Column(db.String(255), nullable=True)
+    email_lower = db.Column(db.String(255), nullable=True, index=True)
+    created_at = db.Column(db.DateTime, default=get_wib_now)
+    
+    @classmethod
+    def get_or_create(cls, scalev_id, name=None, email=None):
+        """Sales person by ScaleV user ID, refreshing name and email when given"""
+        person = cls.query.filter_by(scalev_id=str(scalev_id)).first()
+        if not person:
+            person = cls(scalev_id=str(scalev_id))
+            db.session.add(person)
+        if name:
+            person.name = name
+            person.name_lower = name.strip().lower()
+        if email:
+            person.email = email
+            person.email_lower = email.strip().lower()
+        return person
+    
+    def __repr__(self):
+        return f'<SalesPerson {self.scalev_id} {self.name}>'
+
+class ProductListSalesPerson(db.Model):
+    """Sales persons served by a product list (none = all sales)"""
+    id = db.Column(db.Integer, primary_key=True)
+    product_list_id = db.Column(db.Integer, db.ForeignKey('product_list.id'), nullable=False)
+    sales_person_id = db.Column(db.Integer, db.ForeignKey('sales_person.id'), nullable=False)
+    position = db.Column(db.Integer, default=0)  # order as entered in the product list form
+    
+    sales_person = db.relationship('SalesPerson', lazy='joined')
+    
+    __table_args__ = (
+        db.UniqueConstraint('product_list_id', 'sales_person_id', name='uq_product_list_sales_person'),
+        db.Index('ix_product_list_sales_person_person', 'sales_person_id', 'product_list_id'),
+    )
+    
+    def __repr__(self):
+        return f'<ProductListSalesPerson {self.product_list_id} -> {self.sales_person_id}>'
+
 class Lead(db.Model):
     """Lead tracking"""
     id = db.Column(db.Integer, primary_key=True)
@@ -137,8 +214,10 @@ class Lead(db.Model):
     phone = db.Column(db.String(50), nullable=True)
     sales_person_name = db.Column(db.String(255), nullable=True)
     sales_person_email = db.Column(db.String(255), nullable=True)
+    sales_person_id = db.Column(db.String(100), nullable=True)  # ScaleV handler user id
     status = db.Column(db.String(50), default='follow_up')  # follow_up, closing, not_closing
-    order_data = db.Column(db.Text, nullable=True)  # JSON string of order details
+    # Legacy uncompressed payload; new payloads go to LeadOrderData. Deferred so lead lists never load it.
+    order_data_legacy = db.deferred(db.Column('order_data', db.Text, nullable=True))
     created_at = db.Column(db.DateTime, default=get_wib_now)
     updated_at = db.Column(db.DateTime, default=get_wib_now, onupdate=get_wib_now)
     follow_up_start = db.Column(db.DateTime, default=get_wib_now)
@@ -146,12 +225,35 @@ class Lead(db.Model):
     sent_to_mailketing = db.Column(db.Boolean, default=False)
     sent_to_mailketing_at = db.Column(db.DateTime, nullable=True)
     mailketing_list_id = db.Column(db.String(100), nullable=True)  # Which list was sent to
+    engagement_score = db.Column(db.Float, default=0.0, nullable=False)  # Epoch-scaled decayed counter, see LeadScoringService
     
     history = db.relationship('LeadHistory', backref='lead', lazy=True, cascade='all, delete-orphan')
+    order_record = db.relationship('LeadOrderData', uselist=False, lazy='select', cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        db.Index('ix_lead_status_engagement_score', 'status', 'engagement_score'),
+        db.Index('ix_lead_product_list_status_id', 'product_list_id', 'status', 'id'),
+    )
     
     def __repr__(self):
         return f'<Lead {self.email} - {self.status}>'
     
+    def get_order_data(self):
+        """Webhook order payload as a dict (None if not stored)"""
+        if self.order_record:
+            return self.order_record.get_data()
+        if self.order_data_legacy:
+            try:
+                return json.loads(self.order_data_legacy)
+            except ValueError:
+                return None
+        return None
+    
+    def get_engagement_score(self):
+        """Current (decayed) engagement score"""
+        from services.scoring_service import LeadScoringService
+        return LeadScoringService.current_score(self.engagement_score, get_wib_now())
+    
     def days_in_follow_up(self):
         """Calculate days in follow up"""
         if self.status != 'follow_up':
@@ -186,3 +288,279 @@ class BounceEmail(db.Model):
 
     def __repr__(self):
         return f'<BounceEmail {self.email_lower}>'
+
+
+class EngagementEvent(db.Model):
+    """Append-only Mailketing engagement events (open, click, unsubscribe, newsubscriber)"""
+    id = db.Column(db.Integer, primary_key=True)
+    lead_id = db.Column(db.Integer, db.ForeignKey('lead.id'), nullable=True)  # Interned email -> Lead.id
+    email_lower = db.Column(db.String(255), nullable=True)  # Only kept when no lead matched
+    event_type = db.Column(db.SmallInteger, nullable=False)  # See EngagementService.EVENT_TYPES
+    list_id = db.Column(db.String(100), nullable=True)
+    link = db.Column(db.Text, nullable=True)  # Only for click events
+    ts = db.Column(db.DateTime, nullable=False, default=get_wib_now)
+    partition_day = db.Column(db.Integer, nullable=False, index=True)  # YYYYMMDD, retention unit
+
+    __table_args__ = (
+        db.Index('ix_engagement_event_lead_ts', 'lead_id', 'ts'),
+        db.Index('ix_engagement_event_type_ts', 'event_type', 'ts'),
+    )
+
+    def __repr__(self):
+        return f'<EngagementEvent {self.event_type} lead={self.lead_id}>'
+
+
+class LeadEngagement(db.Model):
+    """Per-lead engagement rollup, maintained on every event flush"""
+    lead_id = db.Column(db.Integer, db.ForeignKey('lead.id'), primary_key=True)
+    opens = db.Column(db.Integer, default=0, nullable=False)
+    clicks = db.Column(db.Integer, default=0, nullable=False)
+    unsubscribes = db.Column(db.Integer, default=0, nullable=False)
+    last_open_at = db.Column(db.DateTime, nullable=True)
+    last_click_at = db.Column(db.DateTime, nullable=True)
+    last_event_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=get_wib_now, onupdate=get_wib_now)
+
+    lead = db.relationship('Lead', backref=db.backref('engagement', uselist=False, lazy=True))
+
+    def __repr__(self):
+        return f'<LeadEngagement {self.lead_id}: {self.opens} opens, {self.clicks} clicks>'
+
+
+class ListEngagementDaily(db.Model):
+    """Per-Mailketing-list daily engagement counts"""
+    id = db.Column(db.Integer, primary_key=True)
+    list_id = db.Column(db.String(100), nullable=False)
+    day = db.Column(db.Integer, nullable=False)  # YYYYMMDD
+    event_type = db.Column(db.SmallInteger, nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('list_id', 'day', 'event_type', name='uq_list_engagement_daily'),
+    )
+
+    def __repr__(self):
+        return f'<ListEngagementDaily {self.list_id} {self.day}: {self.count}>'
+
+
+class ScalevStore(db.Model):
+    """Local mirror of ScaleV stores (see CatalogSyncService)"""
+    id = db.Column(db.Integer, primary_key=True)
+    scalev_id = db.Column(db.String(100), nullable=False, unique=True)
+    name = db.Column(db.String(255), nullable=True)
+    name_lower = db.Column(db.String(255), nullable=True, index=True)  # Prefix search
+    data = db.Column(db.Text, nullable=True)  # Raw API record (JSON)
+    synced_at = db.Column(db.DateTime, default=get_wib_now)
+
+    def __repr__(self):
+        return f'<ScalevStore {self.scalev_id} {self.name}>'
+
+
+class ScalevProduct(db.Model):
+    """Local mirror of ScaleV store products"""
+    id = db.Column(db.Integer, primary_key=True)
+    store_id = db.Column(db.String(100), nullable=False)
+    scalev_id = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(255), nullable=True)
+    name_lower = db.Column(db.String(255), nullable=True)
+    data = db.Column(db.Text, nullable=True)
+    synced_at = db.Column(db.DateTime, default=get_wib_now)
+
+    __table_args__ = (
+        db.UniqueConstraint('store_id', 'scalev_id', name='uq_scalev_product_store'),
+        db.Index('ix_scalev_product_store_name', 'store_id', 'name_lower'),
+    )
+
+    def __repr__(self):
+        return f'<ScalevProduct {self.scalev_id} {self.name}>'
+
+
+class ScalevVariant(db.Model):
+    """Local mirror of ScaleV product variants (from the product records)"""
+    id = db.Column(db.Integer, primary_key=True)
+    store_id = db.Column(db.String(100), nullable=False)
+    product_scalev_id = db.Column(db.String(100), nullable=False, index=True)
+    scalev_id = db.Column(db.String(100), nullable=False)
+    unique_id = db.Column(db.String(100), nullable=True, index=True)
+    sku = db.Column(db.String(100), nullable=True, index=True)
+    name = db.Column(db.String(255), nullable=True)
+    synced_at = db.Column(db.DateTime, default=get_wib_now)
+
+    __table_args__ = (
+        db.UniqueConstraint('store_id', 'scalev_id', name='uq_scalev_variant_store'),
+    )
+
+    def __repr__(self):
+        return f'<ScalevVariant {self.scalev_id} {self.sku}>'
+
+
+class ScalevSalesPerson(db.Model):
+    """Local mirror of ScaleV store sales people"""
+    id = db.Column(db.Integer, primary_key=True)
+    store_id = db.Column(db.String(100), nullable=False)
+    scalev_id = db.Column(db.String(100), nullable=False)  # business_user.user.id
+    fullname = db.Column(db.String(255), nullable=True)
+    fullname_lower = db.Column(db.String(255), nullable=True)
+    email = db.Column(db.String(255), nullable=True)
+    data = db.Column(db.Text, nullable=True)
+    synced_at = db.Column(db.DateTime, default=get_wib_now)
+
+    __table_args__ = (
+        db.UniqueConstraint('store_id', 'scalev_id', name='uq_scalev_sales_person_store'),
+        db.Index('ix_scalev_sales_person_store_name', 'store_id', 'fullname_lower'),
+    )
+
+    def __repr__(self):
+        return f'<ScalevSalesPerson {self.scalev_id} {self.fullname}>'
+
+
+class CatalogSyncState(db.Model):
+    """Sync cursor per catalog resource, e.g. 'stores' or 'products:123'"""
+    id = db.Column(db.Integer, primary_key=True)
+    resource = db.Column(db.String(150), nullable=False, unique=True)
+    status = db.Column(db.String(20), default='idle')  # idle, running, complete, error
+    mode = db.Column(db.String(20), nullable=True)  # full, incremental
+    cursor = db.Column(db.String(100), nullable=True)  # last_id of the last stored page (resume point)
+    high_water_id = db.Column(db.String(100), nullable=True)  # last_id after the last complete pass
+    started_at = db.Column(db.DateTime, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    full_completed_at = db.Column(db.DateTime, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(db.DateTime, default=get_wib_now, onupdate=get_wib_now)
+
+    def __repr__(self):
+        return f'<CatalogSyncState {self.resource} {self.status}>'
+
+
+class MailketingListCache(db.Model):
+    """Cached Mailketing API responses per API key ('lists' or 'list:<id>')"""
+    id = db.Column(db.Integer, primary_key=True)
+    key_hash = db.Column(db.String(64), nullable=False)  # sha256 of the API token, never the token itself
+    cache_key = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=True)  # JSON
+    refreshed_at = db.Column(db.DateTime, nullable=True)
+    error = db.Column(db.Text, nullable=True)  # last refresh error, cached payload is kept
+
+    __table_args__ = (
+        db.UniqueConstraint('key_hash', 'cache_key', name='uq_mailketing_list_cache_key'),
+    )
+
+    def __repr__(self):
+        return f'<MailketingListCache {self.cache_key} {self.refreshed_at}>'
+
+
+class PendingOrderEvent(db.Model):
+    """ScaleV order event received before its lead existed, replayed when the lead is created"""
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.String(100), nullable=False, index=True)
+    event_type = db.Column(db.String(100), nullable=False)
+    data = db.Column(db.Text, nullable=True)  # JSON webhook data
+    received_at = db.Column(db.DateTime, default=get_wib_now)
+    applied_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<PendingOrderEvent {self.order_id} {self.event_type}>'
+
+
+class OutboundJob(db.Model):
+    """Outbound API call deferred while a provider was unavailable, retried by a scheduler job"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # e.g. mailketing_add_subscriber
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    status = db.Column(db.String(20), default='pending')  # pending, done, failed
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=get_wib_now)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=get_wib_now)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_outbound_job_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f'<OutboundJob {self.kind} {self.status}>'
+
+
+class MailketingMembership(db.Model):
+    """Ledger of successful Mailketing list adds, checked before calling addsubtolist again"""
+    id = db.Column(db.Integer, primary_key=True)
+    email_lower = db.Column(db.String(255), nullable=False)
+    list_id = db.Column(db.String(100), nullable=False)
+    lead_id = db.Column(db.Integer, nullable=True)  # lead that was sent first
+    added_at = db.Column(db.DateTime, default=get_wib_now)
+
+    __table_args__ = (
+        db.UniqueConstraint('email_lower', 'list_id', name='uq_mailketing_membership_email_list'),
+    )
+
+    def __repr__(self):
+        return f'<MailketingMembership {self.email_lower} -> {self.list_id}>'
+
+
+class ResyncJob(db.Model):
+    """Background push of a product list's existing leads (one status) to a Mailketing list"""
+    id = db.Column(db.Integer, primary_key=True)
+    product_list_id = db.Column(db.Integer, nullable=False)
+    lead_status = db.Column(db.String(50), nullable=False)  # follow_up, closing, not_closing
+    list_id = db.Column(db.String(100), nullable=False)
+    state = db.Column(db.String(20), default='running')  # running, paused, done, cancelled, failed
+    total = db.Column(db.Integer, default=0)  # matching leads when the job was created
+    processed = db.Column(db.Integer, default=0)
+    sent = db.Column(db.Integer, default=0)
+    skipped = db.Column(db.Integer, default=0)  # already on the list, bounced
+    deferred = db.Column(db.Integer, default=0)  # queued as OutboundJob while Mailketing was down
+    failed = db.Column(db.Integer, default=0)
+    last_lead_id = db.Column(db.Integer, default=0)  # keyset cursor, resume point after pause/restart
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=get_wib_now)
+    updated_at = db.Column(db.DateTime, default=get_wib_now)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_resync_job_product_list_state', 'product_list_id', 'state'),
+    )
+
+    def progress_percent(self):
+        if not self.total:
+            return 100 if self.state == 'done' else 0
+        return min(100, int(self.processed * 100 / self.total))
+
+    def __repr__(self):
+        return f'<ResyncJob {self.product_list_id}/{self.lead_status} -> {self.list_id} {self.state}>'
+
+
+class OrderDataDictionary(db.Model):
+    """zlib preset dictionary trained from recent order payloads"""
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+    sample_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=get_wib_now)
+
+    def __repr__(self):
+        return f'<OrderDataDictionary {self.id} ({len(self.data)} bytes)>'
+
+
+class LeadOrderData(db.Model):
+    """Compressed webhook order payload of a lead, plus the fields we query"""
+    lead_id = db.Column(db.Integer, db.ForeignKey('lead.id'), primary_key=True)
+    payload = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed compact JSON
+    dictionary_id = db.Column(db.Integer, db.ForeignKey('order_data_dictionary.id'), nullable=True)
+    raw_size = db.Column(db.Integer, default=0)
+    stored_size = db.Column(db.Integer, default=0)
+    # Extracted at ingest
+    product_name = db.Column(db.String(255), nullable=True)
+    variant_sku = db.Column(db.String(100), nullable=True)
+    variant_unique_id = db.Column(db.String(100), nullable=True)
+    payment_status = db.Column(db.String(50), nullable=True)
+    order_status = db.Column(db.String(50), nullable=True)
+    payment_method = db.Column(db.String(100), nullable=True)
+    gross_revenue = db.Column(db.Float, nullable=True)
+    created_at = db.Column(db.DateTime, default=get_wib_now)
+
+    def get_data(self):
+        from services.order_data_service import OrderDataService
+        return OrderDataService.decode(self.payload, self.dictionary_id)
+
+    def __repr__(self):
+        return f'<LeadOrderData {self.lead_id} {self.raw_size}->{self.stored_size}>'
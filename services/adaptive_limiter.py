@@ -0,0 +1,134 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services.circuit_breaker import CircuitOpenError
+
+
+class _Slot:
+    """One admitted call; records its latency and outcome on exit"""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.started_at = time.monotonic()
+        self.error = None
+
+    def fail(self, reason):
+        """Count this call as an overload signal (e.g. HTTP 429/5xx) without raising"""
+        self.error = reason
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        latency = time.monotonic() - self.started_at
+        if exc_type is not None and issubclass(exc_type, CircuitOpenError):
+            # Rejected locally, says nothing about the provider's capacity
+            self.limiter._release(None, None)
+        elif exc_type is not None or self.error:
+            self.limiter._release(latency, exc or self.error)
+        else:
+            self.limiter._release(latency, None)
+        return False
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit that follows the provider's real capacity
+
+    Every call holds a slot while in flight. Calls beyond the current limit
+    wait for a free slot. The limit:
+    - grows by about 1 per `limit` fast successes, but only while the
+      limiter is actually busy (at least half the slots in use)
+    - shrinks by `latency_backoff` when the recent latency (short EWMA) goes
+      above `tolerance` x the baseline (slow EWMA of healthy calls)
+    - shrinks by `error_backoff` on errors, at most once per baseline latency
+      so a burst of concurrent failures counts as one signal
+    """
+
+    def __init__(self, name, initial_limit=4, min_limit=1, max_limit=32, tolerance=2.0,
+                 latency_backoff=0.9, error_backoff=0.5):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.latency_backoff = latency_backoff
+        self.error_backoff = error_backoff
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._waiting = 0
+        self._latency = None   # short EWMA, seconds
+        self._baseline = None  # slow EWMA of calls that were not slowed down
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self.stats = {'calls': 0, 'errors': 0, 'increases': 0, 'decreases': 0, 'waited': 0, 'max_limit_seen': initial_limit}
+
+    @property
+    def limit(self):
+        return max(self.min_limit, int(self._limit))
+
+    def acquire(self):
+        """Wait for a free slot; use as `with limiter.acquire() as slot:`"""
+        with self._cond:
+            if self._in_flight >= self.limit:
+                self.stats['waited'] += 1
+                self._waiting += 1
+                try:
+                    while self._in_flight >= self.limit:
+                        self._cond.wait()
+                finally:
+                    self._waiting -= 1
+            self._in_flight += 1
+            self.stats['calls'] += 1
+        return _Slot(self)
+
+    def _release(self, latency, error):
+        with self._cond:
+            busy = self._in_flight >= self.limit / 2
+            self._in_flight -= 1
+            if latency is not None:
+                if error is not None:
+                    self.stats['errors'] += 1
+                    self._decrease(self.error_backoff)
+                else:
+                    self._on_success(latency, busy)
+            self._cond.notify_all()
+
+    def _on_success(self, latency, busy):
+        self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+        if self._baseline is None:
+            self._baseline = latency
+        elif self._latency <= self._baseline * self.tolerance:
+            self._baseline = 0.98 * self._baseline + 0.02 * latency
+
+        if self._latency > self._baseline * self.tolerance:
+            self._decrease(self.latency_backoff)
+        elif busy and self._limit < self.max_limit:
+            self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            self.stats['increases'] += 1
+            self.stats['max_limit_seen'] = max(self.stats['max_limit_seen'], self.limit)
+
+    def _decrease(self, factor):
+        now = time.monotonic()
+        if now - self._last_decrease < (self._baseline or 0):
+            return
+        self._last_decrease = now
+        self._limit = max(float(self.min_limit), self._limit * factor)
+        self.stats['decreases'] += 1
+
+    def get_stats(self):
+        with self._cond:
+            return dict(
+                self.stats,
+                limit=self.limit,
+                in_flight=self._in_flight,
+                waiting=self._waiting,
+                latency_ms=round(self._latency * 1000, 1) if self._latency is not None else None,
+                baseline_ms=round(self._baseline * 1000, 1) if self._baseline is not None else None
+            )
+
+
+# Shared by every Mailketing subscriber send in this process (webhooks, jobs, bulk moves)
+mailketing_limiter = AdaptiveLimiter('Mailketing')
+
+# Bulk sends are submitted here; the limiter decides how many are in flight
+mailketing_send_pool = ThreadPoolExecutor(max_workers=mailketing_limiter.max_limit, thread_name_prefix='mailketing-send')
@@ -0,0 +1,71 @@
+import threading
+
+
+class AdmissionGate:
+    """Concurrency limit with a bounded wait queue for one group of endpoints
+
+    Up to max_concurrent requests run at once. Up to max_waiting more wait
+    at most wait_timeout seconds for a slot. Anything beyond that is shed
+    right away, and the caller answers 503 with Retry-After.
+    """
+
+    def __init__(self, name, max_concurrent, max_waiting, wait_timeout, retry_after):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiting = 0
+        self.stats = {'admitted': 0, 'queued': 0, 'shed_queue_full': 0, 'shed_timeout': 0, 'max_waiting_seen': 0}
+
+    def try_enter(self):
+        """Take a slot, waiting in the bounded queue if needed; False = shed"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.max_waiting:
+                    self.stats['shed_queue_full'] += 1
+                    return False
+                self._waiting += 1
+                self.stats['queued'] += 1
+                self.stats['max_waiting_seen'] = max(self.stats['max_waiting_seen'], self._waiting)
+            try:
+                acquired = self._slots.acquire(timeout=self.wait_timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                with self._lock:
+                    self.stats['shed_timeout'] += 1
+                return False
+
+        with self._lock:
+            self._in_flight += 1
+            self.stats['admitted'] += 1
+        return True
+
+    def leave(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(
+                self.stats,
+                in_flight=self._in_flight,
+                waiting=self._waiting,
+                max_concurrent=self.max_concurrent,
+                max_waiting=self.max_waiting,
+                shed=self.stats['shed_queue_full'] + self.stats['shed_timeout']
+            )
+
+
+# One gate per webhook group, shared by all requests in this process.
+# Admin pages are not gated, so they stay responsive while webhooks back up.
+admission_gates = {
+    'scalev': AdmissionGate('scalev', max_concurrent=8, max_waiting=16, wait_timeout=2.0, retry_after=5),
+    'mailketing': AdmissionGate('mailketing', max_concurrent=8, max_waiting=32, wait_timeout=1.0, retry_after=10),
+}
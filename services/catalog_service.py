@@ -0,0 +1,327 @@
+import json
+import logging
+import threading
+from datetime import timedelta
+
+from sqlalchemy import and_
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSyncRunner:
+    """Runs catalog syncs in background threads, at most one per key"""
+
+    def __init__(self):
+        self._running = set()
+        self._lock = threading.Lock()
+
+    def _claim(self, key):
+        with self._lock:
+            if key in self._running:
+                return False
+            self._running.add(key)
+            return True
+
+    def _release(self, key):
+        with self._lock:
+            self._running.discard(key)
+
+    def trigger(self, app, key, func):
+        """Start func() in an app context unless the same key is already syncing"""
+        if not self._claim(key):
+            return False
+
+        def run():
+            try:
+                with app.app_context():
+                    func()
+            except Exception as e:
+                logger.error("❌ Catalog sync '%s' failed: %s", key, e)
+            finally:
+                self._release(key)
+
+        threading.Thread(target=run, name=f'catalog-sync-{key}', daemon=True).start()
+        return True
+
+    def run(self, key, func):
+        """Run func() in the calling thread unless the same key is already syncing
+
+        For callers that already run in the background (scheduler jobs) and
+        need their syncs in order; returns False when the key was skipped.
+        """
+        if not self._claim(key):
+            return False
+        try:
+            func()
+        finally:
+            self._release(key)
+        return True
+
+    def is_running(self, key):
+        with self._lock:
+            return key in self._running
+
+
+# Shared by all requests and scheduler jobs in this process
+catalog_sync_runner = CatalogSyncRunner()
+
+
+class CatalogSyncService:
+    """Local mirror of the ScaleV catalog (stores, products, variants, sales people)
+
+    Each resource is synced page by page with ScaleV's last_id cursor. The
+    cursor is committed after every page, so an interrupted sync resumes
+    where it stopped. Incremental syncs start from the last cursor of the
+    previous complete pass (new records only); full syncs start from the
+    beginning and prune records that no longer exist.
+    """
+
+    STALE_AFTER = timedelta(minutes=10)
+    FULL_SYNC_EVERY = timedelta(hours=6)
+
+    def __init__(self, db, scalev_service=None):
+        self.db = db
+        self.scalev = scalev_service
+        from models import (ScalevStore, ScalevProduct, ScalevVariant, ScalevSalesPerson,
+                            CatalogSyncState, get_wib_now)
+        self.ScalevStore = ScalevStore
+        self.ScalevProduct = ScalevProduct
+        self.ScalevVariant = ScalevVariant
+        self.ScalevSalesPerson = ScalevSalesPerson
+        self.CatalogSyncState = CatalogSyncState
+        self.get_wib_now = get_wib_now
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+
+    def sync_stores(self, full=None):
+        """Sync the store list"""
+        return self._sync_resource('stores', '/stores', self._upsert_stores, self._prune_stores, full=full)
+
+    def sync_store(self, store_id, full=None):
+        """Sync products (with variants) and sales people of one store"""
+        store_id = str(store_id)
+        products_ok = self._sync_resource(
+            f'products:{store_id}', f'/stores/{store_id}/products',
+            lambda rows, now: self._upsert_products(store_id, rows, now),
+            lambda since: self._prune_store_rows(store_id, since, self.ScalevProduct, self.ScalevVariant),
+            full=full
+        )
+        sales_ok = self._sync_resource(
+            f'sales_people:{store_id}', f'/stores/{store_id}/sales-people',
+            lambda rows, now: self._upsert_sales_people(store_id, rows, now),
+            lambda since: self._prune_store_rows(store_id, since, self.ScalevSalesPerson),
+            full=full
+        )
+        return products_ok and sales_ok
+
+    def get_state(self, resource):
+        return self.CatalogSyncState.query.filter_by(resource=resource).first()
+
+    def is_stale(self, resource):
+        """True if the resource was never synced, failed, or is older than STALE_AFTER"""
+        state = self.get_state(resource)
+        if not state or not state.completed_at or state.status == 'error':
+            return True
+        return self.get_wib_now() - state.completed_at > self.STALE_AFTER
+
+    def is_store_stale(self, store_id):
+        return self.is_stale(f'products:{store_id}') or self.is_stale(f'sales_people:{store_id}')
+
+    def _sync_resource(self, resource, path, upsert, prune, full=None):
+        state = self.get_state(resource)
+        if not state:
+            state = self.CatalogSyncState(resource=resource, status='idle')
+            self.db.session.add(state)
+
+        now = self.get_wib_now()
+        if state.status in ('running', 'error') and state.cursor:
+            # Interrupted pass: continue from the last stored page
+            start_id = state.cursor
+            mode = state.mode or 'full'
+            logger.info("↻ Resuming %s catalog sync '%s' from last_id=%s", mode, resource, start_id)
+        else:
+            if full is None:
+                full = not state.full_completed_at or now - state.full_completed_at >= self.FULL_SYNC_EVERY
+            mode = 'full' if full or not state.high_water_id else 'incremental'
+            start_id = None if mode == 'full' else state.high_water_id
+            state.started_at = now
+            state.cursor = None
+
+        state.status = 'running'
+        state.mode = mode
+        state.error = None
+        self.db.session.commit()
+
+        try:
+            fetched = 0
+            reached_end = False
+            for results, last_id, has_next in self.scalev.iter_pages(path, last_id=start_id):
+                upsert(results, self.get_wib_now())
+                fetched += len(results)
+                reached_end = not has_next
+                if last_id:
+                    state.cursor = str(last_id)
+                self.db.session.commit()
+
+            # Rows not seen since the pass started are only stale if the pass saw every page
+            if mode == 'full' and reached_end:
+                prune(state.started_at)
+            elif mode == 'full':
+                logger.warning("⚠️  Catalog sync '%s' stopped before the last page, nothing pruned", resource)
+
+            state.high_water_id = state.cursor or state.high_water_id
+            state.cursor = None
+            state.status = 'complete'
+            state.completed_at = self.get_wib_now()
+            if mode == 'full' and reached_end:
+                state.full_completed_at = state.completed_at
+            self.db.session.commit()
+            logger.info("✓ Catalog sync '%s' (%s): %s records", resource, mode, fetched)
+            return True
+        except Exception as e:
+            self.db.session.rollback()
+            state = self.get_state(resource)
+            state.status = 'error'
+            state.error = str(e)[:500]
+            self.db.session.commit()
+            logger.error("❌ Catalog sync '%s' failed: %s", resource, e)
+            return False
+
+    def _existing_by_scalev_id(self, model, ids, store_id=None):
+        query = model.query.filter(model.scalev_id.in_(ids))
+        if store_id is not None:
+            query = query.filter(model.store_id == store_id)
+        return {row.scalev_id: row for row in query.all()}
+
+    def _upsert_stores(self, rows, now):
+        ids = [str(r.get('id')) for r in rows if r.get('id') is not None]
+        existing = self._existing_by_scalev_id(self.ScalevStore, ids)
+        for r in rows:
+            if r.get('id') is None:
+                continue
+            scalev_id = str(r['id'])
+            store = existing.get(scalev_id)
+            if store is None:
+                store = self.ScalevStore(scalev_id=scalev_id)
+                self.db.session.add(store)
+            store.name = r.get('name')
+            store.name_lower = (r.get('name') or '').lower()
+            store.data = json.dumps(r, ensure_ascii=False)
+            store.synced_at = now
+
+    def _upsert_products(self, store_id, rows, now):
+        ids = [str(r.get('id')) for r in rows if r.get('id') is not None]
+        existing = self._existing_by_scalev_id(self.ScalevProduct, ids, store_id)
+        variant_rows = []
+        for r in rows:
+            if r.get('id') is None:
+                continue
+            scalev_id = str(r['id'])
+            product = existing.get(scalev_id)
+            if product is None:
+                product = self.ScalevProduct(store_id=store_id, scalev_id=scalev_id)
+                self.db.session.add(product)
+            product.name = r.get('name')
+            product.name_lower = (r.get('name') or '').lower()
+            product.data = json.dumps(r, ensure_ascii=False)
+            product.synced_at = now
+            for v in r.get('variants') or []:
+                if isinstance(v, dict) and v.get('id') is not None:
+                    variant_rows.append((scalev_id, v))
+
+        if variant_rows:
+            existing_variants = self._existing_by_scalev_id(
+                self.ScalevVariant, [str(v['id']) for _, v in variant_rows], store_id
+            )
+            for product_scalev_id, v in variant_rows:
+                variant = existing_variants.get(str(v['id']))
+                if variant is None:
+                    variant = self.ScalevVariant(store_id=store_id, scalev_id=str(v['id']))
+                    self.db.session.add(variant)
+                variant.product_scalev_id = product_scalev_id
+                variant.unique_id = v.get('unique_id')
+                variant.sku = v.get('sku') or None
+                variant.name = v.get('name') or v.get('product_name')
+                variant.synced_at = now
+
+    def _upsert_sales_people(self, store_id, rows, now):
+        def user_of(r):
+            return (r.get('business_user') or {}).get('user') or {}
+
+        ids = [str(user_of(r).get('id') or r.get('id')) for r in rows]
+        existing = self._existing_by_scalev_id(self.ScalevSalesPerson, ids, store_id)
+        for r, scalev_id in zip(rows, ids):
+            if scalev_id == 'None':
+                continue
+            user = user_of(r)
+            person = existing.get(scalev_id)
+            if person is None:
+                person = self.ScalevSalesPerson(store_id=store_id, scalev_id=scalev_id)
+                self.db.session.add(person)
+            person.fullname = user.get('fullname')
+            person.fullname_lower = (user.get('fullname') or '').lower()
+            person.email = user.get('email')
+            person.data = json.dumps(r, ensure_ascii=False)
+            person.synced_at = now
+
+    def _prune_stores(self, since):
+        self.ScalevStore.query.filter(self.ScalevStore.synced_at < since).delete(synchronize_session=False)
+
+    def _prune_store_rows(self, store_id, since, *models):
+        for model in models:
+            model.query.filter(
+                model.store_id == store_id,
+                model.synced_at < since
+            ).delete(synchronize_session=False)
+
+    # ------------------------------------------------------------------
+    # Reads (served from the mirror only, never call ScaleV)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _prefix(column, term):
+        """Index-friendly prefix match on a lowercased column"""
+        return and_(column >= term, column < term + '\uffff')
+
+    @staticmethod
+    def _page(query, page, page_size):
+        """Fetch one page plus one extra row to know if more pages exist"""
+        page = max(1, page or 1)
+        rows = query.offset((page - 1) * page_size).limit(page_size + 1).all()
+        return rows[:page_size], len(rows) > page_size
+
+    def search_stores(self, q='', page=1, page_size=25):
+        """Stores by name prefix (or exact ID), returns (records, more)"""
+        term = (q or '').strip().lower()
+        query = self.ScalevStore.query
+        if term:
+            query = query.filter(
+                self._prefix(self.ScalevStore.name_lower, term) | (self.ScalevStore.scalev_id == term)
+            )
+        rows, more = self._page(query.order_by(self.ScalevStore.name_lower, self.ScalevStore.id), page, page_size)
+        return [json.loads(r.data) for r in rows], more
+
+    def search_products(self, store_id, q='', page=1, page_size=25):
+        """Products of a store by name prefix (or exact ID), returns (records, more)"""
+        term = (q or '').strip().lower()
+        query = self.ScalevProduct.query.filter_by(store_id=str(store_id))
+        if term:
+            query = query.filter(
+                self._prefix(self.ScalevProduct.name_lower, term) | (self.ScalevProduct.scalev_id == term)
+            )
+        rows, more = self._page(query.order_by(self.ScalevProduct.name_lower, self.ScalevProduct.id), page, page_size)
+        return [json.loads(r.data) for r in rows], more
+
+    def search_sales_people(self, store_id, q='', page=1, page_size=25):
+        """Sales people of a store by name prefix, returns (records, more)"""
+        term = (q or '').strip().lower()
+        query = self.ScalevSalesPerson.query.filter_by(store_id=str(store_id))
+        if term:
+            query = query.filter(self._prefix(self.ScalevSalesPerson.fullname_lower, term))
+        rows, more = self._page(query.order_by(self.ScalevSalesPerson.fullname_lower, self.ScalevSalesPerson.id), page, page_size)
+        return [json.loads(r.data) for r in rows], more
+
+    def get_synced_store_ids(self):
+        return [row[0] for row in self.db.session.query(self.ScalevStore.scalev_id).all()]
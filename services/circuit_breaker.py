@@ -0,0 +1,153 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import requests
+
+from services.metrics import endpoint_label, outbound_errors_total, outbound_request_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open"""
+
+    def __init__(self, name, retry_in):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f'{name} unavailable (circuit open, retry in {retry_in:.0f}s)')
+
+
+class CircuitBreaker:
+    """Per-provider circuit breaker around outbound HTTP calls
+
+    closed: calls go through. The breaker opens once the failure rate of the
+    last `window` calls reaches `failure_rate`, counted only after `min_calls`
+    calls. Failures are network errors, timeouts and 5xx answers.
+    open: calls fail right away with CircuitOpenError for `open_seconds`.
+    half_open: `half_open_calls` trial calls go through. A success closes the
+    breaker; a failure opens it again.
+    """
+
+    def __init__(self, name, failure_rate=0.5, window=20, min_calls=5, open_seconds=30, half_open_calls=1):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = 'closed'
+        self._results = deque(maxlen=window)  # True = failure
+        self._opened_at = None
+        self._trials = 0
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+        self.last_failure = None
+
+    def retry_in(self):
+        """Seconds until an open breaker lets a trial call through (0 if not open)"""
+        with self._lock:
+            if self.state != 'open':
+                return 0.0
+            return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self.stats['rejected'] += 1
+                    return False
+                self.state = 'half_open'
+                self._trials = 0
+            if self.state == 'half_open':
+                if self._trials >= self.half_open_calls:
+                    self.stats['rejected'] += 1
+                    return False
+                self._trials += 1
+            self.stats['calls'] += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state == 'half_open':
+                self.state = 'closed'
+                self._results.clear()
+            self._results.append(False)
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.stats['failures'] += 1
+            self.last_failure = str(error)[:200] if error else None
+            self._results.append(True)
+            if self.state == 'half_open':
+                self._open()
+            elif len(self._results) >= self.min_calls and \
+                    sum(self._results) / len(self._results) >= self.failure_rate:
+                self._open()
+
+    def _open(self):
+        self.state = 'open'
+        self._opened_at = time.monotonic()
+        self._results.clear()
+        self.stats['opened'] += 1
+        logger.warning("⚡ Circuit for %s opened for %ss", self.name, self.open_seconds)
+
+    def request(self, method, url, **kwargs):
+        """requests.request() guarded by the breaker"""
+        provider = self.name.lower()
+        endpoint = endpoint_label(url)
+        if not self.allow():
+            outbound_errors_total.inc(provider=provider, endpoint=endpoint, reason='circuit_open')
+            raise CircuitOpenError(self.name, self.retry_in())
+        started = time.perf_counter()
+        try:
+            response = requests.request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            outbound_request_seconds.observe(time.perf_counter() - started, provider=provider, method=method, endpoint=endpoint)
+            outbound_errors_total.inc(provider=provider, endpoint=endpoint, reason=type(e).__name__)
+            self.record_failure(e)
+            raise
+        outbound_request_seconds.observe(time.perf_counter() - started, provider=provider, method=method, endpoint=endpoint)
+        if response.status_code >= 500:
+            outbound_errors_total.inc(provider=provider, endpoint=endpoint, reason=f'http_{response.status_code}')
+            self.record_failure(f'HTTP {response.status_code}')
+        else:
+            if response.status_code == 429:
+                outbound_errors_total.inc(provider=provider, endpoint=endpoint, reason='http_429')
+            self.record_success()
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get_stats(self):
+        retry_in = self.retry_in()
+        with self._lock:
+            recent = len(self._results)
+            return dict(
+                self.stats,
+                state=self.state,
+                recent_failure_rate=round(sum(self._results) / recent, 2) if recent else 0.0,
+                retry_in=round(retry_in, 1),
+                last_failure=self.last_failure
+            )
+
+
+def is_transient_error(error):
+    """True for errors worth retrying later (provider down or overloaded)"""
+    if isinstance(error, (CircuitOpenError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500
+    return False
+
+
+# One breaker per provider, shared by all requests and jobs in this process
+circuit_breakers = {
+    'scalev': CircuitBreaker('ScaleV'),
+    'mailketing': CircuitBreaker('Mailketing'),
+    'telegram': CircuitBreaker('Telegram'),
+}
@@ -0,0 +1,300 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+
+from services.scoring_service import LeadScoringService
+
+
+class EngagementBuffer:
+    """Process-wide buffer for engagement events waiting to be batch-inserted"""
+
+    def __init__(self, batch_size=200, max_age_seconds=10, email_cache_size=5000):
+        self.batch_size = batch_size
+        self.max_age_seconds = max_age_seconds
+        self.email_cache_size = email_cache_size
+        self._events = []
+        self._oldest_at = None
+        self._lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        # email_lower -> lead_id, only positive matches are cached
+        self._email_to_lead = OrderedDict()
+
+    def add(self, event):
+        """Queue an event; returns True when the caller should flush now"""
+        with self._lock:
+            if not self._events:
+                self._oldest_at = time.monotonic()
+            self._events.append(event)
+            return self._should_flush()
+
+    def is_flush_due(self):
+        with self._lock:
+            return bool(self._events) and self._should_flush()
+
+    def _should_flush(self):
+        if len(self._events) >= self.batch_size:
+            return True
+        return self._oldest_at is not None and time.monotonic() - self._oldest_at >= self.max_age_seconds
+
+    def drain(self):
+        """Take all buffered events"""
+        with self._lock:
+            events = self._events
+            self._events = []
+            self._oldest_at = None
+            return events
+
+    def requeue(self, events):
+        """Put events back at the front of the buffer after a failed flush"""
+        with self._lock:
+            self._events = events + self._events
+            if self._oldest_at is None and self._events:
+                self._oldest_at = time.monotonic()
+
+    def __len__(self):
+        return len(self._events)
+
+    def get_cached_lead_id(self, email_lower):
+        with self._lock:
+            lead_id = self._email_to_lead.get(email_lower)
+            if lead_id is not None:
+                self._email_to_lead.move_to_end(email_lower)
+            return lead_id
+
+    def cache_lead_id(self, email_lower, lead_id):
+        with self._lock:
+            self._email_to_lead[email_lower] = lead_id
+            self._email_to_lead.move_to_end(email_lower)
+            while len(self._email_to_lead) > self.email_cache_size:
+                self._email_to_lead.popitem(last=False)
+
+
+# Shared by all requests and scheduler jobs in this process
+engagement_buffer = EngagementBuffer()
+
+
+class EngagementService:
+    """Service for storing Mailketing engagement events and their rollups"""
+
+    EVENT_TYPES = {
+        'open': 1,
+        'click': 2,
+        'unsubscribe': 3,
+        'newsubscriber': 4,
+    }
+    EVENT_NAMES = {code: name for name, code in EVENT_TYPES.items()}
+
+    def __init__(self, db, buffer=None):
+        self.db = db
+        self.buffer = buffer or engagement_buffer
+        from models import Lead, EngagementEvent, LeadEngagement, ListEngagementDaily, get_wib_now
+        self.Lead = Lead
+        self.EngagementEvent = EngagementEvent
+        self.LeadEngagement = LeadEngagement
+        self.ListEngagementDaily = ListEngagementDaily
+        self.get_wib_now = get_wib_now
+
+    @staticmethod
+    def partition_day(ts):
+        """Partition key (YYYYMMDD) for a timestamp"""
+        return ts.year * 10000 + ts.month * 100 + ts.day
+
+    @staticmethod
+    def parse_event_date(value, fallback):
+        """Parse Mailketing 'date' field, falling back to receive time"""
+        if value:
+            for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+                try:
+                    return datetime.strptime(str(value)[:19], fmt)
+                except ValueError:
+                    continue
+        return fallback
+
+    def record(self, event_type, email, date=None, list_id=None, link=None, auto_flush=True):
+        """Buffer one event and flush the batch when it is full or old enough
+
+        With auto_flush=False the caller is responsible for flushing once
+        buffer.is_flush_due() says so (e.g. on a background worker).
+        """
+        if event_type not in self.EVENT_TYPES or not email:
+            return False
+        ts = self.parse_event_date(date, self.get_wib_now())
+        event = {
+            'event_type': self.EVENT_TYPES[event_type],
+            'email_lower': email.strip().lower(),
+            'list_id': str(list_id) if list_id else None,
+            'link': link if event_type == 'click' else None,
+            'ts': ts,
+        }
+        if self.buffer.add(event) and auto_flush:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Write all buffered events in one batch and update rollups"""
+        # Only one flusher at a time in this process; others leave events buffered
+        if not self.buffer.flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            events = self.buffer.drain()
+            if not events:
+                return 0
+            try:
+                self._write_batch(events)
+            except IntegrityError:
+                # Another process created the same rollup row; retry once with fresh state
+                self.db.session.rollback()
+                try:
+                    self._write_batch(events)
+                except Exception:
+                    self.db.session.rollback()
+                    self.buffer.requeue(events)
+                    raise
+            except Exception:
+                self.db.session.rollback()
+                self.buffer.requeue(events)
+                raise
+            return len(events)
+        finally:
+            self.buffer.flush_lock.release()
+
+    def _resolve_lead_ids(self, emails):
+        """Intern emails to Lead IDs (latest lead per email)"""
+        resolved = {}
+        missing = []
+        for email in emails:
+            lead_id = self.buffer.get_cached_lead_id(email)
+            if lead_id is not None:
+                resolved[email] = lead_id
+            else:
+                missing.append(email)
+
+        if missing:
+            email_expr = func.lower(self.Lead.email)
+            rows = self.db.session.query(
+                email_expr, func.max(self.Lead.id)
+            ).filter(email_expr.in_(missing)).group_by(email_expr).all()
+            for email, lead_id in rows:
+                resolved[email] = lead_id
+                self.buffer.cache_lead_id(email, lead_id)
+        return resolved
+
+    def _write_batch(self, events):
+        lead_ids = self._resolve_lead_ids({e['email_lower'] for e in events})
+
+        rows = []
+        for e in events:
+            lead_id = lead_ids.get(e['email_lower'])
+            rows.append({
+                'lead_id': lead_id,
+                'email_lower': None if lead_id else e['email_lower'],
+                'event_type': e['event_type'],
+                'list_id': e['list_id'],
+                'link': e['link'],
+                'ts': e['ts'],
+                'partition_day': self.partition_day(e['ts']),
+            })
+        self.db.session.execute(insert(self.EngagementEvent), rows)
+
+        # Scores are updated incrementally in the same transaction as the events
+        LeadScoringService(self.db).apply_events(rows)
+        self._update_lead_rollups(rows)
+        self._update_list_rollups(rows)
+        self.db.session.commit()
+
+    def _update_lead_rollups(self, rows):
+        per_lead = {}
+        for row in rows:
+            if row['lead_id']:
+                per_lead.setdefault(row['lead_id'], []).append(row)
+        if not per_lead:
+            return
+
+        existing = {
+            r.lead_id: r for r in self.LeadEngagement.query.filter(
+                self.LeadEngagement.lead_id.in_(list(per_lead.keys()))
+            ).all()
+        }
+        for lead_id, lead_rows in per_lead.items():
+            rollup = existing.get(lead_id)
+            if rollup is None:
+                rollup = self.LeadEngagement(lead_id=lead_id, opens=0, clicks=0, unsubscribes=0)
+                self.db.session.add(rollup)
+            for row in lead_rows:
+                ts = row['ts']
+                if row['event_type'] == self.EVENT_TYPES['open']:
+                    rollup.opens += 1
+                    rollup.last_open_at = max(filter(None, [rollup.last_open_at, ts]))
+                elif row['event_type'] == self.EVENT_TYPES['click']:
+                    rollup.clicks += 1
+                    rollup.last_click_at = max(filter(None, [rollup.last_click_at, ts]))
+                elif row['event_type'] == self.EVENT_TYPES['unsubscribe']:
+                    rollup.unsubscribes += 1
+                rollup.last_event_at = max(filter(None, [rollup.last_event_at, ts]))
+
+    def _update_list_rollups(self, rows):
+        counts = {}
+        for row in rows:
+            if row['list_id']:
+                key = (row['list_id'], row['partition_day'], row['event_type'])
+                counts[key] = counts.get(key, 0) + 1
+        if not counts:
+            return
+
+        list_ids = {k[0] for k in counts}
+        days = {k[1] for k in counts}
+        existing = {
+            (r.list_id, r.day, r.event_type): r for r in self.ListEngagementDaily.query.filter(
+                self.ListEngagementDaily.list_id.in_(list_ids),
+                self.ListEngagementDaily.day.in_(days)
+            ).all()
+        }
+        for (list_id, day, event_type), count in counts.items():
+            rollup = existing.get((list_id, day, event_type))
+            if rollup is None:
+                rollup = self.ListEngagementDaily(list_id=list_id, day=day, event_type=event_type, count=0)
+                self.db.session.add(rollup)
+            rollup.count += count
+
+    def purge_expired_partitions(self, retention_days=90):
+        """Drop raw events in day partitions older than the retention window; rollups are kept"""
+        cutoff_day = self.partition_day(self.get_wib_now() - timedelta(days=retention_days))
+        deleted = self.EngagementEvent.query.filter(
+            self.EngagementEvent.partition_day < cutoff_day
+        ).delete(synchronize_session=False)
+        self.db.session.commit()
+        return deleted
+
+    def get_lead_rollup(self, lead_id):
+        """Engagement rollup for a lead (None if no events yet)"""
+        return self.db.session.get(self.LeadEngagement, lead_id)
+
+    def get_recent_lead_events(self, lead_id, limit=10):
+        """Latest raw events for a lead, served by the (lead_id, ts) index"""
+        return self.EngagementEvent.query.filter_by(lead_id=lead_id).order_by(
+            self.EngagementEvent.ts.desc()
+        ).limit(limit).all()
+
+    def get_list_rollups(self, days=30):
+        """Per-list totals by event type over the last N days"""
+        since_day = self.partition_day(self.get_wib_now() - timedelta(days=days))
+        rows = self.db.session.query(
+            self.ListEngagementDaily.list_id,
+            self.ListEngagementDaily.event_type,
+            func.sum(self.ListEngagementDaily.count)
+        ).filter(
+            self.ListEngagementDaily.day >= since_day
+        ).group_by(
+            self.ListEngagementDaily.list_id,
+            self.ListEngagementDaily.event_type
+        ).all()
+
+        result = {}
+        for list_id, event_type, total in rows:
+            name = self.EVENT_NAMES.get(event_type, str(event_type))
+            result.setdefault(list_id, {})[name] = int(total or 0)
+        return result
@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class _Task:
+    __slots__ = ('lane', 'key', 'func', 'future', 'queued_at')
+
+    def __init__(self, lane, key, func):
+        self.lane = lane
+        self.key = key
+        self.func = func
+        self.future = Future()
+        self.queued_at = time.monotonic()
+
+
+class EventDispatcher:
+    """Prioritized webhook processing with weighted lanes and per-key ordering
+
+    Each lane has a weight (share of picks while several lanes have work) and
+    a concurrency limit. Workers pick lanes by smooth weighted round robin,
+    skipping lanes at their limit. With 6 workers and at most 5 running in
+    the other lanes, a payment event always finds a free worker.
+
+    Tasks with the same key (order_id) run one at a time in submit order,
+    even across lanes: a later task waits in a per-key backlog until the
+    earlier one finishes. submit() returns a concurrent.futures.Future.
+    """
+
+    LANES = {
+        'payment': {'weight': 8, 'concurrency': 4},     # paid orders -> Closing list
+        'creation': {'weight': 4, 'concurrency': 3},    # new orders -> Follow Up list
+        'engagement': {'weight': 2, 'concurrency': 1},  # Mailketing open/click batches
+        'debug': {'weight': 1, 'concurrency': 1},       # order.updated, status noise, unknown events
+    }
+
+    def __init__(self, workers=6, lanes=None):
+        self.lanes = lanes or self.LANES
+        self.workers = workers
+        self._queues = {lane: deque() for lane in self.lanes}
+        self._running = {lane: 0 for lane in self.lanes}
+        self._current_weight = {lane: 0 for lane in self.lanes}
+        self._key_backlog = {}  # key -> deque of tasks waiting behind the active one
+        self._cond = threading.Condition()
+        self._threads = []
+        self.stats = {lane: {'submitted': 0, 'completed': 0, 'failed': 0, 'wait_ms_total': 0.0, 'wait_ms_max': 0.0}
+                      for lane in self.lanes}
+
+    def submit(self, lane, key, func, coalesce=False):
+        """Queue func() on a lane; tasks sharing a non-None key run serially
+
+        With coalesce=True nothing is queued (returns None) while a task with
+        the same key is still queued or running.
+        """
+        if lane not in self.lanes:
+            raise ValueError(f'Unknown lane: {lane}')
+        task = _Task(lane, key, func)
+        with self._cond:
+            if coalesce and key in self._key_backlog:
+                return None
+            self.stats[lane]['submitted'] += 1
+            if key is not None and key in self._key_backlog:
+                self._key_backlog[key].append(task)
+            else:
+                if key is not None:
+                    self._key_backlog[key] = deque()
+                self._queues[lane].append(task)
+                self._cond.notify()
+        self._ensure_workers()
+        return task.future
+
+    def _ensure_workers(self):
+        if len(self._threads) >= self.workers and all(t.is_alive() for t in self._threads):
+            return
+        with self._cond:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                t = threading.Thread(target=self._run, name=f'event-dispatcher-{len(self._threads)}', daemon=True)
+                self._threads.append(t)
+                t.start()
+
+    def _pick_lane(self):
+        """Smooth weighted round robin over lanes with work and free capacity"""
+        ready = [lane for lane, q in self._queues.items()
+                 if q and self._running[lane] < self.lanes[lane]['concurrency']]
+        if not ready:
+            return None
+        total = 0
+        for lane in ready:
+            self._current_weight[lane] += self.lanes[lane]['weight']
+            total += self.lanes[lane]['weight']
+        best = max(ready, key=lambda lane: self._current_weight[lane])
+        self._current_weight[best] -= total
+        return best
+
+    def _run(self):
+        while True:
+            with self._cond:
+                lane = self._pick_lane()
+                while lane is None:
+                    self._cond.wait()
+                    lane = self._pick_lane()
+                task = self._queues[lane].popleft()
+                self._running[lane] += 1
+                wait_ms = (time.monotonic() - task.queued_at) * 1000
+                stats = self.stats[lane]
+                stats['wait_ms_total'] += wait_ms
+                stats['wait_ms_max'] = max(stats['wait_ms_max'], wait_ms)
+
+            failed = False
+            try:
+                if task.future.set_running_or_notify_cancel():
+                    task.future.set_result(task.func())
+            except Exception as e:
+                failed = True
+                task.future.set_exception(e)
+            finally:
+                with self._cond:
+                    self._running[lane] -= 1
+                    self.stats[lane]['failed' if failed else 'completed'] += 1
+                    self._release_key(task.key)
+                    self._cond.notify_all()
+
+    def _release_key(self, key):
+        """Move the next task of the same key into its lane"""
+        if key is None:
+            return
+        backlog = self._key_backlog.get(key)
+        if backlog:
+            next_task = backlog.popleft()
+            self._queues[next_task.lane].append(next_task)
+        else:
+            self._key_backlog.pop(key, None)
+
+    def get_stats(self):
+        with self._cond:
+            lanes = {}
+            for lane, stats in self.stats.items():
+                started = stats['completed'] + stats['failed'] + self._running[lane]
+                lanes[lane] = {
+                    'submitted': stats['submitted'],
+                    'completed': stats['completed'],
+                    'failed': stats['failed'],
+                    'queued': len(self._queues[lane]),
+                    'running': self._running[lane],
+                    'concurrency': self.lanes[lane]['concurrency'],
+                    'weight': self.lanes[lane]['weight'],
+                    'avg_wait_ms': round(stats['wait_ms_total'] / started, 1) if started else None,
+                    'max_wait_ms': round(stats['wait_ms_max'], 1),
+                }
+            backlog = sum(len(q) for q in self._key_backlog.values())
+            return {'workers': self.workers, 'lanes': lanes, 'waiting_on_same_order': backlog}
+
+
+# Shared by all webhook requests in this process
+event_dispatcher = EventDispatcher()
@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Flight:
+    """One in-progress lookup that concurrent callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class HandlerCache:
+    """Process-wide order_id -> handler cache with TTL, negative caching and single flight
+
+    Orders without a handler are cached for a shorter time, since a handler
+    can still be assigned later. Concurrent lookups of the same order wait
+    for the first caller instead of each calling ScaleV.
+    """
+
+    def __init__(self, ttl_seconds=600, negative_ttl_seconds=60, max_entries=5000, wait_timeout=15):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self._entries = OrderedDict()  # order_id -> (handler or None, expires_at)
+        self._inflight = {}  # order_id -> _Flight
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'coalesced': 0,
+                      'lead_hits': 0, 'api_calls': 0, 'errors': 0}
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    def get_or_load(self, order_id, load):
+        """Cached handler of an order, calling load(order_id) at most once at a time per order"""
+        key = str(order_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats['hits' if entry[0] else 'negative_hits'] += 1
+                return entry[0]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self.stats['misses'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            if not flight.done.wait(self.wait_timeout):
+                raise TimeoutError(f'Handler lookup for order {key} still running')
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = load(key)
+            self.put(key, flight.result)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            self.count('errors')
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def put(self, order_id, handler):
+        ttl = self.ttl_seconds if handler else self.negative_ttl_seconds
+        with self._lock:
+            self._entries[str(order_id)] = (handler, time.monotonic() + ttl)
+            self._entries.move_to_end(str(order_id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, order_id):
+        with self._lock:
+            self._entries.pop(str(order_id), None)
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['negative_hits'] + self.stats['misses'] + self.stats['coalesced']
+            served = lookups - self.stats['misses']
+            return dict(self.stats, size=len(self._entries), inflight=len(self._inflight),
+                        hit_ratio=round(served / lookups, 3) if lookups else None)
+
+
+# Shared by all webhook requests in this process
+handler_cache = HandlerCache()
+
+# Runs handler lookups in the background while a webhook does its local work
+handler_lookup_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='handler-lookup')
+
+
+class HandlerResolutionService:
+    """Resolve the handler (CS) of a ScaleV order
+
+    Lookup order: in-memory cache, the handler already stored on the lead,
+    then the ScaleV v2 order detail. Returned handlers are dicts with id,
+    email and fullname.
+    """
+
+    def __init__(self, db, scalev_service=None):
+        self.db = db
+        self.scalev = scalev_service
+        self.cache = handler_cache
+        from models import Lead
+        self.Lead = Lead
+
+    def resolve(self, order_id):
+        return self.cache.get_or_load(order_id, self._load)
+
+    def _load(self, order_id):
+        lead = self.Lead.query.filter_by(order_id=order_id).first()
+        if lead and lead.sales_person_id:
+            self.cache.count('lead_hits')
+            return {'id': lead.sales_person_id, 'email': lead.sales_person_email, 'fullname': lead.sales_person_name}
+
+        self.cache.count('api_calls')
+        handler = self.scalev.get_order_handler(order_id)
+        if not handler:
+            return None
+        return {
+            'id': str(handler.get('id')) if handler.get('id') is not None else None,
+            'email': handler.get('email'),
+            'fullname': handler.get('fullname')
+        }
+
+    def store_on_lead(self, lead, handler):
+        """Save the resolved handler on the lead; returns True if it changed"""
+        if not handler or not handler.get('id') or lead.sales_person_id == handler['id']:
+            return False
+        lead.sales_person_id = handler['id']
+        lead.sales_person_email = handler.get('email')
+        lead.sales_person_name = handler.get('fullname')
+        self.db.session.commit()
+        return True
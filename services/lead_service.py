@@ -1,5 +1,7 @@
-from datetime import datetime, timedelta
-import json
+from datetime import timedelta
+
+from services.metrics import leads_moved_total
+from services.order_data_service import OrderDataService
 
 class LeadService:
     """Service for managing leads"""
@@ -11,7 +13,7 @@ class LeadService:
         self.LeadHistory = LeadHistory
         self.get_wib_now = get_wib_now
     
-    def create_lead(self, product_list_id, order_id, name, email, phone=None, order_data=None, sales_person_name=None, sales_person_email=None):
+    def create_lead(self, product_list_id, order_id, name, email, phone=None, order_data=None, sales_person_name=None, sales_person_email=None, sales_person_id=None):
         """Create a new lead in follow-up status"""
         # Check if lead already exists
         existing_lead = self.Lead.query.filter_by(order_id=str(order_id)).first()
@@ -26,10 +28,12 @@ class LeadService:
             phone=phone,
             sales_person_name=sales_person_name,
             sales_person_email=sales_person_email,
+            sales_person_id=sales_person_id,
             status='follow_up',
-            order_data=json.dumps(order_data) if order_data else None,
             follow_up_start=self.get_wib_now()
         )
+        if order_data:
+            OrderDataService(self.db).attach(lead, order_data)
         
         self.db.session.add(lead)
         
@@ -62,6 +66,7 @@ class LeadService:
         self.db.session.add(history)
         
         self.db.session.commit()
+        leads_moved_total.inc(from_status=old_status, to_status='closing')
         return lead
     
     def move_to_not_closing(self, lead):
@@ -80,6 +85,7 @@ class LeadService:
         self.db.session.add(history)
         
         self.db.session.commit()
+        leads_moved_total.inc(from_status=old_status, to_status='not_closing')
         return lead
     
     def get_expired_follow_up_leads(self, days=7):
@@ -93,6 +99,14 @@ class LeadService:
         
         return expired_leads
     
+    def count_expired_follow_up_leads(self, days=7):
+        """Number of leads get_expired_follow_up_leads() would return, without loading them"""
+        cutoff_date = self.get_wib_now() - timedelta(days=days)
+        return self.Lead.query.filter(
+            self.Lead.status == 'follow_up',
+            self.Lead.follow_up_start <= cutoff_date
+        ).count()
+    
     def mark_sent_to_mailketing(self, lead, list_id=None):
         """Mark lead as sent to Mailketing"""
         lead.sent_to_mailketing = True
@@ -0,0 +1,107 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from services.catalog_service import catalog_sync_runner
+from services.mailketing_service import MailketingService
+
+
+class MailketingListCacheService:
+    """Stale-while-revalidate cache for Mailketing list data, keyed by API token
+
+    Cached responses are always served from the database. Entries older than
+    FRESH_FOR are still returned, and a background refresh is started when an
+    app is passed in. A failed refresh keeps the old payload and stores the
+    error. Rows are keyed by a SHA-256 hash, so the token itself is never stored
+    here.
+    """
+
+    FRESH_FOR = timedelta(minutes=10)
+
+    def __init__(self, db, api_token):
+        self.db = db
+        self.api_token = api_token
+        self.key_hash = self.hash_key(api_token)
+        from models import MailketingListCache, get_wib_now
+        self.MailketingListCache = MailketingListCache
+        self.get_wib_now = get_wib_now
+
+    @staticmethod
+    def hash_key(api_token):
+        return hashlib.sha256((api_token or '').encode('utf-8')).hexdigest()
+
+    def get_lists(self, app=None):
+        """All lists of the account, returns (lists or None, cache entry)"""
+        return self._get('lists', app)
+
+    def get_list_details(self, list_id, app=None):
+        """Details of one list, returns (details or None, cache entry)"""
+        return self._get(f'list:{list_id}', app)
+
+    def get_entry(self, cache_key='lists'):
+        return self.MailketingListCache.query.filter_by(key_hash=self.key_hash, cache_key=cache_key).first()
+
+    def is_stale(self, entry):
+        return not entry or not entry.refreshed_at or self.get_wib_now() - entry.refreshed_at > self.FRESH_FOR
+
+    def is_refreshing(self, cache_key='lists'):
+        return catalog_sync_runner.is_running(self._runner_key(cache_key))
+
+    def _get(self, cache_key, app):
+        entry = self.get_entry(cache_key)
+        if entry is None or entry.payload is None:
+            if app is None:
+                # Nothing cached and no way to refresh later: fetch now
+                return self.refresh(cache_key), self.get_entry(cache_key)
+            self.refresh_in_background(app, cache_key)
+            return None, entry
+
+        if app is not None and self.is_stale(entry):
+            self.refresh_in_background(app, cache_key)
+        return json.loads(entry.payload), entry
+
+    def _fetch(self, cache_key):
+        mailketing = MailketingService(self.api_token)
+        if cache_key == 'lists':
+            return mailketing.get_all_lists()
+        if cache_key.startswith('list:'):
+            return mailketing.get_list_details(cache_key.split(':', 1)[1])
+        raise ValueError(f'Unknown Mailketing cache key: {cache_key}')
+
+    def refresh(self, cache_key='lists'):
+        """Call Mailketing now and store the response (raises on API errors)"""
+        entry = self.get_entry(cache_key)
+        if entry is None:
+            entry = self.MailketingListCache(key_hash=self.key_hash, cache_key=cache_key)
+            self.db.session.add(entry)
+
+        try:
+            data = self._fetch(cache_key)
+        except Exception as e:
+            entry.error = str(e)[:500]
+            self.db.session.commit()
+            raise
+
+        entry.payload = json.dumps(data, ensure_ascii=False)
+        entry.refreshed_at = self.get_wib_now()
+        entry.error = None
+        self.db.session.commit()
+        return data
+
+    def refresh_in_background(self, app, cache_key='lists'):
+        """Start a refresh unless one is already running for this key"""
+        api_token = self.api_token
+        db = self.db
+
+        def run():
+            MailketingListCacheService(db, api_token).refresh(cache_key)
+
+        return catalog_sync_runner.trigger(app, self._runner_key(cache_key), run)
+
+    def invalidate(self):
+        """Drop every cached response of this API token"""
+        self.MailketingListCache.query.filter_by(key_hash=self.key_hash).delete(synchronize_session=False)
+        self.db.session.commit()
+
+    def _runner_key(self, cache_key):
+        return f'mailketing:{self.key_hash[:12]}:{cache_key}'
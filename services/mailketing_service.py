@@ -1,67 +1,71 @@
+import logging
+import os
+
 import requests
 
+from services.adaptive_limiter import mailketing_limiter
+from services.circuit_breaker import circuit_breakers
+from services.structured_logging import register_secret
+
+logger = logging.getLogger(__name__)
+
 class MailketingService:
     """Service for interacting with Mailketing API"""
     
     def __init__(self, api_token):
         self.api_token = api_token
-        self.base_url = 'https://api.mailketing.co.id/api/v1'
+        register_secret(api_token)
+        # MAILKETING_API_BASE points the service at a stub server (see bench/)
+        api_base = os.environ.get('MAILKETING_API_BASE', 'https://api.mailketing.co.id').rstrip('/')
+        self.base_url = f'{api_base}/api/v1'
+        self.http = circuit_breakers['mailketing']
+        self.limiter = mailketing_limiter
     
     def get_all_lists(self):
         """Get all lists from Mailketing account"""
         # Endpoint: POST https://api.mailketing.co.id/api/v1/viewlist
         try:
-            print(f"\n🔍 Testing Mailketing API connection...")
-            print(f"   URL: {self.base_url}/viewlist")
-            print(f"   API Token: {self.api_token[:10]}..." if len(self.api_token) > 10 else f"   API Token: {self.api_token}")
-            
-            response = requests.post(
+            response = self.http.post(
                 f'{self.base_url}/viewlist',
                 data={'api_token': self.api_token},
                 timeout=10
             )
             
-            print(f"   Response Status Code: {response.status_code}")
-            print(f"   Response Text: {response.text[:200]}")  # First 200 chars
-            
             response.raise_for_status()
             
             try:
                 data = response.json()
             except ValueError as json_err:
-                print(f"❌ JSON Parse Error: {json_err}")
-                print(f"   Raw response: {response.text}")
-                raise Exception(f"Invalid JSON response from Mailketing API. Raw: {response.text[:100]}")
-            
-            print(f"   Parsed JSON: {data}")
+                logger.error("❌ Mailketing viewlist returned invalid JSON (HTTP %s): %s", response.status_code, json_err)
+                raise Exception("Invalid JSON response from Mailketing API")
             
             # Response format: {"status":"success","lists":[{"list_id":123,"list_name":"Name"},...]}
             if isinstance(data, dict) and data.get('status') == 'success':
                 lists = data.get('lists', [])
-                print(f"✅ Success! Lists returned: {len(lists)}")
+                logger.info("✓ Mailketing lists fetched: %s", len(lists))
                 return lists
             elif isinstance(data, dict) and data.get('status') == 'error':
                 error_msg = data.get('message', 'No error message provided')
-                print(f"❌ Mailketing API Error: {error_msg}")
+                logger.error("❌ Mailketing API Error: %s", error_msg)
                 raise Exception(f"Mailketing API Error: {error_msg}")
             else:
-                print(f"⚠️  Unexpected response format: {data}")
-                raise Exception(f"Unexpected response format from Mailketing API: {data}")
+                logger.warning("⚠️  Unexpected Mailketing viewlist response format")
+                raise Exception("Unexpected response format from Mailketing API")
             
         except requests.exceptions.Timeout:
-            print(f"❌ Timeout error")
+            logger.error("❌ Timeout error")
             raise Exception(f"Mailketing API timeout - server tidak merespons dalam 10 detik")
         except requests.exceptions.ConnectionError as conn_err:
-            print(f"❌ Connection error: {conn_err}")
+            logger.error("❌ Connection error: %s", conn_err)
             raise Exception(f"Tidak bisa connect ke Mailketing API - cek koneksi internet")
         except requests.exceptions.HTTPError as http_err:
-            print(f"❌ HTTP error: {http_err}")
+            logger.error("❌ HTTP error: %s", http_err)
             raise Exception(f"Mailketing API HTTP error: {http_err}")
         except requests.exceptions.RequestException as e:
-            print(f"❌ Network error: {str(e)}")
+            logger.error("❌ Network error: %s", e)
             raise Exception(f"Network error: {str(e)}")
         except Exception as e:
-            print(f"❌ Error in get_all_lists: {str(e)}")
+            logger.error("❌ Error in get_all_lists: %s", e)
             raise
     
     def add_subscriber(self, list_id, email, first_name=None, last_name=None, 
@@ -106,10 +110,15 @@ class MailketingService:
         if mobile:
             payload['mobile'] = mobile
         
-        response = requests.post(
-            f'{self.base_url}/addsubtolist',
-            data=payload
-        )
+        # Concurrency follows Mailketing's observed capacity (see AdaptiveLimiter)
+        with self.limiter.acquire() as slot:
+            response = self.http.post(
+                f'{self.base_url}/addsubtolist',
+                data=payload,
+                timeout=15
+            )
+            if response.status_code == 429 or response.status_code >= 500:
+                slot.fail(f'HTTP {response.status_code}')
         response.raise_for_status()
         result = response.json()
         
@@ -117,12 +126,13 @@ class MailketingService:
     
     def get_list_details(self, list_id):
         """Get details of a specific list"""
-        response = requests.post(
+        response = self.http.post(
             f'{self.base_url}/viewlist',
             data={
                 'api_token': self.api_token,
                 'list_id': list_id
-            }
+            },
+            timeout=10
         )
         response.raise_for_status()
         return response.json()
@@ -0,0 +1,55 @@
+from sqlalchemy.exc import IntegrityError
+
+
+class MailketingMembershipService:
+    """Which emails have already been added to which Mailketing list
+
+    Every send path checks the ledger first, so retries, redelivered
+    webhooks, test moves and bulk runs do not call addsubtolist again for
+    an email that is already on the list.
+    """
+
+    CHUNK_SIZE = 500  # stay below SQLite's bound parameter limit
+
+    def __init__(self, db):
+        self.db = db
+        from models import MailketingMembership, get_wib_now
+        self.MailketingMembership = MailketingMembership
+        self.get_wib_now = get_wib_now
+
+    @staticmethod
+    def normalize(email):
+        return (email or '').strip().lower()
+
+    def is_member(self, email, list_id):
+        return self.db.session.query(
+            self.MailketingMembership.query.filter_by(
+                email_lower=self.normalize(email), list_id=str(list_id)
+            ).exists()
+        ).scalar()
+
+    def existing(self, pairs):
+        """Subset of (email, list_id) pairs already in the ledger, as normalized pairs"""
+        wanted = {(self.normalize(email), str(list_id)) for email, list_id in pairs}
+        emails = sorted({email for email, _ in wanted})
+        found = set()
+        for i in range(0, len(emails), self.CHUNK_SIZE):
+            rows = self.db.session.query(
+                self.MailketingMembership.email_lower, self.MailketingMembership.list_id
+            ).filter(self.MailketingMembership.email_lower.in_(emails[i:i + self.CHUNK_SIZE])).all()
+            found.update((email, list_id) for email, list_id in rows if (email, list_id) in wanted)
+        return found
+
+    def record(self, email, list_id, lead_id=None):
+        """Remember a successful add; a concurrent duplicate is ignored"""
+        membership = self.MailketingMembership(
+            email_lower=self.normalize(email),
+            list_id=str(list_id),
+            lead_id=lead_id,
+            added_at=self.get_wib_now()
+        )
+        self.db.session.add(membership)
+        try:
+            self.db.session.commit()
+        except IntegrityError:
+            self.db.session.rollback()
@@ -0,0 +1,225 @@
+import gc
+import itertools
+import linecache
+import os
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+_current_job = ContextVar('memory_job', default=None)
+
+
+def get_rss_bytes():
+    """Resident set size of this process (peak RSS where the current value is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if peak > 1 << 32 else peak * 1024
+    return None
+
+
+class _JobRun:
+    __slots__ = ('name', 'sessions', 'identity_map', 'new', 'dirty', 'classes')
+
+    def __init__(self, name):
+        self.name = name
+        self.sessions = 0
+        self.identity_map = 0
+        self.new = 0
+        self.dirty = 0
+        self.classes = Counter()
+
+
+class MemoryDiagnostics:
+    """tracemalloc snapshots and per-job SQLAlchemy session sizes
+
+    Tracing costs CPU and memory on every allocation, so it only runs
+    between start_tracing() and stop_tracing(). Up to `max_snapshots`
+    snapshots are kept in memory and can be compared by allocation site.
+    Every scheduled job run records RSS before/after and, for each app
+    context it closes, the size of the session identity map (objects the
+    ORM kept alive for the run) with the biggest model classes.
+    """
+
+    IGNORED_FILES = (tracemalloc.__file__, linecache.__file__, '<frozen importlib._bootstrap>',
+                     '<frozen importlib._bootstrap_external>', '<unknown>')
+
+    def __init__(self, max_snapshots=5, history=20):
+        self.max_snapshots = max_snapshots
+        self._snapshots = deque(maxlen=max_snapshots)
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._history = history
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # tracemalloc
+    # ------------------------------------------------------------------
+
+    def start_tracing(self, frames=10):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(max(1, min(int(frames), 50)))
+
+    def stop_tracing(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+
+    def capture(self, label=None):
+        """Take a snapshot (tracing must be on); returns its summary"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError('tracemalloc is not tracing; start tracing first')
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in self.IGNORED_FILES]
+        )
+        entry = {
+            'id': next(self._ids),
+            'label': label or '',
+            'taken_at': datetime.now().isoformat(timespec='seconds'),
+            'traced_bytes': sum(stat.size for stat in snapshot.statistics('filename')),
+            'rss_bytes': get_rss_bytes(),
+            'snapshot': snapshot
+        }
+        with self._lock:
+            self._snapshots.append(entry)
+        return self._summary(entry)
+
+    def _summary(self, entry):
+        return {key: value for key, value in entry.items() if key != 'snapshot'}
+
+    def _get(self, snapshot_id):
+        with self._lock:
+            for entry in self._snapshots:
+                if entry['id'] == snapshot_id:
+                    return entry
+        raise KeyError(f'Snapshot {snapshot_id} not found')
+
+    @staticmethod
+    def _format_stat(stat, size_diff=None, count_diff=None):
+        frame = stat.traceback[0]
+        row = {
+            'site': f'{frame.filename}:{frame.lineno}',
+            'size_bytes': stat.size,
+            'count': stat.count,
+            'traceback': [f'{f.filename}:{f.lineno}' for f in stat.traceback][-5:]
+        }
+        if size_diff is not None:
+            row['size_diff_bytes'] = size_diff
+            row['count_diff'] = count_diff
+        return row
+
+    def top(self, snapshot_id, limit=25, group_by='lineno'):
+        """Biggest allocation sites of one snapshot"""
+        snapshot = self._get(snapshot_id)['snapshot']
+        return [self._format_stat(stat) for stat in snapshot.statistics(group_by)[:limit]]
+
+    def diff(self, from_id, to_id, limit=25, group_by='lineno'):
+        """Allocation sites that grew the most between two snapshots"""
+        older = self._get(from_id)
+        newer = self._get(to_id)
+        stats = newer['snapshot'].compare_to(older['snapshot'], group_by)
+        return {
+            'from': self._summary(older),
+            'to': self._summary(newer),
+            'traced_diff_bytes': newer['traced_bytes'] - older['traced_bytes'],
+            'top': [self._format_stat(stat, stat.size_diff, stat.count_diff) for stat in stats[:limit]]
+        }
+
+    # ------------------------------------------------------------------
+    # Scheduled jobs
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def job_run(self, name):
+        """Record RSS and session sizes of one scheduled job run"""
+        run = _JobRun(name)
+        token = _current_job.set(run)
+        rss_before = get_rss_bytes()
+        started = time.monotonic()
+        try:
+            yield run
+        finally:
+            _current_job.reset(token)
+            rss_after = get_rss_bytes()
+            self._finish_job(run, rss_before, rss_after, time.monotonic() - started)
+
+    def record_session(self, session):
+        """Called when an app context closes: count what its session kept alive
+
+        Only counts inside a job_run(); the session must not be closed yet.
+        """
+        run = _current_job.get()
+        if run is None:
+            return
+        identity_map = session.identity_map
+        run.sessions += 1
+        run.identity_map = max(run.identity_map, len(identity_map))
+        run.new += len(session.new)
+        run.dirty += len(session.dirty)
+        run.classes.update(type(obj).__name__ for obj in identity_map.values())
+
+    def _finish_job(self, run, rss_before, rss_after, elapsed):
+        rss_diff = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        entry = {
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'seconds': round(elapsed, 3),
+            'rss_bytes': rss_after,
+            'rss_diff_bytes': rss_diff,
+            'sessions': run.sessions,
+            'identity_map': run.identity_map,
+            'pending_new': run.new,
+            'pending_dirty': run.dirty,
+            'top_classes': dict(run.classes.most_common(5))
+        }
+        with self._lock:
+            stats = self._jobs.get(run.name)
+            if stats is None:
+                stats = self._jobs[run.name] = {
+                    'runs': 0, 'max_identity_map': 0, 'rss_growth_bytes': 0, 'recent': deque(maxlen=self._history)
+                }
+            stats['runs'] += 1
+            stats['max_identity_map'] = max(stats['max_identity_map'], run.identity_map)
+            if rss_diff:
+                stats['rss_growth_bytes'] += rss_diff
+            stats['recent'].append(entry)
+
+    def get_stats(self):
+        traced, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        with self._lock:
+            snapshots = [self._summary(entry) for entry in self._snapshots]
+            jobs = {
+                name: dict(stats, recent=list(stats['recent']), last=stats['recent'][-1] if stats['recent'] else None)
+                for name, stats in sorted(self._jobs.items())
+            }
+        return {
+            'rss_bytes': get_rss_bytes(),
+            'tracing': tracemalloc.is_tracing(),
+            'traceback_limit': tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else None,
+            'traced_bytes': traced,
+            'traced_peak_bytes': peak,
+            'gc_counts': gc.get_count(),
+            'gc_objects': len(gc.get_objects()),
+            'snapshots': snapshots,
+            'jobs': jobs
+        }
+
+
+# Shared by the admin endpoints and all scheduled jobs in this process
+memory_diagnostics = MemoryDiagnostics()
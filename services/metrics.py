@@ -0,0 +1,329 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, '')) for name in labelnames)
+
+
+def _dump_key(key):
+    # Snapshot files are JSON, so label tuples are stored as JSON strings
+    return json.dumps(list(key))
+
+
+def _format_labels(labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key)) + (extra or [])
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.registry._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        return {_dump_key(key): value for key, value in self._values.items()}
+
+
+class Histogram:
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label key -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.registry._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+                    break
+            entry[-2] += value
+            entry[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        return {_dump_key(key): list(entry) for key, entry in self._values.items()}
+
+
+class Gauge:
+    """Value read from a callback at snapshot/scrape time
+
+    per_process gauges (in-memory queues) are summed over the live worker
+    processes; the others (database counts) are read once by the process
+    answering the scrape.
+    """
+
+    def __init__(self, registry, name, documentation, func, labelnames=(), per_process=True):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.func = func
+        self.per_process = per_process
+
+    def collect(self):
+        """{label values tuple: value}; func returns a number or {label value(s): number}"""
+        value = self.func()
+        if not isinstance(value, dict):
+            return {(): value}
+        return {key if isinstance(key, tuple) else (key,): v for key, v in value.items()}
+
+    def snapshot(self):
+        return {_dump_key(map(str, key)): value for key, value in self.collect().items()}
+
+
+class MetricsRegistry:
+    """In-process counters, histograms and gauges rendered in the Prometheus text format
+
+    Updates only take a lock and bump numbers in memory. When a directory is
+    configured, a background thread writes this process's values to
+    `<dir>/<pid>.json` every `flush_interval` seconds, and a scrape merges the
+    files of all live processes, so any worker can answer /metrics. Files that
+    stopped being refreshed (the process exited) are removed at scrape time;
+    their counters reset, which Prometheus' rate() handles.
+    """
+
+    def __init__(self, flush_interval=5):
+        self.flush_interval = flush_interval
+        self.directory = None
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, func, labelnames=(), per_process=True):
+        return self._register(Gauge(self, name, documentation, func, labelnames, per_process))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} already registered')
+        self._metrics[metric.name] = metric
+        return metric
+
+    # ------------------------------------------------------------------
+    # Multi-process snapshots
+    # ------------------------------------------------------------------
+
+    def start(self, directory):
+        """Share values through snapshot files in `directory` (idempotent)"""
+        if self._flusher is not None:
+            return
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning("⚠️  Metrics snapshot failed: %s", e)
+
+    def _snapshot(self):
+        data = {}
+        with self._lock:
+            for name, metric in self._metrics.items():
+                if isinstance(metric, Gauge):
+                    continue
+                data[name] = metric.snapshot()
+        for name, metric in self._metrics.items():
+            if isinstance(metric, Gauge) and metric.per_process:
+                try:
+                    data[name] = metric.snapshot()
+                except Exception:
+                    pass
+        return data
+
+    def flush(self):
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def _other_processes(self):
+        if not self.directory:
+            return []
+        snapshots = []
+        stale_before = time.time() - max(60, 6 * self.flush_interval)
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            if os.path.basename(path) == f'{os.getpid()}.json':
+                continue
+            try:
+                if os.path.getmtime(path) < stale_before:
+                    # Live processes rewrite their file every flush_interval
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    # ------------------------------------------------------------------
+    # Exposition
+    # ------------------------------------------------------------------
+
+    def _merged(self):
+        merged = {}
+        for snapshot in [self._snapshot()] + self._other_processes():
+            for name, values in snapshot.items():
+                target = merged.setdefault(name, {})
+                for key, value in values.items():
+                    if isinstance(value, list):
+                        current = target.get(key)
+                        target[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                    else:
+                        target[key] = target.get(key, 0) + value
+        return merged
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (0.0.4)"""
+        merged = self._merged()
+        lines = []
+        for name, metric in self._metrics.items():
+            kind = {Counter: 'counter', Histogram: 'histogram', Gauge: 'gauge'}[type(metric)]
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {kind}')
+
+            if isinstance(metric, Gauge) and not metric.per_process:
+                try:
+                    values = metric.snapshot()
+                except Exception:
+                    values = {}
+            else:
+                values = merged.get(name, {})
+
+            for joined_key in sorted(values):
+                key = tuple(json.loads(joined_key))
+                value = values[joined_key]
+                if isinstance(metric, Histogram):
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets, value):
+                        cumulative += count
+                        labels = _format_labels(metric.labelnames, key, [('le', _format_value(float(bound)))])
+                        lines.append(f'{name}_bucket{labels} {cumulative}')
+                    labels = _format_labels(metric.labelnames, key, [('le', '+Inf')])
+                    lines.append(f'{name}_bucket{labels} {value[-1]}')
+                    lines.append(f'{name}_sum{_format_labels(metric.labelnames, key)} {_format_value(value[-2])}')
+                    lines.append(f'{name}_count{_format_labels(metric.labelnames, key)} {value[-1]}')
+                else:
+                    lines.append(f'{name}{_format_labels(metric.labelnames, key)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def endpoint_label(url):
+    """Low-cardinality endpoint name: URL path with ids and bot tokens replaced"""
+    segments = []
+    for segment in urlsplit(url).path.split('/'):
+        if not segment:
+            continue
+        if segment.startswith('bot') and ':' in segment:
+            segments.append('bot{token}')
+        elif any(ch.isdigit() for ch in segment) and not (segment[0] == 'v' and segment[1:].isdigit()):
+            segments.append('{id}')
+        else:
+            segments.append(segment)
+    return '/' + '/'.join(segments)
+
+
+# Shared by all requests, jobs and workers in this process
+metrics = MetricsRegistry()
+
+webhook_stage_seconds = metrics.histogram(
+    'scalev_webhook_stage_seconds',
+    'Time spent in each stage of a ScaleV webhook',
+    ['stage']
+)
+webhook_events_total = metrics.counter(
+    'scalev_webhook_events_total',
+    'ScaleV webhooks received, by event type and HTTP status',
+    ['event', 'status']
+)
+webhook_seconds = metrics.histogram(
+    'scalev_webhook_seconds',
+    'Total time to answer a ScaleV webhook, by event type',
+    ['event']
+)
+outbound_request_seconds = metrics.histogram(
+    'outbound_request_seconds',
+    'Latency of outbound provider calls',
+    ['provider', 'method', 'endpoint']
+)
+outbound_errors_total = metrics.counter(
+    'outbound_errors_total',
+    'Outbound provider calls that failed (network error, timeout, 5xx or rejected by an open circuit)',
+    ['provider', 'endpoint', 'reason']
+)
+job_runs_total = metrics.counter(
+    'scheduler_job_runs_total',
+    'Scheduled job runs, by job and outcome',
+    ['job', 'outcome']
+)
+job_duration_seconds = metrics.histogram(
+    'scheduler_job_duration_seconds',
+    'Scheduled job run time',
+    ['job']
+)
+leads_moved_total = metrics.counter(
+    'leads_moved_total',
+    'Leads moved between statuses',
+    ['from_status', 'to_status']
+)
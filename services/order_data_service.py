@@ -0,0 +1,131 @@
+import json
+import re
+import threading
+import zlib
+from collections import Counter
+
+
+class OrderDataService:
+    """Compressed storage of webhook order payloads (lead_order_data)
+
+    Payloads are stored as compact JSON compressed with zlib. When a trained
+    preset dictionary exists (OrderDataDictionary), new payloads use it; each
+    row keeps the id of the dictionary it was compressed with. Dictionaries
+    are never changed, only added.
+    """
+
+    LEVEL = 9
+    DICTIONARY_SIZE = 32 * 1024  # zlib only looks back 32 KB
+    _dictionaries = {}  # id -> bytes, shared per process
+    _lock = threading.Lock()
+
+    def __init__(self, db):
+        self.db = db
+        from models import LeadOrderData, OrderDataDictionary
+        self.LeadOrderData = LeadOrderData
+        self.OrderDataDictionary = OrderDataDictionary
+
+    @staticmethod
+    def encode(data, zdict=None):
+        raw = json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        compressor = zlib.compressobj(OrderDataService.LEVEL, zdict=zdict) if zdict else zlib.compressobj(OrderDataService.LEVEL)
+        return raw, compressor.compress(raw) + compressor.flush()
+
+    @classmethod
+    def decode(cls, payload, dictionary_id=None):
+        zdict = cls._get_dictionary(dictionary_id) if dictionary_id else None
+        decompressor = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+        return json.loads(decompressor.decompress(payload) + decompressor.flush())
+
+    @classmethod
+    def _get_dictionary(cls, dictionary_id):
+        with cls._lock:
+            zdict = cls._dictionaries.get(dictionary_id)
+        if zdict is None:
+            from models import OrderDataDictionary
+            zdict = OrderDataDictionary.query.get(dictionary_id).data
+            with cls._lock:
+                cls._dictionaries[dictionary_id] = zdict
+        return zdict
+
+    @staticmethod
+    def extract(data):
+        """Typed fields pulled out of the payload at ingest"""
+        first_line = (data.get('orderlines') or [{}])[0] or {}
+        try:
+            gross_revenue = float(data['gross_revenue']) if data.get('gross_revenue') is not None else None
+        except (TypeError, ValueError):
+            gross_revenue = None
+        return {
+            'product_name': first_line.get('product_name'),
+            'variant_sku': first_line.get('variant_sku') or None,
+            'variant_unique_id': first_line.get('variant_unique_id'),
+            'payment_status': data.get('payment_status'),
+            'order_status': data.get('status'),
+            'payment_method': data.get('payment_method'),
+            'gross_revenue': gross_revenue
+        }
+
+    def current_dictionary(self):
+        return self.OrderDataDictionary.query.order_by(self.OrderDataDictionary.id.desc()).first()
+
+    def attach(self, lead, data):
+        """Compress data onto lead.order_record (committed with the lead)"""
+        dictionary = self.current_dictionary()
+        if dictionary:
+            with self._lock:
+                self._dictionaries.setdefault(dictionary.id, dictionary.data)
+        raw, payload = self.encode(data, dictionary.data if dictionary else None)
+        lead.order_record = self.LeadOrderData(
+            payload=payload,
+            dictionary_id=dictionary.id if dictionary else None,
+            raw_size=len(raw),
+            stored_size=len(payload),
+            **self.extract(data)
+        )
+        return lead.order_record
+
+    def train_dictionary(self, sample_size=500, min_samples=50):
+        """Build a preset dictionary from recent payloads; None if there are too few
+
+        JSON fragments (key/value pairs) are ranked by how many payloads they
+        appear in. Fragments seen in at least two payloads are packed with
+        the most common ones last, since zlib reaches the end of the
+        dictionary with the shortest distances.
+        """
+        rows = self.LeadOrderData.query.order_by(self.LeadOrderData.lead_id.desc()).limit(sample_size).all()
+        if len(rows) < min_samples:
+            return None
+
+        frequency = Counter()
+        for row in rows:
+            raw = json.dumps(row.get_data(), ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+            frequency.update(set(re.findall(r'"[^"]{1,64}":(?:"[^"]{0,64}"|[^,{}\[\]]{1,32}|[{\[])', raw)))
+
+        fragments = [f for f, count in frequency.most_common() if count >= 2]
+        zdict = b''
+        for fragment in fragments:
+            encoded = fragment.encode('utf-8')
+            if len(zdict) + len(encoded) > self.DICTIONARY_SIZE:
+                break
+            zdict = encoded + zdict
+
+        dictionary = self.OrderDataDictionary(data=zdict, sample_count=len(rows))
+        self.db.session.add(dictionary)
+        self.db.session.commit()
+        return dictionary
+
+    def get_stats(self):
+        count, raw_total, stored_total = self.db.session.query(
+            self.db.func.count(self.LeadOrderData.lead_id),
+            self.db.func.coalesce(self.db.func.sum(self.LeadOrderData.raw_size), 0),
+            self.db.func.coalesce(self.db.func.sum(self.LeadOrderData.stored_size), 0)
+        ).one()
+        dictionary = self.current_dictionary()
+        return {
+            'payloads': count,
+            'raw_bytes': raw_total,
+            'stored_bytes': stored_total,
+            'ratio': round(raw_total / stored_total, 1) if stored_total else None,
+            'dictionary_id': dictionary.id if dictionary else None
+        }
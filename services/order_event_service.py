@@ -0,0 +1,53 @@
+import json
+from datetime import timedelta
+
+
+class OrderEventService:
+    """Parks ScaleV order events that arrive before their lead exists
+
+    The webhook stores such events with park(); once the lead is created,
+    get_pending() returns them in arrival order to be replayed and each one
+    is marked applied.
+    """
+
+    RETENTION_DAYS = 7
+
+    def __init__(self, db):
+        self.db = db
+        from models import PendingOrderEvent, get_wib_now
+        self.PendingOrderEvent = PendingOrderEvent
+        self.get_wib_now = get_wib_now
+
+    def park(self, order_id, event_type, data):
+        event = self.PendingOrderEvent(
+            order_id=str(order_id),
+            event_type=event_type,
+            data=json.dumps(data, ensure_ascii=False),
+            received_at=self.get_wib_now()
+        )
+        self.db.session.add(event)
+        self.db.session.commit()
+        return event
+
+    def get_pending(self, order_id):
+        """Unapplied events of an order, oldest first"""
+        return self.PendingOrderEvent.query.filter_by(
+            order_id=str(order_id), applied_at=None
+        ).order_by(self.PendingOrderEvent.id).all()
+
+    def mark_applied(self, event):
+        event.applied_at = self.get_wib_now()
+        self.db.session.commit()
+
+    def count_pending(self):
+        return self.PendingOrderEvent.query.filter_by(applied_at=None).count()
+
+    def purge_expired(self, retention_days=None):
+        """Delete applied events and events whose lead never appeared"""
+        cutoff = self.get_wib_now() - timedelta(days=retention_days or self.RETENTION_DAYS)
+        deleted = self.PendingOrderEvent.query.filter(
+            (self.PendingOrderEvent.applied_at.isnot(None)) |
+            (self.PendingOrderEvent.received_at < cutoff)
+        ).delete(synchronize_session=False)
+        self.db.session.commit()
+        return deleted
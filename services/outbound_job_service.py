@@ -0,0 +1,68 @@
+import json
+from datetime import timedelta
+
+
+class OutboundJobService:
+    """Queue of outbound calls deferred while a provider is unavailable
+
+    Jobs are retried with exponential backoff (1 min doubling, capped at
+    1 hour) and marked failed after MAX_ATTEMPTS.
+    """
+
+    MAX_ATTEMPTS = 10
+
+    def __init__(self, db):
+        self.db = db
+        from models import OutboundJob, get_wib_now
+        self.OutboundJob = OutboundJob
+        self.get_wib_now = get_wib_now
+
+    def enqueue(self, kind, payload):
+        """Queue a job; an identical pending job is returned instead of a duplicate"""
+        payload = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+        existing = self.OutboundJob.query.filter_by(kind=kind, payload=payload, status='pending').first()
+        if existing:
+            return existing
+        job = self.OutboundJob(
+            kind=kind,
+            payload=payload,
+            status='pending',
+            next_attempt_at=self.get_wib_now()
+        )
+        self.db.session.add(job)
+        self.db.session.commit()
+        return job
+
+    def get_due(self, kind=None, limit=50):
+        query = self.OutboundJob.query.filter(
+            self.OutboundJob.status == 'pending',
+            self.OutboundJob.next_attempt_at <= self.get_wib_now()
+        )
+        if kind:
+            query = query.filter(self.OutboundJob.kind == kind)
+        return query.order_by(self.OutboundJob.next_attempt_at, self.OutboundJob.id).limit(limit).all()
+
+    def mark_done(self, job):
+        job.status = 'done'
+        job.attempts = (job.attempts or 0) + 1
+        job.completed_at = self.get_wib_now()
+        job.last_error = None
+        self.db.session.commit()
+
+    def mark_retry(self, job, error):
+        """Schedule the next attempt, or give up after MAX_ATTEMPTS"""
+        job.attempts = (job.attempts or 0) + 1
+        job.last_error = str(error)[:500]
+        if job.attempts >= self.MAX_ATTEMPTS:
+            job.status = 'failed'
+            job.completed_at = self.get_wib_now()
+        else:
+            delay = min(60 * 2 ** (job.attempts - 1), 3600)
+            job.next_attempt_at = self.get_wib_now() + timedelta(seconds=delay)
+        self.db.session.commit()
+
+    def count_by_status(self):
+        rows = self.db.session.query(
+            self.OutboundJob.status, self.db.func.count(self.OutboundJob.id)
+        ).group_by(self.OutboundJob.status).all()
+        return {status: count for status, count in rows}
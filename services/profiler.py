@@ -0,0 +1,241 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileSession:
+    """Stack samples of one profiled request (and the workers it hands off to)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.monotonic()
+        self.stacks = Counter()
+        self.samples = 0
+        self.thread_ids = set()
+        self.lock = threading.Lock()
+
+    def add_thread(self, thread_id):
+        with self.lock:
+            self.thread_ids.add(thread_id)
+
+    def remove_thread(self, thread_id):
+        with self.lock:
+            self.thread_ids.discard(thread_id)
+
+
+_current_session = ContextVar('profile_session', default=None)
+
+
+def _collapse(frame):
+    """Frame stack as 'file:function;...' from the outermost call (collapsed stack format)"""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(parts))
+
+
+class RequestProfiler:
+    """On-demand sampling profiler for requests
+
+    Nothing runs until an admin arms it for the next N requests of a route,
+    or a single request asks for it with the X-Profile header; when disarmed
+    a request only reads one boolean. While a request is profiled, a sampler
+    thread records its stack (and those of the dispatcher workers it hands
+    work to) every `interval` seconds. Profiles are written as collapsed
+    stacks (`frame;frame;frame count`, the flamegraph.pl / speedscope input)
+    to `directory`, keeping the newest `max_files` for `max_age_days`.
+    """
+
+    FILE_SUFFIX = '.collapsed'
+
+    def __init__(self, interval=0.005, max_files=50, max_age_days=7):
+        self.interval = interval
+        self.max_files = max_files
+        self.max_age_days = max_age_days
+        self.directory = None
+        self.armed = False
+        self._route = None
+        self._remaining = 0
+        self._lock = threading.Lock()
+        self._active = set()
+        self._sampler = None
+
+    def configure(self, directory):
+        self.directory = directory
+
+    # ------------------------------------------------------------------
+    # Arming
+    # ------------------------------------------------------------------
+
+    def arm(self, route, count):
+        """Profile the next `count` requests whose route rule (or path) equals `route`"""
+        with self._lock:
+            self._route = route
+            self._remaining = max(1, int(count))
+            self.armed = True
+
+    def disarm(self):
+        with self._lock:
+            self._route = None
+            self._remaining = 0
+            self.armed = False
+
+    def get_state(self):
+        with self._lock:
+            return {'armed': self.armed, 'route': self._route, 'remaining': self._remaining,
+                    'active': len(self._active)}
+
+    def claim(self, route):
+        """True if an armed slot matches this request's route (uses one slot)"""
+        if not self.armed:
+            return False
+        with self._lock:
+            if not self.armed or route != self._route:
+                return False
+            self._remaining -= 1
+            if self._remaining <= 0:
+                self.armed = False
+                self._route = None
+            return True
+
+    # ------------------------------------------------------------------
+    # Sessions
+    # ------------------------------------------------------------------
+
+    def start(self, name):
+        """Start profiling the calling thread; returns the session for stop()"""
+        session = ProfileSession(name)
+        session.add_thread(threading.get_ident())
+        session.token = _current_session.set(session)
+        with self._lock:
+            self._active.add(session)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, name='profiler', daemon=True)
+                self._sampler.start()
+        return session
+
+    def stop(self, session, label=None):
+        """Stop sampling and write the profile; returns the file name (None if nothing sampled)"""
+        _current_session.reset(session.token)
+        with self._lock:
+            self._active.discard(session)
+        elapsed_ms = (time.monotonic() - session.started_at) * 1000
+        with session.lock:
+            stacks = dict(session.stacks)
+        if not stacks or not self.directory:
+            return None
+        try:
+            return self._write(session, label or session.name, elapsed_ms, stacks)
+        except OSError as e:
+            logger.warning("⚠️  Could not write profile: %s", e)
+            return None
+
+    def current(self):
+        """Session profiling this request, to hand over to worker threads"""
+        return _current_session.get()
+
+    @contextmanager
+    def attach(self, session):
+        """Also sample the calling (worker) thread while it works for `session`"""
+        if session is None:
+            yield
+            return
+        thread_id = threading.get_ident()
+        session.add_thread(thread_id)
+        try:
+            yield
+        finally:
+            session.remove_thread(thread_id)
+
+    def _sample_loop(self):
+        while True:
+            with self._lock:
+                sessions = list(self._active)
+                if not sessions:
+                    self._sampler = None
+                    return
+            frames = sys._current_frames()
+            for session in sessions:
+                with session.lock:
+                    for thread_id in session.thread_ids:
+                        frame = frames.get(thread_id)
+                        if frame is not None:
+                            session.stacks[_collapse(frame)] += 1
+                    session.samples += 1
+            del frames
+            time.sleep(self.interval)
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _write(self, session, label, elapsed_ms, stacks):
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')[:60] or 'request'
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}_{slug}_{int(elapsed_ms)}ms{self.FILE_SUFFIX}"
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(f'# {label} {elapsed_ms:.1f}ms {session.samples} samples every {self.interval * 1000:g}ms\n')
+            for stack, count in sorted(stacks.items(), key=lambda item: -item[1]):
+                f.write(f'{stack} {count}\n')
+        self.prune()
+        logger.info("🔬 Profile saved: %s (%s samples)", name, session.samples)
+        return name
+
+    def prune(self):
+        """Keep at most max_files profiles, none older than max_age_days"""
+        profiles = self.list_profiles()
+        cutoff = time.time() - self.max_age_days * 86400
+        for index, profile in enumerate(profiles):
+            if index >= self.max_files or profile['mtime'] < cutoff:
+                try:
+                    os.remove(os.path.join(self.directory, profile['name']))
+                except OSError:
+                    pass
+
+    def list_profiles(self):
+        """Stored profiles, newest first"""
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(self.FILE_SUFFIX):
+                continue
+            stat = entry.stat()
+            header = ''
+            try:
+                with open(entry.path) as f:
+                    header = f.readline()[2:].strip()
+            except OSError:
+                pass
+            profiles.append({
+                'name': entry.name,
+                'description': header,
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'created_at': datetime.fromtimestamp(stat.st_mtime)
+            })
+        profiles.sort(key=lambda p: p['mtime'], reverse=True)
+        return profiles
+
+    def path_of(self, name):
+        """Absolute path of a stored profile, or None for anything that is not one"""
+        if not self.directory or os.path.basename(name) != name or not name.endswith(self.FILE_SUFFIX):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+
+# Shared by all requests in this process
+request_profiler = RequestProfiler()
@@ -0,0 +1,186 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from sqlalchemy import event
+
+from services.memory_diagnostics import memory_diagnostics
+from services.metrics import job_duration_seconds, job_runs_total
+
+logger = logging.getLogger(__name__)
+
+
+class _Scope:
+    """Queries run by one request, job or event"""
+
+    __slots__ = ('name', 'count', 'db_ms', 'shapes', 'started_at')
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.db_ms = 0.0
+        self.shapes = Counter()
+        self.started_at = time.monotonic()
+
+
+_current_scope = ContextVar('query_scope', default=None)
+
+_IN_LIST = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    """Statement with IN lists collapsed, so batches of different sizes group together"""
+    return _WHITESPACE.sub(' ', _IN_LIST.sub('(?, ...)', statement)).strip()[:300]
+
+
+class QueryStats:
+    """SQLAlchemy event based query counter per request, scheduled job and webhook event
+
+    Each scope records its query count, DB time and how often each statement
+    shape ran. When a scope ends, it is folded into per-name aggregates. A
+    warning is printed when a scope runs more than `max_queries` queries or
+    repeats one shape `repeat_threshold` times (a likely N+1).
+    """
+
+    def __init__(self, max_queries=40, repeat_threshold=10, max_offenders=50):
+        self.max_queries = max_queries
+        self.repeat_threshold = repeat_threshold
+        self.max_offenders = max_offenders
+        self._aggregates = {}
+        self._offenders = {}  # (scope name, shape) -> {'max_repeats', 'times'}
+        self._lock = threading.Lock()
+        self._installed = set()
+
+    def install(self, engine):
+        if id(engine) in self._installed:
+            return
+        self._installed.add(id(engine))
+        event.listen(engine, 'before_cursor_execute', self._before_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_execute)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started_at', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('query_started_at')
+        elapsed_ms = (time.perf_counter() - started.pop()) * 1000 if started else 0.0
+        scope = _current_scope.get()
+        if scope is not None:
+            scope.count += 1
+            scope.db_ms += elapsed_ms
+            scope.shapes[statement_shape(statement)] += 1
+
+    @contextmanager
+    def scope(self, name):
+        scope = _Scope(name)
+        token = _current_scope.set(scope)
+        try:
+            yield scope
+        finally:
+            _current_scope.reset(token)
+            self._finish(scope)
+
+    def start(self, name):
+        """Open a scope without a with block (Flask request hooks); returns a token for finish()"""
+        scope = _Scope(name)
+        return scope, _current_scope.set(scope)
+
+    def finish(self, started):
+        scope, token = started
+        _current_scope.reset(token)
+        self._finish(scope)
+        return scope
+
+    def _finish(self, scope):
+        elapsed_ms = (time.monotonic() - scope.started_at) * 1000
+        repeated = [(shape, n) for shape, n in scope.shapes.items() if n >= self.repeat_threshold]
+        over_budget = scope.count > self.max_queries
+
+        with self._lock:
+            agg = self._aggregates.get(scope.name)
+            if agg is None:
+                agg = self._aggregates[scope.name] = {
+                    'calls': 0, 'queries': 0, 'max_queries': 0, 'db_ms': 0.0, 'max_db_ms': 0.0,
+                    'elapsed_ms': 0.0, 'over_budget': 0, 'n_plus_one': 0, 'last_queries': 0
+                }
+            agg['calls'] += 1
+            agg['queries'] += scope.count
+            agg['max_queries'] = max(agg['max_queries'], scope.count)
+            agg['last_queries'] = scope.count
+            agg['db_ms'] += scope.db_ms
+            agg['max_db_ms'] = max(agg['max_db_ms'], scope.db_ms)
+            agg['elapsed_ms'] += elapsed_ms
+            agg['over_budget'] += over_budget
+            agg['n_plus_one'] += bool(repeated)
+            for shape, n in repeated:
+                key = (scope.name, shape)
+                offender = self._offenders.get(key)
+                if offender is None:
+                    if len(self._offenders) >= self.max_offenders:
+                        continue
+                    offender = self._offenders[key] = {'max_repeats': 0, 'times': 0}
+                offender['times'] += 1
+                offender['max_repeats'] = max(offender['max_repeats'], n)
+
+        if over_budget:
+            logger.warning("⚠️  %s: %s queries (%.0f ms DB), budget is %s", scope.name, scope.count, scope.db_ms, self.max_queries)
+        for shape, n in repeated:
+            logger.warning("⚠️  %s: same query ran %sx (possible N+1): %s", scope.name, n, shape[:120])
+
+    def get_stats(self):
+        with self._lock:
+            scopes = {
+                name: dict(
+                    agg,
+                    avg_queries=round(agg['queries'] / agg['calls'], 1),
+                    avg_db_ms=round(agg['db_ms'] / agg['calls'], 2),
+                    avg_elapsed_ms=round(agg['elapsed_ms'] / agg['calls'], 1),
+                    db_ms=round(agg['db_ms'], 1),
+                    max_db_ms=round(agg['max_db_ms'], 2),
+                    elapsed_ms=round(agg['elapsed_ms'], 1)
+                )
+                for name, agg in self._aggregates.items()
+            }
+            offenders = [
+                dict(offender, scope=name, statement=shape)
+                for (name, shape), offender in self._offenders.items()
+            ]
+        offenders.sort(key=lambda o: o['max_repeats'], reverse=True)
+        return {
+            'max_queries': self.max_queries,
+            'repeat_threshold': self.repeat_threshold,
+            'scopes': dict(sorted(scopes.items(), key=lambda item: item[1]['queries'], reverse=True)),
+            'n_plus_one': offenders
+        }
+
+    def reset(self):
+        with self._lock:
+            self._aggregates.clear()
+            self._offenders.clear()
+
+
+# Shared by all requests, jobs and dispatcher workers in this process
+query_stats = QueryStats()
+
+
+def track_job(func):
+    """Count the queries of a scheduled job under 'job:<name>', record its run metrics and memory"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            with query_stats.scope(f'job:{func.__name__}'), memory_diagnostics.job_run(func.__name__):
+                result = func(*args, **kwargs)
+            outcome = 'success'
+            return result
+        finally:
+            job_runs_total.inc(job=func.__name__, outcome=outcome)
+            job_duration_seconds.observe(time.perf_counter() - started, job=func.__name__)
+    return wrapper
@@ -0,0 +1,113 @@
+import json
+
+from sqlalchemy import func
+
+
+class LeadRow:
+    """Read-only lead for list pages: plain columns plus the product name
+
+    Built from a single column select joined to product_list, so templates
+    never trigger lazy loads and no ORM identity is kept per row.
+    """
+
+    COLUMNS = ('id', 'order_id', 'name', 'email', 'phone', 'status', 'sales_person_name',
+               'sent_to_mailketing', 'engagement_score', 'created_at', 'follow_up_start')
+    __slots__ = COLUMNS + ('product_name',)
+
+    def __init__(self, row):
+        for name in self.__slots__:
+            setattr(self, name, getattr(row, name))
+
+    @classmethod
+    def query(cls, db):
+        """Column query over Lead (outer joined to ProductList); filter with Lead.* columns"""
+        from models import Lead, ProductList
+        return db.session.query(
+            *[getattr(Lead, name) for name in cls.COLUMNS],
+            ProductList.product_name
+        ).select_from(Lead).outerjoin(ProductList, Lead.product_list_id == ProductList.id)
+
+    @classmethod
+    def wrap(cls, rows):
+        return [cls(row) for row in rows]
+
+    def days_in_follow_up(self):
+        from models import get_wib_now
+        if self.status != 'follow_up' or not self.follow_up_start:
+            return 0
+        return (get_wib_now() - self.follow_up_start).days
+
+    def get_engagement_score(self):
+        from models import get_wib_now
+        from services.scoring_service import LeadScoringService
+        return LeadScoringService.current_score(self.engagement_score or 0.0, get_wib_now())
+
+
+class ProductListRow:
+    """Read-only product list with its sales persons, for the Product Lists page"""
+
+    COLUMNS = ('id', 'store_id', 'store_name', 'product_name', 'product_id',
+               'mailketing_list_followup', 'mailketing_list_closing', 'mailketing_list_not_closing', 'is_active')
+    __slots__ = COLUMNS + ('_sales_ids', '_sales_names', '_sales_emails')
+
+    def __init__(self, row, sales_persons):
+        for name in self.COLUMNS:
+            setattr(self, name, getattr(row, name))
+        if sales_persons:
+            self._sales_ids = [p[0] for p in sales_persons]
+            self._sales_names = [p[1] for p in sales_persons]
+            self._sales_emails = [p[2] for p in sales_persons]
+        else:
+            # Not migrated to product_list_sales_person yet
+            self._sales_ids = self._load_json(row.sales_person_ids)
+            self._sales_names = self._load_json(row.sales_person_names)
+            self._sales_emails = self._load_json(row.sales_person_emails)
+
+    @staticmethod
+    def _load_json(value):
+        try:
+            return json.loads(value) if value else []
+        except ValueError:
+            return []
+
+    @classmethod
+    def load_all(cls, db):
+        """All product lists in two queries (lists, then sales persons)"""
+        from models import ProductList, ProductListSalesPerson, SalesPerson
+        rows = db.session.query(
+            *[getattr(ProductList, name) for name in cls.COLUMNS],
+            ProductList.sales_person_ids, ProductList.sales_person_names, ProductList.sales_person_emails
+        ).order_by(ProductList.id).all()
+
+        sales_persons = {}
+        links = db.session.query(
+            ProductListSalesPerson.product_list_id, SalesPerson.scalev_id, SalesPerson.name, SalesPerson.email
+        ).join(SalesPerson, SalesPerson.id == ProductListSalesPerson.sales_person_id).order_by(
+            ProductListSalesPerson.product_list_id, ProductListSalesPerson.position
+        ).all()
+        for product_list_id, scalev_id, name, email in links:
+            sales_persons.setdefault(product_list_id, []).append((scalev_id, name, email))
+
+        return [cls(row, sales_persons.get(row.id)) for row in rows]
+
+    def get_sales_person_ids_list(self):
+        return self._sales_ids
+
+    def get_sales_person_names_list(self):
+        return self._sales_names
+
+    def get_sales_person_emails_list(self):
+        return self._sales_emails
+
+    def is_for_all_sales(self):
+        return not self._sales_ids
+
+
+def lead_status_counts(db):
+    """Lead count per status plus 'total', in one grouped query"""
+    from models import Lead
+    counts = {'follow_up': 0, 'closing': 0, 'not_closing': 0}
+    for status, count in db.session.query(Lead.status, func.count(Lead.id)).group_by(Lead.status):
+        counts[status] = count
+    counts['total'] = sum(counts.values())
+    return counts
@@ -0,0 +1,131 @@
+from sqlalchemy import and_, exists, func
+
+
+class ResyncService:
+    """Re-sync existing leads of a product list to its Mailketing lists
+
+    Each job covers one list field, i.e. the leads of one status. Leads are
+    read in id order with keyset pagination on (product_list_id, status, id),
+    so every batch is an index range scan and a paused or interrupted job
+    resumes after last_lead_id.
+    """
+
+    BATCH_SIZE = 100
+    LIST_STATUSES = {
+        'mailketing_list_followup': 'follow_up',
+        'mailketing_list_closing': 'closing',
+        'mailketing_list_not_closing': 'not_closing',
+    }
+    ACTIVE_STATES = ('running', 'paused')
+
+    def __init__(self, db):
+        self.db = db
+        from models import Lead, ResyncJob, MailketingMembership, get_wib_now
+        self.Lead = Lead
+        self.ResyncJob = ResyncJob
+        self.MailketingMembership = MailketingMembership
+        self.get_wib_now = get_wib_now
+
+    def _leads(self, product_list_id, lead_status):
+        return self.Lead.query.filter(
+            self.Lead.product_list_id == product_list_id,
+            self.Lead.status == lead_status
+        )
+
+    def changed_fields(self, old_values, product_list):
+        """List fields that now point to a different (non-empty) list"""
+        return [field for field in self.LIST_STATUSES
+                if getattr(product_list, field) and getattr(product_list, field) != old_values.get(field)]
+
+    def dry_run(self, product_list, fields=None):
+        """Per list field: leads a re-sync would read and how many are already on the list"""
+        counts = {}
+        for field in fields or self.LIST_STATUSES:
+            list_id = getattr(product_list, field)
+            if not list_id:
+                continue
+            leads = self._leads(product_list.id, self.LIST_STATUSES[field])
+            total = leads.count()
+            already = leads.filter(exists().where(and_(
+                self.MailketingMembership.email_lower == func.lower(func.trim(self.Lead.email)),
+                self.MailketingMembership.list_id == str(list_id)
+            ))).count()
+            counts[field] = {
+                'lead_status': self.LIST_STATUSES[field],
+                'list_id': list_id,
+                'leads': total,
+                'already_member': already,
+                'to_send': total - already
+            }
+        return counts
+
+    def create_job(self, product_list, field):
+        """Start a job for one list field, cancelling any active job for the same leads"""
+        lead_status = self.LIST_STATUSES[field]
+        now = self.get_wib_now()
+        self.ResyncJob.query.filter(
+            self.ResyncJob.product_list_id == product_list.id,
+            self.ResyncJob.lead_status == lead_status,
+            self.ResyncJob.state.in_(self.ACTIVE_STATES)
+        ).update({'state': 'cancelled', 'finished_at': now, 'updated_at': now}, synchronize_session=False)
+
+        job = self.ResyncJob(
+            product_list_id=product_list.id,
+            lead_status=lead_status,
+            list_id=str(getattr(product_list, field)),
+            state='running',
+            total=self._leads(product_list.id, lead_status).count(),
+            created_at=now,
+            updated_at=now
+        )
+        self.db.session.add(job)
+        self.db.session.commit()
+        return job
+
+    def next_batch(self, job):
+        return self._leads(job.product_list_id, job.lead_status).filter(
+            self.Lead.id > (job.last_lead_id or 0)
+        ).order_by(self.Lead.id).limit(self.BATCH_SIZE).all()
+
+    def record_batch(self, job, last_lead_id, statuses):
+        job.last_lead_id = last_lead_id
+        for status in statuses:
+            job.processed = (job.processed or 0) + 1
+            if status == 'sent':
+                job.sent = (job.sent or 0) + 1
+            elif status == 'deferred':
+                job.deferred = (job.deferred or 0) + 1
+            elif status in ('failed', 'error'):
+                job.failed = (job.failed or 0) + 1
+            else:
+                job.skipped = (job.skipped or 0) + 1
+        job.updated_at = self.get_wib_now()
+        self.db.session.commit()
+
+    def finish(self, job, error=None):
+        job.state = 'failed' if error else 'done'
+        job.error = str(error)[:500] if error else None
+        job.finished_at = job.updated_at = self.get_wib_now()
+        self.db.session.commit()
+
+    def pause(self, job):
+        if job.state != 'running':
+            return False
+        job.state = 'paused'
+        job.updated_at = self.get_wib_now()
+        self.db.session.commit()
+        return True
+
+    def resume(self, job):
+        if job.state != 'paused':
+            return False
+        job.state = 'running'
+        job.updated_at = self.get_wib_now()
+        self.db.session.commit()
+        return True
+
+    def get_running(self):
+        return self.ResyncJob.query.filter_by(state='running').all()
+
+    def get_recent(self, limit=10):
+        return self.ResyncJob.query.order_by(self.ResyncJob.id.desc()).limit(limit).all()
@@ -0,0 +1,79 @@
+import json
+
+from sqlalchemy import exists, false, or_, select
+
+
+class SalesPersonService:
+    """Which product lists serve a given order handler (CS)"""
+
+    def __init__(self, db):
+        self.db = db
+        from models import ProductList, SalesPerson, ProductListSalesPerson
+        self.ProductList = ProductList
+        self.SalesPerson = SalesPerson
+        self.ProductListSalesPerson = ProductListSalesPerson
+
+    def product_lists_serving(self, product_list_ids, handler_id=None, handler_email=None, handler_name=None):
+        """IDs among product_list_ids that are for all sales or list the handler
+
+        One query: the handler is looked up by ScaleV ID, lowercase email or
+        lowercase name (all indexed), then joined to product lists through
+        product_list_sales_person. Lists without link rows (e.g. the startup
+        backfill failed for them) fall back to their JSON columns, like
+        ProductList.get_sales_person_*_list() does.
+        """
+        if not product_list_ids:
+            return set()
+
+        handler_filters = []
+        if handler_id:
+            handler_filters.append(self.SalesPerson.scalev_id == str(handler_id))
+        if handler_email:
+            handler_filters.append(self.SalesPerson.email_lower == handler_email.strip().lower())
+        if handler_name:
+            handler_filters.append(self.SalesPerson.name_lower == handler_name.strip().lower())
+
+        link = self.ProductListSalesPerson
+        linked = exists(select(link.id).where(link.product_list_id == self.ProductList.id))
+        if handler_filters:
+            handler_people = select(self.SalesPerson.id).where(or_(*handler_filters))
+            matched = self.ProductList.id.in_(
+                select(link.product_list_id).where(link.sales_person_id.in_(handler_people))
+            )
+        else:
+            matched = false()
+
+        rows = self.db.session.query(
+            self.ProductList.id, linked.label('linked'), matched.label('matched'),
+            self.ProductList.sales_person_ids, self.ProductList.sales_person_emails,
+            self.ProductList.sales_person_names
+        ).filter(self.ProductList.id.in_(product_list_ids)).all()
+
+        served = set()
+        for row in rows:
+            if row.linked:
+                if row.matched:
+                    served.add(row.id)
+            elif self._json_serves(row, handler_id, handler_email, handler_name):
+                served.add(row.id)
+        return served
+
+    @staticmethod
+    def _json_serves(row, handler_id, handler_email, handler_name):
+        """Handler match against the JSON sales person columns (no link rows)"""
+        def values(column):
+            try:
+                return json.loads(column) if column else []
+            except ValueError:
+                return []
+
+        ids = values(row.sales_person_ids)
+        if not ids:
+            return True  # For all sales
+        if handler_id and str(handler_id) in [str(i) for i in ids]:
+            return True
+        if handler_email and handler_email.strip().lower() in [
+                (e or '').lower() for e in values(row.sales_person_emails)]:
+            return True
+        return bool(handler_name) and handler_name.strip().lower() in [
+            (n or '').lower() for n in values(row.sales_person_names)]
@@ -1,12 +1,22 @@
-import requests
+import logging
+import os
+
+from services.circuit_breaker import circuit_breakers
+from services.structured_logging import register_secret
+
+logger = logging.getLogger(__name__)
 
 class ScalevService:
     """Service for interacting with Scalev API"""
     
     def __init__(self, api_key):
         self.api_key = api_key
-        self.base_url = 'https://api.scalev.id/v1'
-        self.base_url_v2 = 'https://api.scalev.id/v2'
+        register_secret(api_key)
+        # SCALEV_API_BASE points the service at a stub server (see bench/)
+        api_base = os.environ.get('SCALEV_API_BASE', 'https://api.scalev.id').rstrip('/')
+        self.base_url = f'{api_base}/v1'
+        self.base_url_v2 = f'{api_base}/v2'
+        self.http = circuit_breakers['scalev']
         self.headers = {
             'Authorization': f'Bearer {api_key}',
             'Content-Type': 'application/json'
@@ -19,7 +29,7 @@ class ScalevService:
             last_id = None
             has_next = True
             
-            print(f"Fetching ScaleV products (max {limit})...")
+            logger.info("Fetching ScaleV products (max %s)...", limit)
             
             # Loop untuk fetch semua produk dengan pagination
             while has_next and len(all_products) < limit:
@@ -27,7 +37,7 @@ class ScalevService:
                 if last_id:
                     params['last_id'] = last_id
                 
-                response = requests.get(
+                response = self.http.get(
                     f'{self.base_url_v2}/products',
                     headers=self.headers,
                     params=params,
@@ -38,7 +48,7 @@ class ScalevService:
                 
                 # Debug first page
                 if not last_id:
-                    print(f"ScaleV Response: {data.get('status')}, has_next: {data.get('data', {}).get('has_next')}")
+                    logger.debug("ScaleV Response: %s, has_next: %s", data.get('status'), data.get('data', {}).get('has_next'))
                 
                 # Parse response dari v2 API
                 if data.get('status') == 'Success' and 'data' in data:
@@ -49,163 +59,109 @@ class ScalevService:
                     has_next = data['data'].get('has_next', False)
                     last_id = data['data'].get('last_id')
                     
-                    print(f"Fetched {len(results)} products, total: {len(all_products)}")
+                    logger.debug("Fetched %s products, total: %s", len(results), len(all_products))
                 else:
-                    print(f"Unexpected response format: {data}")
+                    logger.warning("Unexpected response format: %s", data)
                     break
             
-            print(f"Total products fetched: {len(all_products)}")
+            logger.info("Total products fetched: %s", len(all_products))
             return all_products[:limit]  # Batasi sesuai limit
             
         except Exception as e:
-            print(f"Error fetching ScaleV products: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error fetching ScaleV products: %s", e)
             return []
     
     def get_order(self, order_id):
         """Get order details"""
-        response = requests.get(
+        response = self.http.get(
             f'{self.base_url}/orders/{order_id}',
             headers=self.headers
         )
         response.raise_for_status()
         return response.json()
     
+    def get_order_handler(self, order_id):
+        """Get the handler (CS) of an order from the v2 order detail
+
+        Returns the handler dict (id, email, fullname), or None if the order
+        has no handler or does not exist. Other API errors are raised.
+        """
+        response = self.http.get(
+            f'{self.base_url_v2}/order/{order_id}',
+            headers=self.headers,
+            timeout=10
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return (response.json().get('data') or {}).get('handler') or None
+    
     def get_product(self, product_id):
         """Get product details"""
-        response = requests.get(
+        response = self.http.get(
             f'{self.base_url}/products/{product_id}',
             headers=self.headers
         )
         response.raise_for_status()
         return response.json()
     
-    def get_stores(self, limit=100):
-        """Get all stores using v2 API with pagination support"""
+    def iter_pages(self, path, last_id=None, page_size=25):
+        """Iterate a v2 list endpoint page by page.
+
+        Yields (results, last_id, has_next) so callers can persist the
+        cursor after every page and resume from it later.
+        """
+        has_next = True
+        while has_next:
+            params = {'page_size': page_size}
+            if last_id:
+                params['last_id'] = last_id
+            
+            response = self.http.get(
+                f'{self.base_url_v2}{path}',
+                headers=self.headers,
+                params=params,
+                timeout=15
+            )
+            response.raise_for_status()
+            data = response.json()
+            
+            if data.get('status') != 'Success' or 'data' not in data:
+                # Raised, not returned: callers must not take a refused page for the end of the list
+                raise ValueError(f"Unexpected response format from {path}: {str(data)[:200]}")
+            
+            results = data['data'].get('results', [])
+            has_next = data['data'].get('has_next', False)
+            last_id = data['data'].get('last_id') or last_id
+            yield results, last_id, has_next
+            
+            if not results:
+                return
+    
+    def _fetch_all(self, path, label, limit=None):
+        """Collect all pages of a list endpoint (optionally capped)"""
         try:
-            all_stores = []
-            last_id = None
-            has_next = True
-            
-            print(f"Fetching ScaleV stores (max {limit})...")
-            
-            while has_next and len(all_stores) < limit:
-                params = {'page_size': 25}
-                if last_id:
-                    params['last_id'] = last_id
-                
-                response = requests.get(
-                    f'{self.base_url_v2}/stores',
-                    headers=self.headers,
-                    params=params,
-                    timeout=15
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                if data.get('status') == 'Success' and 'data' in data:
-                    results = data['data'].get('results', [])
-                    all_stores.extend(results)
-                    
-                    has_next = data['data'].get('has_next', False)
-                    last_id = data['data'].get('last_id')
-                    
-                    print(f"Fetched {len(results)} stores, total: {len(all_stores)}")
-                else:
+            items = []
+            logger.info("Fetching ScaleV %s...", label)
+            for results, _, _ in self.iter_pages(path):
+                items.extend(results)
+                logger.debug("Fetched %s %s, total: %s", len(results), label, len(items))
+                if limit and len(items) >= limit:
                     break
-            
-            print(f"Total stores fetched: {len(all_stores)}")
-            return all_stores[:limit]
-            
+            logger.info("Total %s fetched: %s", label, len(items))
+            return items[:limit] if limit else items
         except Exception as e:
-            print(f"Error fetching ScaleV stores: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error fetching ScaleV %s: %s", label, e)
             return []
     
-    def get_store_products(self, store_id, limit=100):
+    def get_stores(self, limit=None):
+        """Get all stores using v2 API with pagination support"""
+        return self._fetch_all('/stores', 'stores', limit)
+    
+    def get_store_products(self, store_id, limit=None):
         """Get products from a specific store"""
-        try:
-            all_products = []
-            last_id = None
-            has_next = True
-            
-            print(f"Fetching products for store {store_id}...")
-            
-            while has_next and len(all_products) < limit:
-                params = {'page_size': 25}
-                if last_id:
-                    params['last_id'] = last_id
-                
-                response = requests.get(
-                    f'{self.base_url_v2}/stores/{store_id}/products',
-                    headers=self.headers,
-                    params=params,
-                    timeout=15
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                if data.get('status') == 'Success' and 'data' in data:
-                    results = data['data'].get('results', [])
-                    all_products.extend(results)
-                    
-                    has_next = data['data'].get('has_next', False)
-                    last_id = data['data'].get('last_id')
-                    
-                    print(f"Fetched {len(results)} products, total: {len(all_products)}")
-                else:
-                    break
-            
-            print(f"Total products fetched: {len(all_products)}")
-            return all_products[:limit]
-            
-        except Exception as e:
-            print(f"Error fetching store products: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return []
+        return self._fetch_all(f'/stores/{store_id}/products', f'products for store {store_id}', limit)
     
-    def get_store_sales_people(self, store_id, limit=100):
+    def get_store_sales_people(self, store_id, limit=None):
         """Get sales people from a specific store"""
-        try:
-            all_sales = []
-            last_id = None
-            has_next = True
-            
-            print(f"Fetching sales people for store {store_id}...")
-            
-            while has_next and len(all_sales) < limit:
-                params = {'page_size': 25}
-                if last_id:
-                    params['last_id'] = last_id
-                
-                response = requests.get(
-                    f'{self.base_url_v2}/stores/{store_id}/sales-people',
-                    headers=self.headers,
-                    params=params,
-                    timeout=15
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                if data.get('status') == 'Success' and 'data' in data:
-                    results = data['data'].get('results', [])
-                    all_sales.extend(results)
-                    
-                    has_next = data['data'].get('has_next', False)
-                    last_id = data['data'].get('last_id')
-                    
-                    print(f"Fetched {len(results)} sales people, total: {len(all_sales)}")
-                else:
-                    break
-            
-            print(f"Total sales people fetched: {len(all_sales)}")
-            return all_sales[:limit]
-            
-        except Exception as e:
-            print(f"Error fetching store sales people: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return []
+        return self._fetch_all(f'/stores/{store_id}/sales-people', f'sales people for store {store_id}', limit)
@@ -0,0 +1,181 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, update
+
+
+class LeadScoringService:
+    """Engagement score per lead, kept as an exponentially decayed counter
+
+    The stored value is scaled to an epoch: an event at time t adds
+    weight * 2^((t - epoch) / half_life). Decay then applies equally to
+    every lead, so ordering by the stored column is the same as ordering by
+    the current score and each event is a single O(1) addition. The current
+    score is stored * 2^(-(now - epoch) / half_life).
+
+    The scale grows by 2^52 a year, so rebase_epoch() moves the epoch
+    forward by whole half-lives and rescales the column in the same
+    transaction. The epoch is persisted in Settings.score_epoch (EPOCH until
+    the first rebase) and cached on the class for the read paths.
+    """
+
+    HALF_LIFE_DAYS = 7
+    EPOCH = datetime(2024, 1, 1)
+    # Rebase once the epoch is this many half-lives old (2^1024 overflows a float)
+    REBASE_AFTER_HALF_LIVES = 52
+
+    # Epoch of the stored scores, refreshed from Settings by load_epoch()
+    epoch = EPOCH
+
+    # Keyed by EngagementService.EVENT_TYPES codes
+    WEIGHTS = {
+        1: 1.0,   # open
+        2: 3.0,   # click
+        3: -5.0,  # unsubscribe
+        4: 0.5,   # newsubscriber
+    }
+
+    def __init__(self, db):
+        self.db = db
+        from models import Lead, EngagementEvent, Settings, get_wib_now
+        self.Lead = Lead
+        self.EngagementEvent = EngagementEvent
+        self.Settings = Settings
+        self.get_wib_now = get_wib_now
+
+    @classmethod
+    def _half_lives_since_epoch(cls, ts):
+        return (ts - cls.epoch).total_seconds() / (cls.HALF_LIFE_DAYS * 86400)
+
+    def load_epoch(self):
+        """Refresh the class-wide epoch from Settings (another process may have rebased)"""
+        settings_obj = self.Settings.query.first()
+        LeadScoringService.epoch = (settings_obj.score_epoch if settings_obj else None) or self.EPOCH
+        return LeadScoringService.epoch
+
+    def rebase_epoch(self, now=None):
+        """Move the epoch forward by whole half-lives once it is REBASE_AFTER_HALF_LIVES old
+
+        Stored scores are multiplied by 2^-shift in one UPDATE, committed
+        together with the new Settings.score_epoch. Powers of two keep the
+        rescaled values exact. Returns the number of half-lives shifted.
+        """
+        self.load_epoch()
+        shift = int(self._half_lives_since_epoch(now or self.get_wib_now()))
+        if shift < self.REBASE_AFTER_HALF_LIVES:
+            return 0
+
+        settings_obj = self.Settings.query.first()
+        if not settings_obj:
+            settings_obj = self.Settings()
+            self.db.session.add(settings_obj)
+        new_epoch = self.epoch + timedelta(days=shift * self.HALF_LIFE_DAYS)
+        self.db.session.execute(
+            update(self.Lead.__table__).where(self.Lead.__table__.c.engagement_score != 0).values(
+                engagement_score=self.Lead.__table__.c.engagement_score * bindparam('factor')
+            ),
+            {'factor': 2.0 ** -shift},
+            execution_options={'synchronize_session': False}
+        )
+        settings_obj.score_epoch = new_epoch
+        self.db.session.commit()
+        LeadScoringService.epoch = new_epoch
+        return shift
+
+    @classmethod
+    def event_value(cls, event_type, ts):
+        """Epoch-scaled contribution of one event"""
+        weight = cls.WEIGHTS.get(event_type, 0.0)
+        if not weight:
+            return 0.0
+        return weight * 2.0 ** cls._half_lives_since_epoch(ts)
+
+    @classmethod
+    def current_score(cls, stored, now):
+        """Decay a stored (epoch-scaled) value to its score at `now`"""
+        if not stored:
+            return 0.0
+        return stored * 2.0 ** -cls._half_lives_since_epoch(now)
+
+    def apply_events(self, rows):
+        """Add a batch of event rows to their leads' scores (one UPDATE per lead)"""
+        self.load_epoch()
+        deltas = {}
+        for row in rows:
+            lead_id = row.get('lead_id')
+            if not lead_id:
+                continue
+            value = self.event_value(row['event_type'], row['ts'])
+            if value:
+                deltas[lead_id] = deltas.get(lead_id, 0.0) + value
+        if not deltas:
+            return 0
+
+        stmt = update(self.Lead.__table__).where(
+            self.Lead.__table__.c.id == bindparam('lead_id')
+        ).values(
+            engagement_score=self.Lead.__table__.c.engagement_score + bindparam('delta')
+        )
+        self.db.session.execute(
+            stmt,
+            [{'lead_id': lead_id, 'delta': delta} for lead_id, delta in deltas.items()],
+            execution_options={'synchronize_session': False}
+        )
+        return len(deltas)
+
+    def get_hot_leads(self, limit=20, status='follow_up'):
+        """Top N leads by score in a status (served by the (status, engagement_score) index)"""
+        return self.Lead.query.filter(
+            self.Lead.status == status,
+            self.Lead.engagement_score > 0
+        ).order_by(self.Lead.engagement_score.desc()).limit(limit).all()
+
+    def recompute_all(self, apply=False, tolerance=0.01, batch_size=1000):
+        """Rebuild scores from stored events and compare with the incremental values
+
+        Events purged by retention are not counted, so differences below
+        `tolerance` (in current-score units) are expected and ignored. The
+        epoch is rebased first when it is due.
+        """
+        now = self.get_wib_now()
+        rebased = self.rebase_epoch(now)
+        expected = {}
+        query = self.db.session.query(
+            self.EngagementEvent.lead_id,
+            self.EngagementEvent.event_type,
+            self.EngagementEvent.ts
+        ).filter(
+            self.EngagementEvent.lead_id.isnot(None)
+        ).execution_options(yield_per=batch_size)
+        for lead_id, event_type, ts in query:
+            expected[lead_id] = expected.get(lead_id, 0.0) + self.event_value(event_type, ts)
+
+        report = {'checked': 0, 'mismatched': 0, 'fixed': 0, 'max_drift': 0.0, 'samples': [],
+                  'rebased_half_lives': rebased}
+        fixes = []
+        leads = self.db.session.query(
+            self.Lead.id, self.Lead.engagement_score
+        ).execution_options(yield_per=batch_size)
+        for lead_id, stored in leads:
+            report['checked'] += 1
+            want = expected.get(lead_id, 0.0)
+            drift = abs(self.current_score(stored or 0.0, now) - self.current_score(want, now))
+            if drift > tolerance:
+                report['mismatched'] += 1
+                report['max_drift'] = max(report['max_drift'], drift)
+                if len(report['samples']) < 20:
+                    report['samples'].append({
+                        'lead_id': lead_id,
+                        'stored': round(self.current_score(stored or 0.0, now), 4),
+                        'recomputed': round(self.current_score(want, now), 4)
+                    })
+                fixes.append({'lead_id': lead_id, 'score': want})
+
+        if apply and fixes:
+            stmt = update(self.Lead.__table__).where(
+                self.Lead.__table__.c.id == bindparam('lead_id')
+            ).values(engagement_score=bindparam('score'))
+            self.db.session.execute(stmt, fixes, execution_options={'synchronize_session': False})
+            self.db.session.commit()
+            report['fixed'] = len(fixes)
+
+        return report
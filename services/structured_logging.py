@@ -0,0 +1,187 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+
+# Attributes every LogRecord has; anything else was passed with extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+# Whether the current webhook event was picked for verbose (DEBUG) output;
+# None outside an event, where DEBUG simply follows the log level
+_event_sampled = ContextVar('log_event_sampled', default=None)
+
+
+class RedactingFilter(logging.Filter):
+    """Mask API keys, bot tokens and secrets before a record is written
+
+    Runs on the listener thread, so the regexes never cost request time.
+    Besides the patterns below, exact values passed to register_secret()
+    (API keys the services are built with) are masked wherever they appear.
+    """
+
+    MASK = '***'
+    PATTERNS = (
+        # Telegram bot token inside URLs: bot123456:AA...
+        (re.compile(r'bot\d+:[A-Za-z0-9_-]+'), 'bot' + MASK),
+        (re.compile(r'(Bearer\s+)[^\s"\',]+', re.IGNORECASE), r'\1' + MASK),
+        # "api_token": "...", api_key=..., 'secret': '...'
+        (re.compile(r'''((?:api[_-]?token|api[_-]?key|token|secret|password)["']?\s*[:=]\s*["']?)[^"'\s&,}]+''',
+                    re.IGNORECASE), r'\1' + MASK),
+    )
+
+    def __init__(self):
+        super().__init__()
+        self._secrets = set()
+
+    def add_secret(self, value):
+        if value and len(value) >= 8:
+            self._secrets.add(value)
+
+    def redact(self, text):
+        for secret in tuple(self._secrets):
+            if secret in text:
+                text = text.replace(secret, self.MASK)
+        for pattern, replacement in self.PATTERNS:
+            text = pattern.sub(replacement, text)
+        return text
+
+    def filter(self, record):
+        record.msg = self.redact(record.getMessage())
+        record.args = None
+        for key, value in list(vars(record).items()):
+            if key not in _RECORD_ATTRS and isinstance(value, str):
+                setattr(record, key, self.redact(value))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Drop DEBUG records of webhook events that were not sampled"""
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or _event_sampled.get() is not False
+
+
+def _extra_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class TextFormatter(logging.Formatter):
+    """`time level logger: message key=value ...` for the console"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        entry.update(_extra_fields(record))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+# Loggers of this app: logging.getLogger('app') in app.py, __name__ in services
+APP_LOGGERS = ('app', 'services')
+
+redaction = RedactingFilter()
+_sample_rate = 0.05
+_listener = None
+_setup_lock = threading.Lock()
+
+
+def setup_logging(level=None, fmt=None, sample_rate=None):
+    """Send all logging through a queue to a background writer thread (idempotent)
+
+    level: LOG_LEVEL (default INFO). fmt: LOG_FORMAT, 'text' or 'json'.
+    sample_rate: LOG_DEBUG_SAMPLE_RATE, the share of webhook events whose
+    DEBUG lines are written when LOG_LEVEL=DEBUG (default 0.05).
+    """
+    global _listener, _sample_rate
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        level = (level or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+        fmt = fmt or os.environ.get('LOG_FORMAT', 'text')
+        _sample_rate = float(sample_rate if sample_rate is not None else os.environ.get('LOG_DEBUG_SAMPLE_RATE', 0.05))
+
+        writer = logging.StreamHandler(sys.stdout)
+        writer.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+        writer.addFilter(redaction)
+
+        log_queue = queue.SimpleQueue()
+        handler = logging.handlers.QueueHandler(log_queue)
+        handler.addFilter(SamplingFilter())
+
+        root = logging.getLogger()
+        root.setLevel(logging.INFO)
+        root.addHandler(handler)
+        # LOG_LEVEL applies to our own loggers; libraries stay at INFO
+        for name in APP_LOGGERS:
+            logging.getLogger(name).setLevel(level)
+        # One line per scheduled run is noise at INFO
+        logging.getLogger('apscheduler').setLevel(logging.WARNING)
+
+        _listener = logging.handlers.QueueListener(log_queue, writer, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        return _listener
+
+
+def register_secret(value):
+    """Mask this exact value (an API key or token) in all log output"""
+    redaction.add_secret(value)
+
+
+@contextmanager
+def sampled_event(sampled=None):
+    """Decide once per webhook event whether its DEBUG lines are written
+
+    Pass `sampled` (from is_sampled() on the request thread) to carry the
+    decision over to the worker thread that processes the event. Also
+    usable as a view decorator, deciding again for every request.
+    """
+    if sampled is None:
+        sampled = random.random() < _sample_rate
+    token = _event_sampled.set(sampled)
+    try:
+        yield
+    finally:
+        _event_sampled.reset(token)
+
+
+def is_sampled():
+    return _event_sampled.get()
+
+
+def verbose(logger):
+    """True when DEBUG lines of the current event will be written
+
+    Guard expensive debug formatting (payload dumps) with this so it is
+    skipped entirely for events that are not sampled.
+    """
+    return logger.isEnabledFor(logging.DEBUG) and _event_sampled.get() is not False
@@ -0,0 +1,195 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+from services.circuit_breaker import circuit_breakers
+from services.telegram_service import TelegramService
+
+logger = logging.getLogger(__name__)
+
+
+class ChatRateLimiter:
+    """Token bucket per chat (Telegram allows ~20 messages/minute into one group)"""
+
+    def __init__(self, rate_per_second=20 / 60, burst=5):
+        self.rate = rate_per_second
+        self.burst = burst
+        self._buckets = {}  # chat_id -> [tokens, last_refill, blocked_until]
+        self._lock = threading.Lock()
+
+    def reserve(self, chat_id):
+        """Take a token; returns seconds to wait before sending (0 = send now)"""
+        with self._lock:
+            now = time.monotonic()
+            tokens, last, blocked_until = self._buckets.get(chat_id, [self.burst, now, 0.0])
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if now < blocked_until:
+                self._buckets[chat_id] = [tokens, now, blocked_until]
+                return blocked_until - now
+            if tokens >= 1:
+                self._buckets[chat_id] = [tokens - 1, now, blocked_until]
+                return 0.0
+            self._buckets[chat_id] = [tokens, now, blocked_until]
+            return (1 - tokens) / self.rate
+
+    def block(self, chat_id, seconds):
+        """Pause a chat after Telegram answered 429 with retry_after"""
+        with self._lock:
+            now = time.monotonic()
+            tokens, last, _ = self._buckets.get(chat_id, [0, now, 0.0])
+            self._buckets[chat_id] = [0, now, now + seconds]
+
+
+class TelegramNotifier:
+    """Background Telegram sender with a bounded queue, per-chat rate limit,
+    duplicate coalescing and an optional digest mode.
+
+    Webhooks call notify()/add_to_digest() which never touch the network.
+    """
+
+    def __init__(self, maxsize=1000, coalesce_seconds=60, max_digest_samples=5, rate_limiter=None):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.coalesce_seconds = coalesce_seconds
+        self.max_digest_samples = max_digest_samples
+        self.rate_limiter = rate_limiter or ChatRateLimiter()
+        self._recent = {}  # coalesce key -> last enqueue time
+        self._recent_order = deque()
+        self._digests = {}  # (bot_token, chat_id) -> digest state
+        self._lock = threading.Lock()
+        self._worker = None
+        self.stats = {'enqueued': 0, 'sent': 0, 'failed': 0, 'dropped': 0, 'coalesced': 0, 'digests_sent': 0}
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name='telegram-notifier', daemon=True)
+                    self._worker.start()
+
+    def _is_duplicate(self, key):
+        """True if the same event was queued within the coalescing window"""
+        if key is None:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            # Expire old keys in insertion order
+            while self._recent_order and now - self._recent_order[0][1] > self.coalesce_seconds:
+                old_key, old_ts = self._recent_order.popleft()
+                if self._recent.get(old_key) == old_ts:
+                    del self._recent[old_key]
+            if key in self._recent:
+                self.stats['coalesced'] += 1
+                return True
+            self._recent[key] = now
+            self._recent_order.append((key, now))
+            return False
+
+    def notify(self, bot_token, chat_id, text, key=None):
+        """Queue a message; returns False if it was coalesced or the queue is full"""
+        if self._is_duplicate(key and (chat_id, key)):
+            return False
+        try:
+            self.queue.put_nowait((bot_token, chat_id, text, 0))
+        except queue.Full:
+            self.stats['dropped'] += 1
+            logger.warning("⚠️  Telegram queue full (%s), notification dropped", self.queue.maxsize)
+            return False
+        self.stats['enqueued'] += 1
+        self._ensure_worker()
+        return True
+
+    def add_to_digest(self, bot_token, chat_id, kind, text, interval_minutes, key=None):
+        """Count an event into the chat's digest instead of sending it now"""
+        if self._is_duplicate(key and (chat_id, key)):
+            return False
+        with self._lock:
+            digest = self._digests.setdefault((bot_token, chat_id), {
+                'started': time.monotonic(),
+                'interval': interval_minutes,
+                'counts': {},
+                'samples': {},
+            })
+            digest['interval'] = interval_minutes
+            digest['counts'][kind] = digest['counts'].get(kind, 0) + 1
+            samples = digest['samples'].setdefault(kind, [])
+            if len(samples) < self.max_digest_samples:
+                samples.append(text)
+        self._ensure_worker()
+        return True
+
+    def _flush_due_digests(self, force=False):
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            for chat_key, digest in list(self._digests.items()):
+                if force or now - digest['started'] >= digest['interval'] * 60:
+                    due.append((chat_key, self._digests.pop(chat_key)))
+        for (bot_token, chat_id), digest in due:
+            text = TelegramService.build_digest_message(digest['counts'], digest['samples'], digest['interval'])
+            try:
+                self.queue.put_nowait((bot_token, chat_id, text, 0))
+                self.stats['digests_sent'] += 1
+            except queue.Full:
+                self.stats['dropped'] += 1
+
+    def _run(self):
+        while True:
+            self._flush_due_digests()
+            try:
+                bot_token, chat_id, text, attempts = self.queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                self._deliver(bot_token, chat_id, text, attempts)
+            except Exception as e:
+                self.stats['failed'] += 1
+                logger.error("❌ Telegram notifier error: %s", e)
+            finally:
+                self.queue.task_done()
+
+    def _deliver(self, bot_token, chat_id, text, attempts):
+        # Telegram is down: keep the message queued until the breaker allows a trial call
+        breaker = circuit_breakers['telegram']
+        pause = breaker.retry_in()
+        while pause > 0:
+            time.sleep(min(pause, 5))
+            pause = breaker.retry_in()
+
+        wait = self.rate_limiter.reserve(chat_id)
+        while wait > 0:
+            time.sleep(min(wait, 5))
+            wait = self.rate_limiter.reserve(chat_id)
+
+        telegram = TelegramService(bot_token, chat_id)
+        if telegram.send_message(text):
+            self.stats['sent'] += 1
+            return
+
+        if breaker.state != 'closed' and attempts < 3:
+            # Failed while the breaker tripped: retry after it recovers
+            try:
+                self.queue.put_nowait((bot_token, chat_id, text, attempts + 1))
+                return
+            except queue.Full:
+                pass
+
+        if telegram.retry_after and attempts < 3:
+            # Flood control: pause the chat and retry the same message later
+            self.rate_limiter.block(chat_id, telegram.retry_after)
+            try:
+                self.queue.put_nowait((bot_token, chat_id, text, attempts + 1))
+                return
+            except queue.Full:
+                pass
+        self.stats['failed'] += 1
+
+    def get_stats(self):
+        with self._lock:
+            pending_digest = sum(sum(d['counts'].values()) for d in self._digests.values())
+        return dict(self.stats, queue_depth=self.queue.qsize(), pending_digest_events=pending_digest)
+
+
+# Shared by all requests in this process
+telegram_notifier = TelegramNotifier()
@@ -1,13 +1,25 @@
+import logging
+import os
 import requests
 from datetime import datetime
 
+from services.circuit_breaker import circuit_breakers
+from services.structured_logging import register_secret
+
+logger = logging.getLogger(__name__)
+
 class TelegramService:
     """Service for sending notifications to Telegram"""
     
     def __init__(self, bot_token, chat_id):
         self.bot_token = bot_token
+        register_secret(bot_token)
         self.chat_id = chat_id
-        self.base_url = f"https://api.telegram.org/bot{bot_token}"
+        # TELEGRAM_API_BASE points the service at a stub server (see bench/)
+        api_base = os.environ.get('TELEGRAM_API_BASE', 'https://api.telegram.org').rstrip('/')
+        self.base_url = f"{api_base}/bot{bot_token}"
+        self.retry_after = None  # Seconds requested by Telegram after a 429
+        self.http = circuit_breakers['telegram']
     
     def send_message(self, message, parse_mode='HTML'):
         """Send a message to Telegram chat"""
@@ -19,32 +31,41 @@ class TelegramService:
                 'parse_mode': parse_mode
             }
             
-            response = requests.post(url, json=payload, timeout=10)
+            self.retry_after = None
+            response = self.http.post(url, json=payload, timeout=10)
+            if response.status_code == 429:
+                # Per-chat flood control: Telegram tells us how long to wait
+                try:
+                    self.retry_after = response.json().get('parameters', {}).get('retry_after', 5)
+                except ValueError:
+                    self.retry_after = 5
+                logger.warning("⏳ Telegram rate limited, retry after %ss", self.retry_after)
+                return False
             response.raise_for_status()
             
             result = response.json()
             if result.get('ok'):
-                print(f"✅ Telegram message sent successfully")
+                logger.debug("✅ Telegram message sent successfully")
                 return True
             else:
-                print(f"❌ Telegram API error: {result}")
+                logger.error("❌ Telegram API error: %s", result)
                 return False
                 
         except requests.exceptions.Timeout:
-            print(f"⏱️ Telegram request timeout")
+            logger.warning("⏱️ Telegram request timeout")
             return False
         except requests.exceptions.RequestException as e:
-            print(f"❌ Telegram request error: {str(e)}")
+            logger.error("❌ Telegram request error: %s", e)
             return False
         except Exception as e:
-            print(f"❌ Telegram error: {str(e)}")
+            logger.error("❌ Telegram error: %s", e)
             return False
     
     def test_connection(self):
         """Test Telegram bot connection"""
         try:
             url = f"{self.base_url}/getMe"
-            response = requests.get(url, timeout=10)
+            response = self.http.get(url, timeout=10)
             response.raise_for_status()
             
             result = response.json()
@@ -52,7 +73,7 @@ class TelegramService:
                 bot_info = result.get('result', {})
                 bot_name = bot_info.get('first_name', 'Unknown')
                 bot_username = bot_info.get('username', 'Unknown')
-                print(f"✅ Connected to Telegram bot: {bot_name} (@{bot_username})")
+                logger.info("✅ Connected to Telegram bot: %s (@%s)", bot_name, bot_username)
                 return True, f"Connected to: {bot_name} (@{bot_username})"
             else:
                 return False, "Invalid bot token"
@@ -60,8 +81,9 @@ class TelegramService:
         except Exception as e:
             return False, str(e)
     
-    def send_bounce_notification(self, email, reason, date):
-        """Send bounce notification"""
+    @staticmethod
+    def build_bounce_message(email, reason, date):
+        """Bounce notification text"""
         message = f"""
 🚫 <b>Email Bounce Alert</b>
 
@@ -71,10 +93,11 @@ class TelegramService:
 
 Email ini bounce dan tidak terkirim dengan baik.
 """
-        return self.send_message(message.strip())
+        return message.strip()
     
-    def send_email_open_notification(self, email, date):
-        """Send email open notification"""
+    @staticmethod
+    def build_email_open_message(email, date):
+        """Email open notification text"""
         message = f"""
 👁️ <b>Email Opened</b>
 
@@ -83,10 +106,11 @@ Email ini bounce dan tidak terkirim dengan baik.
 
 Subscriber membuka email Anda!
 """
-        return self.send_message(message.strip())
+        return message.strip()
     
-    def send_link_click_notification(self, email, link_clicked, date):
-        """Send link click notification"""
+    @staticmethod
+    def build_link_click_message(email, link_clicked, date):
+        """Link click notification text"""
         message = f"""
 🖱️ <b>Link Clicked</b>
 
@@ -96,10 +120,11 @@ Subscriber membuka email Anda!
 
 Subscriber mengklik link di email Anda!
 """
-        return self.send_message(message.strip())
+        return message.strip()
     
-    def send_unsubscribe_notification(self, email, date):
-        """Send unsubscribe notification"""
+    @staticmethod
+    def build_unsubscribe_message(email, date):
+        """Unsubscribe notification text"""
         message = f"""
 ❌ <b>Unsubscribe Alert</b>
 
@@ -108,10 +133,11 @@ Subscriber mengklik link di email Anda!
 
 Subscriber telah unsubscribe dari mailing list.
 """
-        return self.send_message(message.strip())
+        return message.strip()
     
-    def send_new_subscriber_notification(self, email, first_name, last_name, mobile, date):
-        """Send new subscriber notification"""
+    @staticmethod
+    def build_new_subscriber_message(email, first_name, last_name, mobile, date):
+        """New subscriber notification text"""
         full_name = f"{first_name} {last_name}".strip() or "N/A"
         message = f"""
 ✅ <b>New Subscriber</b>
@@ -123,4 +149,61 @@ Subscriber telah unsubscribe dari mailing list.
 
 Subscriber baru telah bergabung!
 """
-        return self.send_message(message.strip())
+        return message.strip()
+    
+    # Title line (first line of each template) and digest label per event kind
+    DIGEST_LABELS = {
+        'bounce': ('🚫', 'bounces'),
+        'open': ('👁️', 'opens'),
+        'click': ('🖱️', 'clicks'),
+        'unsubscribe': ('❌', 'unsubscribes'),
+        'newsubscriber': ('✅', 'new subscribers'),
+    }
+    
+    @classmethod
+    def build_digest_message(cls, counts, samples, minutes):
+        """Digest text, e.g. "37 opens, 12 clicks in the last 5 minutes"
+
+        samples: {kind: [full template message, ...]} - only the email line
+        of each template is reused to keep the digest short.
+        """
+        parts = [f"{counts[kind]} {cls.DIGEST_LABELS.get(kind, ('', kind))[1]}"
+                 for kind in cls.DIGEST_LABELS if counts.get(kind)]
+        lines = [
+            "📊 <b>Ringkasan Aktivitas Email</b>",
+            "",
+            f"{', '.join(parts)} in the last {minutes} minutes",
+        ]
+        for kind, messages in samples.items():
+            if not messages:
+                continue
+            icon = cls.DIGEST_LABELS.get(kind, ('•', kind))[0]
+            lines.append("")
+            for message in messages:
+                email_line = next((l for l in message.splitlines() if l.startswith('📧')), None)
+                if email_line:
+                    lines.append(f"{icon} {email_line[len('📧 Email: '):]}")
+            remaining = counts.get(kind, 0) - len(messages)
+            if remaining > 0:
+                lines.append(f"   … +{remaining} lainnya")
+        return "\n".join(lines)
+    
+    def send_bounce_notification(self, email, reason, date):
+        """Send bounce notification"""
+        return self.send_message(self.build_bounce_message(email, reason, date))
+    
+    def send_email_open_notification(self, email, date):
+        """Send email open notification"""
+        return self.send_message(self.build_email_open_message(email, date))
+    
+    def send_link_click_notification(self, email, link_clicked, date):
+        """Send link click notification"""
+        return self.send_message(self.build_link_click_message(email, link_clicked, date))
+    
+    def send_unsubscribe_notification(self, email, date):
+        """Send unsubscribe notification"""
+        return self.send_message(self.build_unsubscribe_message(email, date))
+    
+    def send_new_subscriber_notification(self, email, first_name, last_name, mobile, date):
+        """Send new subscriber notification"""
+        return self.send_message(self.build_new_subscriber_message(email, first_name, last_name, mobile, date))
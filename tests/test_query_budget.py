@@ -0,0 +1,100 @@
+"""
+Query-count budget of the list pages (dashboard, leads, product lists)
+
+The pages render from read models (services/read_models.py), so the number
+of queries must not grow with the number of leads or product lists shown.
+
+    python -m pytest -q tests/test_query_budget.py
+"""
+
+import os
+import tempfile
+
+# The app reads these at import time
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ.setdefault('METRICS_DIR', tempfile.mkdtemp(prefix='metrics-'))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import pytest
+
+import app as app_module
+from app import app, ADMIN_EMAIL, ADMIN_PASSWORD
+from database import db
+from models import Lead, ProductList, get_wib_now
+from services.query_stats import query_stats
+
+# Queries per page, for any number of rows
+QUERY_BUDGETS = {
+    '/': 2,
+    '/leads': 5,
+    '/product-lists': 4,
+}
+
+STATUSES = ('follow_up', 'closing', 'not_closing')
+
+
+def add_product_lists(count, start):
+    for n in range(start, start + count):
+        product_list = ProductList(
+            store_id='1001', store_name='Toko Test', product_name=f'Produk {n}', product_id=f'SKU-{n}',
+            mailketing_list_followup='1', mailketing_list_closing='2', mailketing_list_not_closing='3'
+        )
+        product_list.set_sales_persons([f'{n}1', f'{n}2'], [f'CS {n}-1', f'CS {n}-2'],
+                                       [f'cs{n}1@test.id', f'cs{n}2@test.id'])
+        db.session.add(product_list)
+        # Sales people of this list must exist before the next one looks them up
+        db.session.flush()
+    db.session.commit()
+
+
+def add_leads(count, start):
+    now = get_wib_now()
+    product_list_ids = [pl.id for pl in ProductList.query.all()]
+    for n in range(start, start + count):
+        status = STATUSES[n % len(STATUSES)]
+        db.session.add(Lead(
+            product_list_id=product_list_ids[n % len(product_list_ids)], order_id=f'ORD{n:06d}',
+            name=f'Lead {n}', email=f'lead{n}@test.id', phone='081200000000', status=status,
+            sales_person_name=f'CS {n}', created_at=now, updated_at=now,
+            follow_up_start=now if status == 'follow_up' else None
+        ))
+    db.session.commit()
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    # Tables come from create_all; the column migrations are for old databases
+    app_module._migration_done = True
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    client.post('/login', data={'email': ADMIN_EMAIL, 'password': ADMIN_PASSWORD})
+    yield client
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def page_queries(client, path):
+    """Queries the last GET of `path` ran, as counted by query_stats"""
+    response = client.get(path)
+    assert response.status_code == 200
+    rule = path.split('?')[0]
+    return query_stats.get_stats()['scopes'][f'GET {rule}']['last_queries']
+
+
+@pytest.mark.parametrize('path', ['/', '/leads', '/leads?status=follow_up&search=lead', '/product-lists'])
+def test_page_queries_do_not_grow_with_rows(client, path):
+    with app.app_context():
+        add_product_lists(20, start=0)
+        add_leads(25, start=0)
+    small = page_queries(client, path)
+
+    with app.app_context():
+        add_product_lists(40, start=20)
+        add_leads(200, start=25)
+    large = page_queries(client, path)
+
+    assert small == large
+    assert large <= QUERY_BUDGETS[path.split('?')[0]]